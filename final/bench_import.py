@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+imgspy cold-start benchmark
+======
+
+Measures, in a fresh interpreter, the time to import imgspy and probe one local
+image, for both the synchronous ``imgspy`` and ``imgspy_asyncio``. The run fails
+when the best of several runs exceeds the cold-start budget, or when a local
+probe loads the network backend.
+
+usage
+-----
+::
+    $ python bench_import.py --runs 5 --budget 0.15
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from typing import List
+
+from imgspy_testing import make_png
+
+BASEDIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RUNS = 5
+DEFAULT_BUDGET = float(os.environ.get('IMGSPY_COLD_START_BUDGET', 0.15))
+
+# Modules a local probe must not pull in.
+NETWORK_MODULES = ('aiohttp',)
+
+SNIPPETS = {
+    'sync': "import imgspy\nimgspy.info(path)",
+    'async': "import asyncio\nimport imgspy_asyncio\nasyncio.run(imgspy_asyncio.Imgspy.info(path))",
+}
+
+TEMPLATE = """\
+import time
+start = time.perf_counter()
+path = {path!r}
+{snippet}
+elapsed = time.perf_counter() - start
+import sys, json
+print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {modules!r} if m in sys.modules]}}))
+"""
+
+
+def cold_start(engine: str, path: str) -> dict:
+    """
+    Import one engine and probe ``path`` in a fresh interpreter.
+
+    Args:
+        engine (str): ``'sync'`` or ``'async'``.
+        path (str): The local image to probe.
+
+    Returns:
+        dict: The seconds spent importing and probing, and the network modules loaded.
+    """
+    code = TEMPLATE.format(path=path, snippet=SNIPPETS[engine], modules=NETWORK_MODULES)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([BASEDIR, os.path.dirname(BASEDIR)]))
+    output = subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run(runs: int = DEFAULT_RUNS, engines=('sync', 'async')) -> List[dict]:
+    """
+    Measure the cold start of every engine, keeping the best of ``runs``.
+
+    Returns:
+        List[dict]: One record per engine.
+    """
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sample.png')
+        with open(path, 'wb') as f:
+            f.write(make_png(64, 48, 1024))
+        for engine in engines:
+            samples = [cold_start(engine, path) for _ in range(runs)]
+            records.append({
+                'engine': engine,
+                'elapsed': min(s['elapsed'] for s in samples),
+                'loaded': sorted(set(m for s in samples for m in s['loaded'])),
+            })
+    return records
+
+
+def over_budget(records: List[dict], budget: float = DEFAULT_BUDGET) -> List[dict]:
+    """
+    Return the records that are too slow or loaded a network backend.
+    """
+    return [r for r in records if r['elapsed'] > budget or r['loaded']]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS)
+    parser.add_argument('--engines', default='sync,async')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help='seconds allowed for import plus one local probe')
+    args = parser.parse_args(argv)
+
+    records = run(args.runs, tuple(args.engines.split(',')))
+    print(f"{'engine':<6} {'seconds':>8} loaded")
+    for r in records:
+        print(f"{r['engine']:<6} {r['elapsed']:>8.4f} {','.join(r['loaded']) or '-'}")
+
+    failures = over_budget(records, args.budget)
+    for r in failures:
+        print(f"FAIL {r['engine']}: {r['elapsed']:.4f}s (budget {args.budget}s), "
+              f"loaded {r['loaded'] or 'nothing extra'}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
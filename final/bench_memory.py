@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+imgspy memory benchmark
+======
+
+Runs ``Imgspy.info`` and the synchronous ``imgspy.info`` over batches of
+generated images and records the tracemalloc peak and the process RSS for each
+batch. The peak is divided by the most probes that had their input open at
+once. The run fails when that peak memory per in-flight probe exceeds the
+configured budget, a few times the initial read, so that buffering whole
+images, the largest of which is a megabyte, shows up in the build. The
+synchronous engine decodes data URIs whole, so it is only given the files.
+
+usage
+-----
+::
+    $ python bench_memory.py --batches 1000,10000,100000 --budget 262144
+"""
+import os
+import sys
+import time
+import base64
+import asyncio
+import argparse
+import resource
+import contextlib
+import tempfile
+import tracemalloc
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import imgspy
+from imgspy_asyncio import Imgspy, OpenStream, DEFAULT_INITIAL_READ
+from imgspy_testing import make_png, make_jpeg
+
+DEFAULT_BATCHES = (1000, 10000, 100000)
+DEFAULT_IMAGE_SIZES = (1024, 16384, 131072, 1048576)
+DEFAULT_BUDGET = int(os.environ.get('IMGSPY_MEM_BUDGET', 4 * DEFAULT_INITIAL_READ))
+
+
+def make_inputs(directory: str, count: int, sizes=DEFAULT_IMAGE_SIZES) -> List[str]:
+    """
+    Write one PNG and one JPEG per size into ``directory`` and return ``count``
+    inputs cycling over those files and their data URIs.
+
+    Args:
+        directory (str): Where the generated files are written.
+        count (int): The number of inputs to return.
+        sizes (tuple): The image sizes in bytes.
+
+    Returns:
+        List[str]: File paths and data URIs.
+    """
+    sources = []
+    for size in sizes:
+        for ext, maker in (('png', make_png), ('jpg', make_jpeg)):
+            data = maker(64, 48, size)
+            path = os.path.join(directory, f'sample{size}.{ext}')
+            with open(path, 'wb') as f:
+                f.write(data)
+            sources.append(path)
+            sources.append(f'data:image/{ext};base64,' + base64.b64encode(data).decode())
+    return [sources[i % len(sources)] for i in range(count)]
+
+
+def current_rss() -> int:
+    """
+    Return the current resident set size of the process in bytes.
+
+    Returns:
+        int: The RSS, or the peak RSS where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextlib.contextmanager
+def count_in_flight():
+    """
+    Count the async probes that have their input open at once, from the
+    moment OpenStream hands out a stream until it is released.
+
+    Yields:
+        dict: The ``open`` count and its ``peak``, updated as probes run.
+    """
+    counts = {'open': 0, 'peak': 0}
+    get_stream, release = OpenStream._get_stream, OpenStream.release
+
+    async def counting_get_stream(opener):
+        stream = await get_stream(opener)
+        if stream is not None:
+            opener.counted = True
+            counts['open'] += 1
+            counts['peak'] = max(counts['peak'], counts['open'])
+        return stream
+
+    def counting_release(opener):
+        if getattr(opener, 'counted', False):
+            opener.counted = False
+            counts['open'] -= 1
+        release(opener)
+
+    OpenStream._get_stream, OpenStream.release = counting_get_stream, counting_release
+    try:
+        yield counts
+    finally:
+        OpenStream._get_stream, OpenStream.release = get_stream, release
+
+
+def measure(engine: str, inputs: List[str]) -> dict:
+    """
+    Probe ``inputs`` with one engine and record its memory usage.
+
+    Args:
+        engine (str): ``'async'`` for ``Imgspy.info``, ``'sync'`` for ``imgspy.info``.
+        inputs (List[str]): The inputs to probe.
+
+    Returns:
+        dict: The batch size, peak bytes, peak bytes per in-flight probe, RSS and
+        elapsed seconds.
+    """
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    if engine == 'async':
+        with count_in_flight() as in_flight:
+            results = asyncio.run(Imgspy.info(*inputs))
+        _, peak = tracemalloc.get_traced_memory()
+        peak_per_probe = peak // max(in_flight['peak'], 1)
+    else:
+        # One probe in flight at a time: measure each call against the memory
+        # held when it started so the growing results list is not counted.
+        results, peak, peak_per_probe = [], 0, 0
+        for i in inputs:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            results.append(imgspy.info(i))
+            _, call_peak = tracemalloc.get_traced_memory()
+            peak = max(peak, call_peak)
+            peak_per_probe = max(peak_per_probe, call_peak - before)
+    elapsed = time.perf_counter() - start_time
+    tracemalloc.stop()
+
+    failed = sum(1 for r in results if not r or r.get('status', 'ok') != 'ok')
+    return {
+        'engine': engine,
+        'batch': len(inputs),
+        'failed': failed,
+        'peak': peak,
+        'peak_per_probe': peak_per_probe,
+        'rss': current_rss(),
+        'elapsed': elapsed,
+    }
+
+
+def run(batches=DEFAULT_BATCHES, sizes=DEFAULT_IMAGE_SIZES, engines=('async', 'sync')) -> List[dict]:
+    """
+    Measure every engine against every batch size.
+
+    Args:
+        batches (tuple): The batch sizes.
+        sizes (tuple): The image sizes in bytes.
+        engines (tuple): The engines to measure.
+
+    Returns:
+        List[dict]: One record per engine and batch size.
+    """
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        for batch in batches:
+            inputs = make_inputs(directory, batch, sizes)
+            for engine in engines:
+                records.append(measure(engine, inputs if engine == 'async' else
+                                       [i for i in inputs if not i.startswith('data:')]))
+    return records
+
+
+def over_budget(records: List[dict], budget: int = DEFAULT_BUDGET) -> List[dict]:
+    """
+    Return the records whose peak memory per in-flight probe exceeds ``budget``.
+    """
+    return [r for r in records if r['peak_per_probe'] > budget]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--batches', default=','.join(map(str, DEFAULT_BATCHES)))
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_IMAGE_SIZES)))
+    parser.add_argument('--engines', default='async,sync')
+    parser.add_argument('--budget', type=int, default=DEFAULT_BUDGET,
+                        help='peak bytes allowed per in-flight probe')
+    args = parser.parse_args(argv)
+
+    records = run(tuple(int(b) for b in args.batches.split(',')),
+                  tuple(int(s) for s in args.sizes.split(',')),
+                  tuple(args.engines.split(',')))
+
+    print(f"{'engine':<6} {'batch':>7} {'failed':>6} {'peak':>12} {'per probe':>10} {'rss':>12} {'seconds':>8}")
+    for r in records:
+        print(f"{r['engine']:<6} {r['batch']:>7} {r['failed']:>6} {r['peak']:>12} "
+              f"{r['peak_per_probe']:>10} {r['rss']:>12} {r['elapsed']:>8.2f}")
+
+    failures = over_budget(records, args.budget)
+    for r in failures:
+        print(f"FAIL {r['engine']} batch={r['batch']}: {r['peak_per_probe']} bytes per probe "
+              f"exceeds budget of {args.budget}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+imgspy S3 benchmark
+======
+
+Probes every object under a prefix of an in-process S3 stand-in through the
+``s3://`` backend, and records the throughput, the requests sent and the bytes
+transferred per probe. The run fails when a probe transfers more than the
+configured budget, so a backend that stops sending ranged GETs shows up in the
+build.
+
+usage
+-----
+::
+    $ python bench_s3.py --objects 1000 --size 4194304 --budget 131072
+"""
+import os
+import re
+import sys
+import hmac
+import time
+import base64
+import hashlib
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, parse_qsl, quote, unquote
+from xml.sax.saxutils import escape
+
+import imgspy_s3
+from imgspy_testing import make_png, make_jpeg
+
+DEFAULT_OBJECTS = 1000
+DEFAULT_SIZE = 4 * 1024 * 1024
+DEFAULT_MAX_BYTES = 128 * 1024
+DEFAULT_BUDGET = int(os.environ.get('IMGSPY_S3_BUDGET', DEFAULT_MAX_BYTES))
+
+
+class LocalS3:
+    """In-process S3 stand-in serving path-style ranged GETs and ListObjectsV2"""
+
+    def __init__(self, objects: dict, access_key: str = None, secret_key: str = None) -> None:
+        """
+        Initialize the LocalS3 object.
+
+        Args:
+            objects (dict): The object bytes by ``(bucket, key)``.
+            access_key (str): When set, requests not signed with it and
+                ``secret_key`` are refused.
+            secret_key (str): The secret access key signatures are checked with.
+        """
+        self.objects = objects
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.requests = []
+        # object bytes only, listings are not counted
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        store = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                bucket, _, key = unquote(parts.path[1:]).partition('/')
+                with store.lock:
+                    store.requests.append((self.path, self.headers))
+                if store.access_key and not store.signed('GET', self.path, self.headers):
+                    return self.reply(403, b'')
+                if not key:
+                    return self.reply(200, store.list(bucket, parse_qs(parts.query)),
+                                      {'Content-Type': 'application/xml'})
+                data = store.objects.get((bucket, key))
+                if data is None:
+                    return self.reply(404, b'')
+                match = re.match(r'bytes=(\d+)-(\d+)', self.headers.get('Range', ''))
+                if not match:
+                    body, status, headers = data, 200, {}
+                else:
+                    start, end = int(match.group(1)), min(int(match.group(2)), len(data) - 1)
+                    body, status = data[start:end + 1], 206
+                    headers = {'Content-Range': f'bytes {start}-{end}/{len(data)}'}
+                with store.lock:
+                    store.bytes_sent += len(body)
+                self.reply(status, body, headers)
+
+            def reply(self, status, body, headers=None):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def signed(self, method: str, path: str, headers) -> bool:
+        """
+        Recompute the Signature V4 of a request as received, from the decoded
+        query, and compare it with the one it carries.
+        """
+        match = re.fullmatch(r'AWS4-HMAC-SHA256 Credential=([^/]+)/(\d{8})/([^/]+)/s3/aws4_request, '
+                             r'SignedHeaders=([^,]+), Signature=([0-9a-f]{64})', headers.get('Authorization', ''))
+        if not match or match.group(1) != self.access_key:
+            return False
+        _, date, region, names, signature = match.groups()
+        parts = urlsplit(path)
+        query = '&'.join(sorted(f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}"
+                                for k, v in parse_qsl(parts.query, keep_blank_values=True)))
+        canonical = '\n'.join([method, parts.path, query,
+                               ''.join(f'{n}:{headers.get(n, "").strip()}\n' for n in names.split(';')),
+                               names, headers.get('x-amz-content-sha256', '')])
+        scope = f'{date}/{region}/s3/aws4_request'
+        string_to_sign = '\n'.join(['AWS4-HMAC-SHA256', headers.get('x-amz-date', ''), scope,
+                                    hashlib.sha256(canonical.encode()).hexdigest()])
+        key = ('AWS4' + self.secret_key).encode()
+        for part in (date, region, 's3', 'aws4_request'):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        expected = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    def list(self, bucket: str, params: dict) -> bytes:
+        """
+        Render one ListObjectsV2 page. Continuation tokens are base64 encoded
+        offsets, opaque and in need of percent-encoding like those of S3.
+        """
+        prefix = params.get('prefix', [''])[0]
+        page_size = int(params.get('max-keys', ['1000'])[0])
+        token = params.get('continuation-token')
+        start = int(base64.b64decode(token[0]).decode().partition('=')[2]) if token else 0
+        keys = sorted(k for b, k in self.objects if b == bucket and k.startswith(prefix))
+        page = keys[start:start + page_size]
+        truncated = start + page_size < len(keys)
+        contents = ''.join(f'<Contents><Key>{escape(k)}</Key></Contents>' for k in page)
+        token = base64.b64encode(f'start={start + page_size}'.encode()).decode()
+        token = f'<NextContinuationToken>{token}</NextContinuationToken>' if truncated else ''
+        return (f'<?xml version="1.0" encoding="UTF-8"?>'
+                f'<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                f'<Name>{bucket}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(page)}</KeyCount>'
+                f'<IsTruncated>{"true" if truncated else "false"}</IsTruncated>{token}{contents}'
+                f'</ListBucketResult>').encode()
+
+
+def make_objects(count: int, size: int) -> dict:
+    """
+    Build ``count`` PNG and JPEG objects of ``size`` bytes under ``images/``.
+
+    Returns:
+        dict: The object bytes by ``(bucket, key)``.
+    """
+    samples = [make_png(64, 48, size), make_jpeg(64, 48, size)]
+    return {('images', f'sample/{i:06d}.{("png", "jpg")[i % 2]}'): samples[i % 2] for i in range(count)}
+
+
+async def probe_prefix(backend: imgspy_s3.S3Backend, uri: str, **options) -> list:
+    """
+    Probe every object under ``uri`` and close the backend's connections.
+    """
+    try:
+        return [result async for result in backend.info_prefix(uri, **options)]
+    finally:
+        await backend.close()
+
+
+def run(objects: int = DEFAULT_OBJECTS, size: int = DEFAULT_SIZE, max_bytes: int = DEFAULT_MAX_BYTES) -> dict:
+    """
+    Probe ``objects`` objects of ``size`` bytes through the ``s3://`` backend.
+
+    Returns:
+        dict: The objects probed and failed, the requests sent, the bytes
+        transferred per probe and the elapsed seconds.
+    """
+    with LocalS3(make_objects(objects, size), access_key='bench', secret_key='secret') as store:
+        backend = imgspy_s3.register(endpoint_url=store.url, access_key='bench', secret_key='secret')
+        start = time.perf_counter()
+        results = asyncio.run(probe_prefix(backend, 's3://images/sample/', max_bytes=max_bytes))
+        elapsed = time.perf_counter() - start
+    return {
+        'objects': len(results),
+        'failed': sum(1 for _, r in results if r['status'] != 'ok'),
+        'requests': len(store.requests),
+        'bytes_per_probe': store.bytes_sent // max(len(results), 1),
+        'elapsed': elapsed,
+    }
+
+
+def over_budget(record: dict, budget: int = DEFAULT_BUDGET) -> bool:
+    """
+    Tell whether the probes transferred more than ``budget`` bytes each on average.
+    """
+    return record['bytes_per_probe'] > budget
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--objects', type=int, default=DEFAULT_OBJECTS)
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE)
+    parser.add_argument('--max-bytes', type=int, default=DEFAULT_MAX_BYTES)
+    parser.add_argument('--budget', type=int, default=DEFAULT_BUDGET,
+                        help='bytes allowed to be transferred per probe')
+    args = parser.parse_args(argv)
+
+    record = run(args.objects, args.size, args.max_bytes)
+    print(f"{'objects':>7} {'failed':>6} {'requests':>8} {'bytes/probe':>11} {'probes/s':>9}")
+    print(f"{record['objects']:>7} {record['failed']:>6} {record['requests']:>8} "
+          f"{record['bytes_per_probe']:>11} {record['objects'] / record['elapsed']:>9.0f}")
+
+    if over_budget(record, args.budget) or record['failed']:
+        print(f"FAIL {record['bytes_per_probe']} bytes per probe (budget {args.budget}), "
+              f"{record['failed']} failed", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
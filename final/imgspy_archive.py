@@ -0,0 +1,289 @@
+# coding: utf-8
+"""
+imgspy archive
+======
+
+Probes the members of zip and tar files in place, without extracting them. The
+zip central directory or the tar headers are read once, then only the leading
+bytes of each member are read: stored members at their offset, deflated and
+otherwise compressed members through a streaming decompressor that stops once
+the parser has its header.
+
+Members are addressed as ``archive://<path>!<member>`` inputs, or probed all at
+once with ``Imgspy.scan_archive``; this module is imported on first use. The
+members of one archive probed in the same batch share a single open archive,
+so its directory is read once, not once per member.
+
+usage
+-----
+::
+    >>> await Imgspy.info('archive:///data/set.zip!images/cat.png')
+    [{'type': 'png', 'width': 640, 'height': 480, 'status': 'ok'}]
+    >>> async for member, result in Imgspy.scan_archive('/data/set.tar'):
+    ...     print(member, result)
+"""
+import io
+import asyncio
+import functools
+import tarfile
+import threading
+import zipfile
+from typing import AsyncIterator, Iterator
+
+from imgspy_asyncio import BoundedStream, OpenStream, Probe, MAX_PROBE_BYTES, \
+    STATUS_NOT_FOUND, STATUS_READ_ERROR, STATUS_INVALID_INPUT
+
+SCHEME = 'archive://'
+
+
+class CountingFile(io.RawIOBase):
+    """Seekable file that counts the bytes read through it"""
+
+    def __init__(self, raw) -> None:
+        self.raw = raw
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = self.raw.readinto(buffer)
+        self.bytes_read += size or 0
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self.raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.raw.tell()
+
+    def close(self) -> None:
+        self.raw.close()
+        super().close()
+
+
+class Archive:
+    """Zip or tar file whose members are read in place"""
+
+    def __init__(self, path: str) -> None:
+        """
+        Open the archive and, for a zip, read its central directory.
+
+        Args:
+            path (str): The path of the zip or tar file, which may be compressed.
+
+        Raises:
+            ValueError: When the file is neither a zip nor a tar file.
+        """
+        self.file = CountingFile(open(path, 'rb'))
+        self.lock = threading.Lock()
+        try:
+            if zipfile.is_zipfile(self.file):
+                self.zip, self.tar = zipfile.ZipFile(self.file), None
+            else:
+                self.file.seek(0)
+                self.zip, self.tar = None, tarfile.open(fileobj=self.file, mode='r:*')
+        except (tarfile.TarError, zipfile.BadZipFile):
+            self.file.close()
+            raise ValueError('not a zip or tar archive')
+
+    @property
+    def bytes_read(self) -> int:
+        """The bytes read from the archive file so far."""
+        return self.file.bytes_read
+
+    def members(self) -> Iterator[tuple]:
+        """
+        Iterate the regular files of the archive in their stored order. A tar's
+        headers are read as the iteration goes, and each member's stream must
+        be done with before the next one is asked for.
+
+        Yields:
+            tuple: The member name and a stream of its content.
+        """
+        if self.zip is not None:
+            for info in self.zip.infolist():
+                if not info.is_dir():
+                    yield info.filename, self.zip.open(info)
+        else:
+            for info in self.tar:
+                if info.isfile():
+                    yield info.name, self.tar.extractfile(info)
+
+    def open(self, name: str):
+        """
+        Open one member. A tar's headers are all read on the first call, and
+        looked up in memory after that.
+
+        Raises:
+            KeyError: When there is no such member.
+        """
+        with self.lock:
+            if self.zip is not None:
+                return self.zip.open(name)
+            stream = self.tar.extractfile(name)
+        if stream is None:
+            raise KeyError(name)
+        return stream
+
+    def close(self) -> None:
+        (self.zip or self.tar).close()
+        self.file.close()
+
+
+class SharedMember:
+    """Stream of a member of an archive other probes may be reading too"""
+
+    def __init__(self, stream, archive: Archive, release) -> None:
+        """
+        Initialize the SharedMember object.
+
+        Args:
+            stream: The member's stream.
+            archive (Archive): The archive, whose lock each read holds, as the
+                members of a tar read through the same file position.
+            release: Called once the stream is closed, to give the archive back.
+        """
+        self.stream = stream
+        self.archive = archive
+        self.release = release
+
+    def read(self, size: int = -1) -> bytes:
+        with self.archive.lock:
+            return self.stream.read(size)
+
+    def close(self) -> None:
+        try:
+            self.stream.close()
+        finally:
+            self.release()
+
+
+class OpenArchives:
+    """Archives held open while probes of their members are in flight, each opened once"""
+
+    def __init__(self) -> None:
+        self.__entries = {}
+
+    async def acquire(self, path: str) -> Archive:
+        """
+        Get the archive at ``path``, opening it on an executor thread unless a
+        probe in flight on this loop already has. Each call must be matched by
+        one to release().
+
+        Raises:
+            OSError: When the archive cannot be opened.
+            ValueError: When it is neither a zip nor a tar file.
+        """
+        loop = asyncio.get_running_loop()
+        entry = self.__entries.get((loop, path))
+        if entry is None:
+            entry = self.__entries[(loop, path)] = [loop.run_in_executor(None, Archive, path), 0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        except BaseException:
+            self.release(path, loop)
+            raise
+
+    def release(self, path: str, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Give back an archive from acquire(), closing it when no probe holds it.
+        """
+        entry = self.__entries[(loop, path)]
+        entry[1] -= 1
+        if entry[1]:
+            return
+        del self.__entries[(loop, path)]
+        entry[0].add_done_callback(self.__close)
+
+    @staticmethod
+    def __close(future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is None:
+            future.result().close()
+
+
+open_archives = OpenArchives()
+
+
+def split_uri(uri: str) -> tuple:
+    """
+    Split an ``archive://<path>!<member>`` URI at its first ``!``.
+
+    Returns:
+        tuple: The archive path and the member name.
+    """
+    path, _, name = uri[len(SCHEME):].partition('!')
+    return path, name.lstrip('/')
+
+
+async def open_member(opener: OpenStream) -> BoundedStream:
+    """
+    Open the member an ``archive://`` input names, for ``ArchiveBackend``.
+
+    The member is read lazily, on an executor thread. The archive is shared,
+    through ``open_archives``, with the other members of it in flight, and
+    closed once the last of their openers is released.
+
+    Returns:
+        BoundedStream: A stream of the member's content, or None after calling
+        ``opener._fail()``.
+    """
+    path, name = split_uri(opener.input)
+    loop = asyncio.get_running_loop()
+    try:
+        archive = await open_archives.acquire(path)
+    except FileNotFoundError:
+        return opener._fail(STATUS_NOT_FOUND, path)
+    except ValueError as e:
+        return opener._fail(STATUS_INVALID_INPUT, str(e))
+    except OSError as e:
+        return opener._fail(STATUS_READ_ERROR, type(e).__name__)
+    try:
+        stream = await loop.run_in_executor(None, archive.open, name)
+    except KeyError:
+        open_archives.release(path, loop)
+        return opener._fail(STATUS_NOT_FOUND, name)
+    except BaseException:
+        open_archives.release(path, loop)
+        raise
+    member = SharedMember(stream, archive, functools.partial(open_archives.release, path, loop))
+    opener.resources.append(member)
+    opener.offload = True
+    return BoundedStream(member, opener.max_bytes)
+
+
+async def scan(path: str, max_bytes: int = MAX_PROBE_BYTES) -> AsyncIterator[tuple]:
+    """
+    Probe every regular file of an archive, one member at a time.
+
+    Args:
+        path (str): The path of the zip or tar file.
+        max_bytes (int): The number of bytes a single probe may read.
+
+    Yields:
+        tuple: The member name and its probe result.
+
+    Raises:
+        OSError: When the archive cannot be opened.
+        ValueError: When it is neither a zip nor a tar file.
+    """
+    loop = asyncio.get_running_loop()
+    archive = await loop.run_in_executor(None, Archive, path)
+    try:
+        members = archive.members()
+        while True:
+            member = await loop.run_in_executor(None, next, members, None)
+            if member is None:
+                break
+            name, stream = member
+            try:
+                result = await Probe(max_bytes=max_bytes).get_info(stream)
+            finally:
+                stream.close()
+            yield name, result
+    finally:
+        archive.close()
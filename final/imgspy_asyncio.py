@@ -26,375 +26,2583 @@ usage
 """
 import io
 import os
+import re
+import math
+import mmap
+import stat
 import sys
+import zlib
 import base64
+import codecs
+import time
+import random
 import struct
+import atexit
 import asyncio
-import aiohttp
-import aiofiles
+import inspect
 import logging
-from aiohttp import ClientError, http_exceptions
-from typing import List, Coroutine
+import threading
+import functools
+import concurrent.futures
+from collections import deque, Counter, OrderedDict
+from urllib.parse import urlsplit
+from typing import AsyncIterator, List, Coroutine
 
 __version__ = '0.2.2'
 
-logging.basicConfig(
-    format="%(asctime)s %(levelname)s:%(name)s: %(message)s",
-    level=logging.DEBUG,
-    datefmt="%H:%M:%S",
-    stream=sys.stderr,
-)
+# Bytes a single probe may buffer before it is given up as too large, and the
+# process-wide number of bytes all in-flight probes may buffer together.
+MAX_PROBE_BYTES = 1024 * 1024
+DEFAULT_BYTE_BUDGET = 64 * 1024 * 1024
+
+# Connections kept open in total and per host, and how long resolved addresses
+# are reused, in seconds.
+DEFAULT_CONNECTIONS = 100
+DEFAULT_CONNECTIONS_PER_HOST = 8
+DEFAULT_DNS_TTL = 300
+
+# Batches are scheduled host by host: the upcoming hosts resolved ahead of their
+# turn, and the connections opened to a host while it waits for its turn.
+DEFAULT_PREFETCH_HOSTS = 8
+DEFAULT_WARM_CONNECTIONS = 2
+
+# Seconds allowed to establish a connection and between two reads of a response.
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 10.0
+
+# Retries of failed URL fetches: attempts after the first one, the base and
+# ceiling of the jittered exponential backoff, and the longest Retry-After
+# worth waiting for, all in seconds.
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.1
+DEFAULT_MAX_BACKOFF = 2.0
+DEFAULT_MAX_RETRY_AFTER = 10.0
+
+# Consecutive failures after which a host is skipped, and for how many seconds;
+# how long URLs that were not found or not images are remembered, and how many.
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOL_DOWN = 30.0
+DEFAULT_NEGATIVE_TTL = 60.0
+DEFAULT_NEGATIVE_CACHE_SIZE = 100000
+
+# Bytes fetched first from remote sources: the default, and the ceiling of the
+# size learned from earlier probes of the same host and file extension, which is
+# the given percentile of the last samples, rounded up to a multiple of the step.
+# Samples are kept for that many hosts and extensions, least recently used
+# evicted first.
+DEFAULT_INITIAL_READ = 64 * 1024
+DEFAULT_MAX_INITIAL_READ = 256 * 1024
+DEFAULT_READ_PERCENTILE = 0.95
+DEFAULT_READ_SAMPLES = 200
+DEFAULT_MIN_READ_SAMPLES = 5
+DEFAULT_READ_KEYS = 1000
+READ_SIZE_STEP = 4096
+
+# Bytes reserved up front for a local file or data URI; the rest of the budget
+# is reserved, a step at a time, as the parser reads on.
+LOCAL_INITIAL_READ = 4096
+
+# At most this many failed probes are logged per interval, in seconds, when
+# error logging is enabled.
+DEFAULT_LOG_LIMIT = 10
+DEFAULT_LOG_INTERVAL = 1.0
+
+# Every probe result carries one of these in its 'status' key.
+STATUS_OK = 'ok'
+STATUS_INVALID_INPUT = 'invalid_input'
+STATUS_NOT_FOUND = 'not_found'
+STATUS_HTTP_ERROR = 'http_error'
+STATUS_CONNECTION_ERROR = 'connection_error'
+STATUS_TIMEOUT = 'timeout'
+STATUS_CIRCUIT_OPEN = 'circuit_open'
+STATUS_READ_ERROR = 'read_error'
+STATUS_TOO_LARGE = 'too_large'
+STATUS_UNSUPPORTED = 'unsupported'
+STATUS_CORRUPT = 'corrupt'
+STATUS_ERROR = 'error'
+
+# How the body of an HTTP response was read, recorded in the result's
+# 'strategy' key: the requested range of it, all of a small response in one read,
+# the first bytes of a response that ignored the range, or nothing at all because
+# the headers showed it is no image.
+STRATEGY_RANGED = 'ranged'
+STRATEGY_WHOLE = 'whole'
+STRATEGY_STREAMED = 'streamed'
+STRATEGY_REJECTED = 'rejected'
+
+# Content-Types whose responses are rejected without reading their body.
+NON_IMAGE_TYPES = ('text/html', 'text/css', 'text/javascript', 'application/json', 'application/javascript',
+                   'application/xhtml+xml', 'application/pdf', 'audio/', 'video/', 'font/')
+
+# Failures that will not change on a second fetch of the same URL.
+NEGATIVE_STATUSES = (STATUS_NOT_FOUND, STATUS_UNSUPPORTED, STATUS_CORRUPT)
+
+# Result fields: those returned by default, and the extended ones a probe only
+# reads further for when asked. 'orientation' comes from TIFF tags, JPEG EXIF and
+# the HEIF irot property, 'frames' is the number of frames of GIF, APNG, WebP and ICO files and 1 for
+# single-image formats, 'bit_depth' is in bits per pixel, and 'images' is the
+# directory of an ICO or CUR file. Fields a format does not have, or that lie
+# beyond the byte cap, are left out.
+DEFAULT_FIELDS = frozenset(('type', 'width', 'height'))
+EXTENDED_FIELDS = frozenset(('orientation', 'frames', 'bit_depth', 'images'))
+
+# ISOBMFF brands of AVIF, HEIC and other HEIF images, taken from the ftyp box.
+HEIF_BRANDS = {
+    'avif': frozenset((b'avif', b'avis')),
+    'heic': frozenset((b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx')),
+    'heif': frozenset((b'mif1', b'msf1')),
+}
+
+# HEIF irot angle, in quarter turns anticlockwise → EXIF orientation.
+IROT_ORIENTATION = (1, 8, 3, 6)
+
+# SVG is scanned this many bytes at a time, and no further than this many
+# characters for its root start tag.
+SVG_READ_SIZE = 4096
+MAX_SVG_PROLOG = 64 * 1024
+
+# SVG lengths in CSS pixels per unit; percentages are left to the viewBox.
+SVG_UNITS = {'': 1.0, 'px': 1.0, 'pt': 4 / 3, 'pc': 16.0, 'in': 96.0, 'cm': 96 / 2.54, 'mm': 96 / 25.4,
+             'em': 16.0, 'ex': 8.0}
+
+# Markup, maybe behind a UTF-8 or UTF-16 byte order mark, and the parts of an SVG
+# prolog and root start tag.
+MARKUP = re.compile(rb'(?:\xef\xbb\xbf)?\s*<|\xff\xfe(?:\s\x00)*<\x00|\xfe\xff(?:\x00\s)*\x00<')
+SVG_PROLOG = re.compile(r'\s*(?:<\?.*?\?>|<!--.*?-->|<!(?:[^\[>]|\[.*?\])*>)', re.S)
+SVG_OPENING = re.compile(r'<(?:[\w.-]+:)?svg(?=[\s/>])')
+SVG_ROOT = re.compile(r'\s*<(?:[\w.-]+:)?svg(?=[\s/>])((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>')
+SVG_ATTRIBUTE = re.compile(r'([\w:.-]+)\s*=\s*("[^"]*"|\'[^\']*\')')
+SVG_LENGTH = re.compile(r'\s*\+?(\d*\.?\d+(?:[eE][+-]?\d+)?)\s*(px|pt|pc|in|cm|mm|em|ex)?\s*$')
+SVG_NUMBER = re.compile(r'[+-]?\d*\.?\d+(?:[eE][+-]?\d+)?')
+
+# PNG color type → samples per pixel.
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+# TIFF tags: ImageWidth, ImageLength, BitsPerSample, Orientation, SamplesPerPixel.
+TIFF_WIDTH, TIFF_HEIGHT, TIFF_BITS, TIFF_ORIENTATION, TIFF_SAMPLES = 0x100, 0x101, 0x102, 0x112, 0x115
+
+# In-memory inputs, probed in place through a memoryview.
+BUFFER_TYPES = (bytes, bytearray, memoryview, mmap.mmap)
+
+# Only this many leading characters are searched for the ':' ending a URI scheme.
+MAX_SCHEME_LENGTH = 16
+
+# Counters of the fetch layer: requests sent, retries and hedged requests made,
+# hedged requests that answered first, and probes refetched because their first
+# read was too short.
+probe_stats = Counter()
+
+def failure(status: str, error: str = None) -> dict:
+    """
+    Build the result of a failed probe.
+
+    Args:
+        status (str): One of the ``STATUS_*`` codes.
+        error (str): An optional detail, such as the HTTP status.
+
+    Returns:
+        dict: The probe result.
+    """
+    return {'status': status, 'error': error}
+
+
+def resolve_fields(fields) -> frozenset:
+    """
+    Resolve a field selection: names, or ``+name`` to add to the defaults.
+
+    Args:
+        fields: An iterable of field names, or a comma separated string of
+            them; None for the default fields.
+
+    Returns:
+        frozenset: The field names.
+
+    Raises:
+        ValueError: On an unknown field name.
+    """
+    if fields is None:
+        return DEFAULT_FIELDS
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    names = [name.strip() for name in fields]
+    resolved = set(DEFAULT_FIELDS) if any(name.startswith('+') for name in names) else set()
+    resolved.update(name.lstrip('+') for name in names)
+    unknown = resolved - DEFAULT_FIELDS - EXTENDED_FIELDS
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    return frozenset(resolved)
+
+
+def svg_root(text: str):
+    """
+    Find the root start tag of an SVG document, past its prolog.
+
+    Returns:
+        The attribute text of the root ``<svg>`` tag; None when the text ends
+        before it, False when the document is not an SVG.
+    """
+    position = 0
+    while True:
+        prolog = SVG_PROLOG.match(text, position)
+        if prolog is None:
+            break
+        position = prolog.end()
+    root = SVG_ROOT.match(text, position)
+    if root is not None:
+        return root.group(1)
+    rest = text[position:].lstrip()
+    if not rest:
+        return None
+    if not rest.startswith('<'):
+        return False
+    if rest.startswith(('<!', '<?')) or SVG_OPENING.match(rest) or '>' not in rest:
+        return None
+    return False
+
+
+def svg_length(value: str) -> float:
+    """
+    Convert an SVG length to CSS pixels.
+
+    Returns:
+        float: The length, or None when it is missing or relative.
+    """
+    match = SVG_LENGTH.match(value or '')
+    if match is None:
+        return None
+    return float(match.group(1)) * SVG_UNITS[match.group(2) or '']
+
+
+def source_host(input) -> str:
+    """
+    Get the host an input is read from: the URL's host and port, or ``data``,
+    ``file``, ``buffer`` or ``stream`` for local inputs.
+    """
+    if isinstance(input, BUFFER_TYPES):
+        return 'buffer'
+    if isinstance(input, str):
+        backend = backend_for(input)
+        if backend is not None and backend.remote:
+            return urlsplit(input).netloc
+        return 'data' if input.startswith('data:') else 'file'
+    return 'stream'
+
+
+def backend_for(input) -> 'Backend':
+    """
+    Look up the backend registered for an input's URI scheme.
+
+    Returns:
+        Backend: The backend, or None for inputs that are not URIs of a
+        registered scheme, such as plain file paths.
+    """
+    if isinstance(input, str):
+        index = input.find(':', 0, MAX_SCHEME_LENGTH)
+        if index > 0:
+            return backends.get(input[:index].lower())
+    return None
+
+
+# aiohttp and aiofiles are imported on first use, so that probing files, data
+# URIs or caller-owned streams does not pay for loading them.
+aiohttp = None
+aiofiles = None
+
+
+def _import_aiohttp():
+    """
+    Import the HTTP backend on first use.
+
+    Returns:
+        module: The aiohttp module.
+    """
+    global aiohttp
+    if aiohttp is None:
+        import aiohttp as module
+        aiohttp = module
+    return aiohttp
+
+
+def _import_aiofiles():
+    """
+    Import the async file backend on first use.
+
+    Returns:
+        module: The aiofiles module.
+    """
+    global aiofiles
+    if aiofiles is None:
+        import aiofiles as module
+        aiofiles = module
+    return aiofiles
+
+
+class ByteBudget:
+    """Process-wide budget of buffered bytes shared by all OpenStream readers"""
+
+    def __init__(self, limit: int = DEFAULT_BYTE_BUDGET) -> None:
+        """
+        Initialize the ByteBudget object.
+
+        Args:
+            limit (int): The number of bytes that may be reserved at once.
+        """
+        self.limit = limit
+        self.in_use = 0
+        self.__waiters = deque()
+        self.__lock = threading.Lock()
+
+    async def reserve(self, size: int) -> int:
+        """
+        Reserve buffer space, waiting in FIFO order while the budget is exhausted.
+
+        Probes on different event loops, such as the runner's and the
+        caller's, share the same budget.
+
+        Args:
+            size (int): The number of bytes to reserve. Requests larger than the
+                whole budget are clamped to it.
+
+        Returns:
+            int: The number of bytes reserved, to be handed back to release().
+        """
+        size = min(size, self.limit)
+        with self.__lock:
+            if not self.__waiters and self.in_use + size <= self.limit:
+                self.in_use += size
+                return size
+            loop = asyncio.get_running_loop()
+            waiter = [size, loop.create_future(), loop, False]
+            self.__waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self.__lock:
+                granted, waiter[3] = waiter[3], None
+            if granted:
+                self.release(size)
+            raise
+        return size
+
+    def try_reserve(self, size: int) -> int:
+        """
+        Reserve buffer space without waiting, from any thread.
+
+        Args:
+            size (int): The number of bytes to reserve, clamped to the budget.
+
+        Returns:
+            int: The number of bytes reserved, or 0 when they do not fit now
+            or others are already waiting.
+        """
+        size = min(size, self.limit)
+        with self.__lock:
+            if self.__waiters or self.in_use + size > self.limit:
+                return 0
+            self.in_use += size
+            return size
+
+    def release(self, size: int) -> None:
+        """
+        Hand reserved bytes back and wake the waiters that now fit.
+
+        Args:
+            size (int): The number of bytes previously reserved.
+        """
+        with self.__lock:
+            self.in_use -= size
+            while self.__waiters:
+                waiter = self.__waiters[0]
+                if waiter[3] is None or waiter[1].done():
+                    self.__waiters.popleft()
+                    continue
+                if self.in_use + waiter[0] > self.limit:
+                    break
+                self.__waiters.popleft()
+                self.in_use += waiter[0]
+                waiter[3] = True
+                waiter[2].call_soon_threadsafe(self.__wake, waiter[1])
+
+    @staticmethod
+    def __wake(future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_result(None)
+
+
+byte_budget = ByteBudget()
+
+
+class RetryPolicy:
+    """How failed URL fetches are retried and slow ones hedged"""
+
+    def __init__(self, retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF,
+                 max_backoff: float = DEFAULT_MAX_BACKOFF, max_retry_after: float = DEFAULT_MAX_RETRY_AFTER,
+                 hedge_delay: float = None) -> None:
+        """
+        Initialize the RetryPolicy object.
+
+        Args:
+            retries (int): The number of attempts after the first one.
+            backoff (float): The base of the exponential backoff, in seconds.
+            max_backoff (float): The ceiling of the exponential backoff, in seconds.
+            max_retry_after (float): The longest Retry-After honoured; longer
+                ones fail the fetch straight away.
+            hedge_delay (float): Seconds after which a second request is sent
+                for a fetch that has not answered yet. None disables hedging.
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.hedge_delay = hedge_delay
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        """
+        Get the pause before retrying, using full jitter.
+
+        Args:
+            attempt (int): The number of retries already made.
+            retry_after (float): The delay the server asked for, if any.
+
+        Returns:
+            float: The number of seconds to wait.
+        """
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        return delay if retry_after is None else max(delay, retry_after)
+
+
+class RetryableStatus(Exception):
+    """An HTTP response whose status is worth retrying (5xx or 429)"""
+
+    def __init__(self, status: int, retry_after: float = None) -> None:
+        super().__init__(f"HTTP request failed with status code {status}")
+        self.status = status
+        self.retry_after = retry_after
+
+    @staticmethod
+    def parse_retry_after(value: str) -> float:
+        """
+        Parse a Retry-After header given in seconds or as an HTTP date.
+
+        Returns:
+            float: The number of seconds to wait, or None when it is not readable.
+        """
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        from email.utils import parsedate_to_datetime
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+
+class HttpStatusError(Exception):
+    """An HTTP response whose status is a lasting failure, such as 403, raised by backends"""
+
+    def __init__(self, status: int) -> None:
+        super().__init__(f'HTTP {status}')
+        self.status = status
+
+
+class CircuitBreaker:
+    """Per-host breaker that fast-fails hosts after consecutive fetch failures"""
+
+    def __init__(self, threshold: int = DEFAULT_FAILURE_THRESHOLD, cool_down: float = DEFAULT_COOL_DOWN) -> None:
+        """
+        Initialize the CircuitBreaker object.
+
+        Args:
+            threshold (int): The consecutive failures that trip the breaker.
+            cool_down (float): Seconds a tripped host is skipped for. After that
+                fetches are let through again, and one more failure re-trips it.
+        """
+        self.threshold = threshold
+        self.cool_down = cool_down
+        self.__failures = {}
+        self.__open_until = {}
+
+    def allow(self, host: str) -> bool:
+        """
+        Check whether a fetch from ``host`` may be attempted.
+        """
+        return self.__open_until.get(host, 0) <= time.monotonic()
+
+    def record_success(self, host: str) -> None:
+        """
+        Close the breaker for ``host``.
+        """
+        if host in self.__failures:
+            del self.__failures[host]
+            self.__open_until.pop(host, None)
+
+    def record_failure(self, host: str) -> None:
+        """
+        Count a failed fetch from ``host``, tripping the breaker at the threshold.
+        """
+        failures = self.__failures.get(host, 0) + 1
+        self.__failures[host] = failures
+        if failures >= self.threshold:
+            self.__open_until[host] = time.monotonic() + self.cool_down
+
+
+class NegativeCache:
+    """Short-lived memory of URLs that were not found or held no image"""
+
+    def __init__(self, ttl: float = DEFAULT_NEGATIVE_TTL, size: int = DEFAULT_NEGATIVE_CACHE_SIZE) -> None:
+        """
+        Initialize the NegativeCache object.
+
+        Args:
+            ttl (float): Seconds an entry is kept.
+            size (int): The number of entries kept, oldest evicted first.
+        """
+        self.ttl = ttl
+        self.size = size
+        self.__entries = OrderedDict()
+
+    def __contains__(self, url: str) -> bool:
+        entry = self.__entries.get(url)
+        if entry is None:
+            return False
+        if entry[0] <= time.monotonic():
+            del self.__entries[url]
+            return False
+        return True
+
+    def __getitem__(self, url: str):
+        return self.__entries[url][1]
+
+    def add(self, url: str, result) -> None:
+        """
+        Remember the failed ``result`` of ``url`` for the next ``ttl`` seconds.
+        """
+        self.__entries.pop(url, None)
+        self.__entries[url] = (time.monotonic() + self.ttl, result)
+        while len(self.__entries) > self.size:
+            self.__entries.popitem(last=False)
+
+
+class ReadSizeStats:
+    """Bytes probes needed, by host and file extension, to size the first read of remote sources"""
+
+    def __init__(self, initial: int = DEFAULT_INITIAL_READ, ceiling: int = DEFAULT_MAX_INITIAL_READ,
+                 percentile: float = DEFAULT_READ_PERCENTILE, samples: int = DEFAULT_READ_SAMPLES,
+                 min_samples: int = DEFAULT_MIN_READ_SAMPLES, keys: int = DEFAULT_READ_KEYS) -> None:
+        """
+        Initialize the ReadSizeStats object.
+
+        Args:
+            initial (int): The read size until enough probes have been seen.
+            ceiling (int): The largest read size learned.
+            percentile (float): The share of probes the read size should cover.
+            samples (int): The probes remembered per host and extension.
+            min_samples (int): The probes needed before the learned size is used.
+            keys (int): The hosts and extensions remembered, least recently
+                used evicted first.
+        """
+        self.initial = initial
+        self.ceiling = ceiling
+        self.percentile = percentile
+        self.samples = samples
+        self.min_samples = min_samples
+        self.keys = keys
+        self.__needed = OrderedDict()
+
+    @staticmethod
+    def key(input: str) -> tuple:
+        """
+        Get the host and lower-cased file extension of a URI.
+        """
+        return source_host(input), os.path.splitext(urlsplit(input).path)[1].lower()
+
+    def size(self, input: str, max_bytes: int = MAX_PROBE_BYTES) -> int:
+        """
+        Get the number of bytes to fetch first for an input.
+
+        Returns:
+            int: The learned percentile, or ``initial`` without enough samples,
+            no more than ``max_bytes``.
+        """
+        key = self.key(input)
+        needed = self.__needed.get(key)
+        if needed is None:
+            return min(self.initial, max_bytes)
+        self.__needed.move_to_end(key)
+        if len(needed) < self.min_samples:
+            return min(self.initial, max_bytes)
+        ordered = sorted(needed)
+        wanted = ordered[max(math.ceil(len(ordered) * self.percentile) - 1, 0)]
+        wanted = -(-wanted // READ_SIZE_STEP) * READ_SIZE_STEP
+        return min(wanted, self.ceiling, max_bytes)
+
+    def record(self, input: str, consumed: int) -> None:
+        """
+        Remember the bytes a successful probe of an input consumed.
+        """
+        key = self.key(input)
+        needed = self.__needed.pop(key, None)
+        if needed is None:
+            needed = deque(maxlen=self.samples)
+        self.__needed[key] = needed
+        needed.append(consumed)
+        while len(self.__needed) > self.keys:
+            self.__needed.popitem(last=False)
+
+
+class ReadAudit:
+    """Bytes and read calls each parser consumed, to keep probing within its byte budget"""
+
+    def __init__(self) -> None:
+        self.__parsers = {}
+
+    def record(self, parser: str, consumed: int, reads: int) -> None:
+        """
+        Count one probe by ``parser``, which consumed ``consumed`` bytes in
+        ``reads`` read calls.
+        """
+        entry = self.__parsers.get(parser)
+        if entry is None:
+            entry = self.__parsers[parser] = dict.fromkeys(('probes', 'bytes', 'reads', 'max_bytes', 'max_reads'), 0)
+        entry['probes'] += 1
+        entry['bytes'] += consumed
+        entry['reads'] += reads
+        entry['max_bytes'] = max(entry['max_bytes'], consumed)
+        entry['max_reads'] = max(entry['max_reads'], reads)
+
+    def summary(self) -> dict:
+        """
+        Get the probes, the total and largest bytes consumed, and the total and
+        largest read calls made, by parser.
+        """
+        return {parser: dict(entry) for parser, entry in self.__parsers.items()}
+
+    def reset(self) -> None:
+        self.__parsers.clear()
+
+
+class ErrorLog:
+    """Rate-limited logging of failed probes"""
+
+    def __init__(self, limit: int = DEFAULT_LOG_LIMIT, interval: float = DEFAULT_LOG_INTERVAL,
+                 logger: logging.Logger = None) -> None:
+        """
+        Initialize the ErrorLog object.
+
+        Args:
+            limit (int): The failures logged per interval; the rest are counted
+                and reported as one line when the interval ends.
+            interval (float): The length of an interval, in seconds.
+            logger (logging.Logger): Where failures are logged.
+        """
+        self.limit = limit
+        self.interval = interval
+        self.logger = logger or logging.getLogger(__class__.__name__)
+        self.__window_end = 0.0
+        self.__logged = 0
+        self.__suppressed = 0
+
+    def log(self, input, result: dict) -> None:
+        """
+        Log a failed probe unless this interval's limit has been reached.
+        """
+        now = time.monotonic()
+        if now >= self.__window_end:
+            if self.__suppressed:
+                self.logger.warning("%d more failed probes were not logged", self.__suppressed)
+            self.__window_end = now + self.interval
+            self.__logged = self.__suppressed = 0
+        if self.__logged < self.limit:
+            self.__logged += 1
+            self.logger.error("Probe failed for %.200s: %s (%s)", input, result['status'], result['error'])
+        else:
+            self.__suppressed += 1
+
+
+circuit_breaker = CircuitBreaker()
+negative_cache = NegativeCache()
+read_sizes = ReadSizeStats()
+read_audit = ReadAudit()
+error_log = ErrorLog()
+
+
+class CachingResolver:
+    """aiohttp resolver sharing lookups in flight and cached, so that hosts can be resolved ahead of use"""
+
+    def __init__(self, ttl: int = DEFAULT_DNS_TTL) -> None:
+        """
+        Initialize the CachingResolver object.
+
+        Args:
+            ttl (int): Seconds a lookup is reused.
+        """
+        self.ttl = ttl
+        self.lookups = 0
+        self.__resolver = None
+        self.__cache = {}
+
+    async def resolve(self, host: str, port: int = 0, family: int = 0) -> list:
+        """
+        Resolve a host through aiohttp's default resolver, unless a lookup of it
+        is cached or already running.
+        """
+        key = (host, port, family)
+        now = time.monotonic()
+        expiry, lookup = self.__cache.get(key, (0, None))
+        if lookup is None or expiry < now or (lookup.done() and (lookup.cancelled() or lookup.exception())):
+            if self.__resolver is None:
+                self.__resolver = _import_aiohttp().DefaultResolver()
+            self.lookups += 1
+            lookup = asyncio.ensure_future(self.__resolver.resolve(host, port, family))
+            self.__cache[key] = (now + self.ttl, lookup)
+        return await asyncio.shield(lookup)
+
+    async def close(self) -> None:
+        if self.__resolver is not None:
+            await self.__resolver.close()
+
+
+class HttpClient:
+    """Lazily opened aiohttp session with pooled keep-alive connections and cached DNS"""
+
+    def __init__(self, connections: int = DEFAULT_CONNECTIONS,
+                 connections_per_host: int = DEFAULT_CONNECTIONS_PER_HOST,
+                 dns_ttl: int = DEFAULT_DNS_TTL, warm_connections: int = DEFAULT_WARM_CONNECTIONS) -> None:
+        """
+        Initialize the HttpClient object. Nothing is imported or opened until
+        the first URL is fetched.
+
+        Args:
+            connections (int): The connections kept open in total.
+            connections_per_host (int): The connections kept open per host.
+            dns_ttl (int): Seconds resolved addresses are reused.
+            warm_connections (int): The connections warm() opens to a host.
+        """
+        self.connections = connections
+        self.connections_per_host = connections_per_host
+        self.dns_ttl = dns_ttl
+        self.warm_connections = warm_connections
+        self.resolver = None
+        self.__session = None
+        self.__loop = None
+
+    async def session(self):
+        """
+        Get the session, opening it on first use, and again when used from
+        another event loop than the one it was opened on; the session of the
+        other loop is then closed.
+
+        Returns:
+            aiohttp.ClientSession: The session.
+        """
+        loop = asyncio.get_running_loop()
+        if self.__session is None or self.__session.closed or self.__loop is not loop:
+            if self.__session is not None and self.__loop is not loop:
+                self.__close_stale()
+            self.__loop = loop
+            aiohttp = _import_aiohttp()
+            self.resolver = CachingResolver(self.dns_ttl)
+            connector = aiohttp.TCPConnector(limit=self.connections, limit_per_host=self.connections_per_host,
+                                             ttl_dns_cache=self.dns_ttl, resolver=self.resolver)
+            self.__session = aiohttp.ClientSession(connector=connector)
+        return self.__session
+
+    async def prefetch(self, url: str) -> None:
+        """
+        Resolve the host of a URL ahead of its requests. Failures are left for
+        the requests to report.
+        """
+        parts = urlsplit(url)
+        try:
+            await self.session()
+            await self.resolver.resolve(parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        except Exception:
+            pass
+
+    async def warm(self, url: str, connections: int = None) -> None:
+        """
+        Open keep-alive connections to the host of a URL ahead of its requests,
+        ``warm_connections`` by default. Failures are left for the requests to
+        report.
+        """
+        aiohttp = _import_aiohttp()
+        from yarl import URL
+        session = await self.session()
+        origin = URL(url).origin()
+
+        async def connect():
+            request = aiohttp.ClientRequest('GET', origin, loop=asyncio.get_running_loop())
+            connection = await session.connector.connect(request, [], session.timeout)
+            connection.release()
+        count = self.warm_connections if connections is None else connections
+        await asyncio.gather(*(connect() for _ in range(count)), return_exceptions=True)
+
+    async def close(self) -> None:
+        """
+        Close the session and its connections, on the event loop it was opened
+        on when that is another one, see session().
+        """
+        if self.__session is not None and self.__loop is asyncio.get_running_loop():
+            await self.__close(self.__session, self.resolver)
+            self.__session = None
+        elif self.__session is not None:
+            self.__close_stale()
+
+    def __close_stale(self) -> None:
+        """
+        Close the session of another event loop: on that loop while it runs,
+        otherwise by closing the connections of its connector from here.
+        """
+        session, resolver, loop = self.__session, self.resolver, self.__loop
+        self.__session = None
+        if session.closed:
+            return
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.__close(session, resolver), loop)
+            return
+        connector = session.connector
+        session.detach()
+        try:
+            # close() returns, or is, an awaitable of the other loop; _close()
+            # shuts the transports down without one
+            connector._close()
+        except RuntimeError:
+            pass
+
+    @staticmethod
+    async def __close(session, resolver: CachingResolver) -> None:
+        await session.close()
+        await resolver.close()
+
+
+class BoundedStream:
+    """Read-only view over a probe's bytes that stops at the per-probe cap"""
+
+    def __init__(self, raw, max_bytes: int = MAX_PROBE_BYTES, truncated: bool = False) -> None:
+        """
+        Initialize the BoundedStream object.
+
+        Args:
+            raw: The underlying stream, buffered or caller-owned.
+            max_bytes (int): The number of bytes the probe may consume.
+            truncated (bool): Whether the source holds more bytes than were buffered.
+        """
+        self.raw = raw
+        self.max_bytes = max_bytes
+        self.truncated = truncated
+        self.consumed = 0
+        self.reads = 0
+        self.overflowed = False
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read up to ``size`` bytes without going past the per-probe cap.
+
+        A short read caused by the cap, rather than by the end of the image,
+        marks the stream as overflowed.
+        """
+        remaining = self.max_bytes - self.consumed
+        wanted = remaining if size is None or size < 0 else size
+        data = self.raw.read(min(wanted, remaining))
+        self.consumed += len(data)
+        self.reads += 1
+        if len(data) < wanted and (self.truncated or self.consumed >= self.max_bytes):
+            self.overflowed = True
+        return data
+
+
+class BufferStream:
+    """Stream over a caller-owned buffer that copies only the bytes read"""
+
+    def __init__(self, buffer) -> None:
+        """
+        Initialize the BufferStream object.
+
+        Args:
+            buffer: A bytes-like object or mmap; it is viewed, not copied.
+        """
+        self.view = memoryview(buffer).cast('B')
+        self.position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read up to ``size`` bytes from the current position.
+        """
+        start = self.position
+        end = len(self.view) if size is None or size < 0 else min(start + size, len(self.view))
+        self.position = end
+        return self.view[start:end].tobytes()
+
+    def release(self) -> None:
+        """
+        Drop the view, so that the caller may resize or close the buffer.
+        """
+        self.view.release()
+
+
+class StreamBridge:
+    """Blocking read() over an async reader or async iterator, for a parser running off the event loop"""
+
+    def __init__(self, source, loop: asyncio.AbstractEventLoop, timeout: float = DEFAULT_READ_TIMEOUT) -> None:
+        """
+        Initialize the StreamBridge object.
+
+        Args:
+            source: An object whose ``read`` returns an awaitable, or an async
+                iterator of byte chunks.
+            loop (asyncio.AbstractEventLoop): The loop the source belongs to.
+            timeout (float): Seconds allowed for a single read.
+        """
+        self.source = source
+        self.loop = loop
+        self.timeout = timeout
+        self.__iterator = source.__aiter__() if not hasattr(source, 'read') else None
+        self.__leftover = b''
+        self.__pending = None
+        self.__cancelled = False
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read ``size`` bytes, fewer only at the end of the source, waiting for
+        the event loop to produce them. Async readers such as
+        ``aiohttp.StreamReader`` return what they have buffered, so they are
+        read until ``size`` bytes arrive.
+        """
+        if self.__iterator is None:
+            if size is None or size < 0:
+                return self.__wait(self.source.read(-1))
+            chunks, length = [], 0
+            while length < size:
+                chunk = self.__wait(self.source.read(size - length))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                length += len(chunk)
+            return b''.join(chunks)
+        chunks, length = [self.__leftover], len(self.__leftover)
+        while size is None or size < 0 or length < size:
+            try:
+                chunk = bytes(self.__wait(self.__iterator.__anext__()))
+            except StopAsyncIteration:
+                break
+            chunks.append(chunk)
+            length += len(chunk)
+        data = b''.join(chunks)
+        if size is None or size < 0:
+            size = len(data)
+        self.__leftover = data[size:]
+        return data[:size]
+
+    def cancel(self) -> None:
+        """
+        Abandon the read in progress, making this and any further read fail.
+        """
+        self.__cancelled = True
+        if self.__pending is not None:
+            self.__pending.cancel()
+
+    def __wait(self, awaitable):
+        if self.__cancelled:
+            raise asyncio.CancelledError()
+        self.__pending = asyncio.run_coroutine_threadsafe(self.__await(awaitable), self.loop)
+        try:
+            return self.__pending.result(self.timeout)
+        except concurrent.futures.TimeoutError:
+            self.__pending.cancel()
+            raise
+        finally:
+            self.__pending = None
+
+    @staticmethod
+    async def __await(awaitable):
+        return await awaitable
+
+
+class Base64Reader:
+    """Stream over a base64 payload that decodes only the bytes read"""
+
+    def __init__(self, text: str, start: int = 0) -> None:
+        """
+        Initialize the Base64Reader object.
+
+        Args:
+            text (str): The text holding the payload; whitespace in it is skipped.
+            start (int): The offset the payload starts at.
+        """
+        self.text = text
+        self.position = start
+        self.__pending = ''
+        self.__leftover = b''
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Decode up to ``size`` bytes, whole base64 quanta at a time.
+
+        Raises:
+            ValueError: When the payload is not valid base64.
+        """
+        if size is None or size < 0:
+            size = len(self.text)
+        chunks, length = [self.__leftover], len(self.__leftover)
+        while length < size and self.position < len(self.text):
+            end = self.position + 4 * -(-(size - length) // 3)
+            self.__pending += ''.join(self.text[self.position:end].split())
+            self.position = end
+            whole = len(self.__pending) if end >= len(self.text) else len(self.__pending) // 4 * 4
+            chunk = base64.b64decode(self.__pending[:whole])
+            self.__pending = self.__pending[whole:]
+            chunks.append(chunk)
+            length += len(chunk)
+        data = b''.join(chunks)
+        self.__leftover = data[size:]
+        return data[:size]
+
+    def close(self) -> None:
+        pass
+
+
+class LocalReader:
+    """Blocking read() over a local file or data URI that reserves byte budget
+    for the bytes pulled, for a parser running off the event loop"""
+
+    def __init__(self, open_source, budget: ByteBudget, loop: asyncio.AbstractEventLoop,
+                 max_bytes: int = MAX_PROBE_BYTES) -> None:
+        """
+        Initialize the LocalReader object.
+
+        Args:
+            open_source: Called on the first read, on the reading thread, to
+                open the source.
+            budget (ByteBudget): The budget pulled bytes are reserved from.
+            loop (asyncio.AbstractEventLoop): The loop to wait for the budget
+                on when it is exhausted.
+            max_bytes (int): The number of bytes that may be pulled.
+        """
+        self.open_source = open_source
+        self.budget = budget
+        self.loop = loop
+        self.reserved = 0
+        self.max_bytes = max_bytes
+        self.pulled = 0
+        self.source = None
+        self.__lock = threading.Lock()
+        self.__pending = None
+        self.__busy = False
+        self.__closed = False
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read up to ``size`` bytes, reserving budget for them first: at least
+        ``LOCAL_INITIAL_READ`` bytes, then multiples of ``READ_SIZE_STEP``.
+        """
+        if size is None or size < 0:
+            size = self.max_bytes - self.pulled
+        missing = self.pulled + size - self.reserved
+        if missing > 0:
+            step = max(-(-missing // READ_SIZE_STEP) * READ_SIZE_STEP, LOCAL_INITIAL_READ)
+            self.__reserve(min(step, self.max_bytes - self.reserved))
+        with self.__lock:
+            if self.__closed:
+                raise asyncio.CancelledError()
+            self.__busy = True
+        try:
+            if self.source is None:
+                self.source = self.open_source()
+            data = self.source.read(size)
+        finally:
+            with self.__lock:
+                self.__busy = False
+                closed = self.__closed
+            if closed:
+                self.__close()
+        self.pulled += len(data)
+        return data
+
+    def cancel(self) -> None:
+        """
+        Abandon the read in progress, making this and any further read fail.
+        """
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the source and hand the reserved bytes back, once no read is in
+        progress.
+        """
+        with self.__lock:
+            if self.__closed:
+                return
+            self.__closed = True
+            busy = self.__busy
+        pending = self.__pending
+        if pending is not None:
+            pending.cancel()
+        if not busy:
+            self.__close()
+
+    def __reserve(self, size: int) -> None:
+        """
+        Reserve ``size`` more bytes. When they do not fit, the bytes already
+        held are handed back while the whole amount is waited for, so that
+        readers waiting for each other's bytes cannot deadlock.
+        """
+        granted = self.budget.try_reserve(size)
+        if not granted:
+            with self.__lock:
+                held, self.reserved = self.reserved, 0
+            self.budget.release(held)
+            self.__pending = asyncio.run_coroutine_threadsafe(self.budget.reserve(held + size), self.loop)
+            try:
+                granted = self.__pending.result()
+            except concurrent.futures.CancelledError:
+                raise asyncio.CancelledError() from None
+            finally:
+                self.__pending = None
+        with self.__lock:
+            if not self.__closed:
+                self.reserved += granted
+                return
+        self.budget.release(granted)
+        raise asyncio.CancelledError()
+
+    def __close(self) -> None:
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+        self.budget.release(self.reserved)
+        self.reserved = 0
+
+
+def may_block(stream) -> bool:
+    """
+    Tell whether reading a synchronous stream could stall the event loop: anything
+    but an in-memory buffer or a regular file is assumed to.
+    """
+    if isinstance(stream, (io.BytesIO, BufferStream)):
+        return False
+    try:
+        return not stat.S_ISREG(os.fstat(stream.fileno()).st_mode)
+    except (AttributeError, OSError, ValueError):
+        return True
 
 
 class OpenStream:
-    def __init__(self, input: str) -> None:
+    def __init__(self, input: str, budget: ByteBudget = None, max_bytes: int = MAX_PROBE_BYTES,
+                 timeout: tuple = None, retry: RetryPolicy = None, client: HttpClient = None) -> None:
         """
         Initialize the OpenStream object with the input source.
 
         Args:
-            input (str): The input source, which can be a file path, URL, or data URI.
+            input (str): The input source, which can be a file path, a URI of
+                a scheme in ``backends``, a stream, or a bytes-like object or mmap.
+            budget (ByteBudget): The budget buffered bytes are reserved from,
+                defaults to the process-wide one.
+            max_bytes (int): The number of bytes a single probe may buffer.
+            timeout (tuple): The connect and read timeouts for URLs, in seconds.
+            retry (RetryPolicy): How URL fetches are retried and hedged.
+            client (HttpClient): The shared HTTP client; without one, a client
+                is opened for this stream and closed once it has been read.
         """
         self.input = input
+        self.budget = budget or byte_budget
+        self.max_bytes = max_bytes
+        self.timeout = timeout or (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+        self.retry = retry or RetryPolicy()
+        self.reserved = 0
+        self.status = None
+        self.error = None
+        self.client = client
+        self.__own_client = None
         self.__session = None
-        self.logger = logging.getLogger(__class__.__name__)
+        self.__buffer = None
+        self.offload = False
+        self.resources = []
+        self.strategy = None
+
+    def _fail(self, status: str, error: str = None) -> None:
+        """
+        Record why no stream could be opened.
 
-    async def _get_stream(self) -> io.BytesIO:
+        Args:
+            status (str): One of the ``STATUS_*`` codes.
+            error (str): An optional detail.
+        """
+        self.status = status
+        self.error = error
+
+    async def _get_stream(self) -> BoundedStream:
         """
         Get an asynchronous byte stream based on the input source.
 
+        At most ``max_bytes`` are buffered, reserved from the byte budget before
+        reading; call release() once the stream has been probed.
+
         Returns:
-            io.BytesIO: An asynchronous byte stream for further processing.
+            BoundedStream: An asynchronous byte stream for further processing,
+            or None with ``status`` and ``error`` telling why.
         """
         try:
-            if hasattr(self.input, 'read'):
+            if isinstance(self.input, BUFFER_TYPES):
+                return self.__buffer_stream()
+            elif hasattr(self.input, 'read') or hasattr(self.input, '__aiter__'):
                 return await self.__read_stream()
-            elif os.path.isfile(self.input):
-                return await self.__file_stream()
-            elif self.input.startswith('http'):
-                return await self.__http_stream()
-            elif isinstance(self.input, str) and self.input.startswith('data:'):
-                return await self.__data_stream()
+            backend = backend_for(self.input)
+            if backend is not None:
+                return await backend.open(self)
+            elif isinstance(self.input, str) and self.input.find('://', 0, MAX_SCHEME_LENGTH + 3) > 0:
+                return self._fail(STATUS_INVALID_INPUT, 'unknown URI scheme')
+            elif isinstance(self.input, (str, os.PathLike)) and os.path.isfile(self.input):
+                return await self._file_stream(self.input)
+            self._fail(STATUS_INVALID_INPUT)
         except Exception as e:
-            self.logger.error(f"Error while opening stream {self.input}: {e}")
+            self._fail(STATUS_ERROR, type(e).__name__)
 
         finally:
-            if self.__session:
+            if self.__own_client:
                 await self.close_session()
 
-    async def __file_stream(self) -> io.BytesIO:
+    async def _reserve(self, size: int) -> int:
         """
-        Read an input file and return it as an asynchronous byte stream.
+        Reserve buffer space for up to ``max_bytes`` of a ``size`` byte source.
+
+        Args:
+            size (int): The source size, or None when it is not known.
 
         Returns:
-            io.BytesIO: An asynchronous byte stream representing the file contents.
+            int: The number of bytes that may be buffered.
         """
-        try:
-            async with aiofiles.open(self.input, mode='rb') as f:
-                return io.BytesIO(await f.read())
-        except Exception as e:
-            self.logger.error(f"aiofiles exception for {self.input}: {e}")
+        wanted = self.max_bytes if size is None else min(size, self.max_bytes)
+        self.reserved += await self.budget.reserve(wanted)
+        return wanted
+
+    def release(self) -> None:
+        """
+        Hand the buffer space reserved by this stream back to the byte budget,
+        let go of the caller's buffer, and close what a backend added to
+        ``resources``.
+        """
+        if self.reserved:
+            self.budget.release(self.reserved)
+            self.reserved = 0
+        if self.__buffer is not None:
+            self.__buffer.release()
+            self.__buffer = None
+        while self.resources:
+            self.resources.pop().close()
+
+    async def _file_stream(self, path) -> BoundedStream:
+        """
+        Return a stream over an input file that reads it only as far as the
+        parser asks, on an executor thread.
+
+        Byte budget is reserved only for the bytes read, see LocalReader.
+
+        Args:
+            path: The path of the file.
 
+        Returns:
+            BoundedStream: A stream of the file contents.
+        """
+        try:
+            size = os.path.getsize(path)
+        except OSError as e:
+            return self._fail(STATUS_READ_ERROR, type(e).__name__)
+        return self.__local_stream(functools.partial(open, path, 'rb', buffering=0), size)
 
-    async def __http_stream(self) -> io.BytesIO:
+    async def _http_stream(self) -> BoundedStream:
         """
         Read data from an HTTP URL and return it as an asynchronous byte stream.
 
+        Only the first ``max_bytes`` are requested, and no more than that is read
+        from servers that ignore the Range header. Connection errors, timeouts,
+        5xx and 429 responses are retried according to the retry policy.
+
+        Hosts whose circuit breaker is open are not contacted at all.
+
+        Returns:
+            BoundedStream: An asynchronous byte stream containing the HTTP response data.
+        """
+        host = urlsplit(self.input).netloc
+        if not circuit_breaker.allow(host):
+            return self._fail(STATUS_CIRCUIT_OPEN, host)
+        aiohttp = _import_aiohttp()
+        try:
+            if self.client is None:
+                self.client = self.__own_client = HttpClient()
+            self.__session = await self.client.session()
+            attempt = 0
+            while True:
+                try:
+                    fetched = await self.__hedged_fetch()
+                    break
+                except (asyncio.TimeoutError, aiohttp.ClientError, RetryableStatus) as e:
+                    retry_after = getattr(e, 'retry_after', None)
+                    if (attempt >= self.retry.retries or (retry_after or 0) > self.retry.max_retry_after
+                            or not circuit_breaker.allow(host)):
+                        circuit_breaker.record_failure(host)
+                        raise
+                    await asyncio.sleep(self.retry.delay(attempt, retry_after))
+                    attempt += 1
+                    probe_stats['retries'] += 1
+            circuit_breaker.record_success(host)
+            if fetched is not None:
+                buffer, truncated, reserved, self.strategy = fetched
+                self.reserved += reserved
+                return BoundedStream(buffer, self.max_bytes, truncated)
+        except asyncio.TimeoutError:
+            self._fail(STATUS_TIMEOUT)
+        except RetryableStatus as e:
+            self._fail(STATUS_HTTP_ERROR, f'HTTP {e.status}')
+        except aiohttp.ClientError as e:
+            self._fail(STATUS_CONNECTION_ERROR, type(e).__name__)
+        except aiohttp.http_exceptions.HttpProcessingError as e:
+            self._fail(STATUS_HTTP_ERROR, type(e).__name__)
+
+    async def __hedged_fetch(self) -> tuple:
+        """
+        Fetch the URL, sending a second request when the first one has not
+        answered within the hedge delay, and keep whichever answers first.
+
         Returns:
-            io.BytesIO: An asynchronous byte stream containing the HTTP response data.
+            tuple: The buffer, whether it is truncated, and the bytes reserved for it.
         """
+        if self.retry.hedge_delay is None:
+            return await self.__fetch()
+
+        first = asyncio.ensure_future(self.__fetch())
+        tasks, winner = [first], None
         try:
-            if not self.__session:
-                self.__session = aiohttp.ClientSession()
-            async with self.__session.get(self.input) as response:
-                if response.status == 200:
-                    return io.BytesIO(await response.read())
+            done, _ = await asyncio.wait(tasks, timeout=self.retry.hedge_delay)
+            if not done:
+                probe_stats['hedges'] += 1
+                tasks.append(asyncio.ensure_future(self.__fetch()))
+            pending = {task for task in tasks if not task.done()}
+            while winner is None:
+                answered = [task for task in tasks if task.done() and task.exception() is None]
+                if answered:
+                    winner = answered[0]
+                elif not pending:
+                    raise tasks[-1].exception()
                 else:
-                    self.logger.error(f"HTTP request failed with status code {response.status}")
-                    Exception(f"HTTP request failed with status code {response.status}")
-        except (ClientError, http_exceptions.HttpProcessingError) as e:
-            self.logger.error(f"aiohttp exception for {self.input}: {e}",
-            )
-        except Exception as e:
-            self.logger.error(f"Error while reading http: {e}")
+                    _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if winner is not first:
+                probe_stats['hedge_wins'] += 1
+            return winner.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif task is not winner and not task.cancelled() and task.exception() is None and task.result():
+                    self.budget.release(task.result()[2])
 
-    async def __data_stream(self) -> io.BytesIO:
+    async def __fetch(self) -> tuple:
         """
-        Read data from a data URI and return it as an asynchronous byte stream.
+        Send one ranged GET and buffer up to ``max_bytes`` of the response.
+
+        The response headers decide how its body is read, if at all: responses
+        whose Content-Type is known not to be an image are rejected unread, a
+        response whose Content-Length fits the cap is read in one go, and any
+        other is read up to the cap, whether or not the server honoured the range.
 
         Returns:
-            io.BytesIO: An asynchronous byte stream containing the data from the URI.
+            tuple: The buffer, whether it is truncated, the bytes reserved for
+            it and the read strategy, or None when the response is not usable.
         """
-        try:
-            parts = self.input.split(';', 2)
-            if len(parts) == 2 and parts[1].startswith('base64,'):
-                return io.BytesIO(base64.b64decode(parts[1][7:]))
-        except Exception as e:
-            self.logger.error(f"Error while reading data: {e}")
+        probe_stats['requests'] += 1
+        headers = {'Range': f'bytes=0-{self.max_bytes - 1}'}
+        connect_timeout, read_timeout = self.timeout
+        timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        async with self.__session.get(self.input, headers=headers, timeout=timeout) as response:
+            if response.status >= 500 or response.status == 429:
+                raise RetryableStatus(response.status,
+                                      RetryableStatus.parse_retry_after(response.headers.get('Retry-After')))
+            if response.status not in (200, 206):
+                if response.status in (404, 410):
+                    return self._fail(STATUS_NOT_FOUND, f'HTTP {response.status}')
+                return self._fail(STATUS_HTTP_ERROR, f'HTTP {response.status}')
+            content_type = response.headers.get('Content-Type', '').lower()
+            if content_type.startswith(NON_IMAGE_TYPES):
+                self.strategy = STRATEGY_REJECTED
+                return self._fail(STATUS_UNSUPPORTED, 'Content-Type ' + content_type.partition(';')[0])
+
+            size = response.content_length
+            if response.status == 206:
+                total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                size = int(total) if total.isdigit() else None
+            wanted = self.max_bytes if size is None else min(size, self.max_bytes)
+            if size is not None and size <= self.max_bytes:
+                strategy = STRATEGY_WHOLE
+            else:
+                strategy = STRATEGY_RANGED if response.status == 206 else STRATEGY_STREAMED
+            reserved = await self.budget.reserve(wanted)
+            try:
+                if strategy == STRATEGY_WHOLE:
+                    buffer = io.BytesIO(await response.read())
+                else:
+                    buffer = io.BytesIO()
+                    while buffer.tell() < wanted:
+                        data = await response.content.read(wanted - buffer.tell())
+                        if not data:
+                            break
+                        buffer.write(data)
+            except BaseException:
+                self.budget.release(reserved)
+                raise
+            truncated = size > wanted if size is not None else not response.content.at_eof()
+            buffer.seek(0)
+            return buffer, truncated, reserved, strategy
+
+    async def _data_stream(self) -> BoundedStream:
+        """
+        Return a stream over the payload of a data URI that decodes it only as
+        far as the parser asks, on an executor thread.
+
+        Returns:
+            BoundedStream: A stream of the decoded payload.
+        """
+        header, comma, _ = self.input.partition(',')
+        if not comma or header.count(';') != 1 or not header.endswith(';base64'):
+            return self._fail(STATUS_INVALID_INPUT, 'not a base64 data URI')
+        start = len(header) + 1
+        size = (len(self.input) - start) * 3 // 4
+        return self.__local_stream(functools.partial(Base64Reader, self.input, start), size)
+
+    def __local_stream(self, open_source, size: int) -> BoundedStream:
+        """
+        Return a stream that opens a local source on its first read, on an
+        executor thread, and reserves byte budget as it reads.
 
+        Args:
+            open_source: Opens the source, see LocalReader.
+            size (int): The size of the source.
 
-    async def __read_stream(self) -> str:
+        Returns:
+            BoundedStream: A stream of the source, flagged with ``offload``.
         """
-        Return the input source itself as a string.
+        reader = LocalReader(open_source, self.budget, asyncio.get_running_loop(), self.max_bytes)
+        self.resources.append(reader)
+        self.offload = True
+        return BoundedStream(reader, self.max_bytes, size > self.max_bytes)
+
+    async def __read_stream(self) -> BoundedStream:
+        """
+        Return the caller-owned input stream, limited to the per-probe cap.
+
+        Async readers and async iterators of chunks are bridged to blocking
+        reads, and they and sync streams that may block are flagged with
+        ``offload``, so that they are probed on an executor thread. Nothing is
+        buffered here, so nothing is reserved from the byte budget.
 
         Returns:
-            str: The input source string.
+            BoundedStream: The input stream.
+        """
+        read = getattr(self.input, 'read', None)
+        if read is None or inspect.iscoroutinefunction(read):
+            self.offload = True
+            bridge = StreamBridge(self.input, asyncio.get_running_loop(), self.timeout[1])
+            return BoundedStream(bridge, self.max_bytes)
+        self.offload = may_block(self.input)
+        return BoundedStream(self.input, self.max_bytes)
+
+    async def _ranged_stream(self, backend: 'Backend') -> BoundedStream:
         """
-        return self.input
+        Read the first ``max_bytes`` of an input through a backend's ranged
+        reads, with the same circuit breaker, retries and counters as URLs.
+
+        Args:
+            backend (Backend): The backend registered for the input's scheme.
+
+        Returns:
+            BoundedStream: An asynchronous byte stream containing the data read.
+        """
+        host = source_host(self.input)
+        if not circuit_breaker.allow(host):
+            return self._fail(STATUS_CIRCUIT_OPEN, host)
+        wanted = await self._reserve(None)
+        attempt = 0
+        while True:
+            probe_stats['requests'] += 1
+            try:
+                data, size = await asyncio.wait_for(backend.read_range(self.input, 0, wanted), sum(self.timeout))
+                break
+            except FileNotFoundError as e:
+                circuit_breaker.record_success(host)
+                return self._fail(STATUS_NOT_FOUND, str(e) or None)
+            except HttpStatusError as e:
+                circuit_breaker.record_success(host)
+                return self._fail(STATUS_HTTP_ERROR, f'HTTP {e.status}')
+            except (asyncio.TimeoutError, ConnectionError) as e:
+                if attempt >= self.retry.retries or not circuit_breaker.allow(host):
+                    circuit_breaker.record_failure(host)
+                    if isinstance(e, asyncio.TimeoutError):
+                        return self._fail(STATUS_TIMEOUT)
+                    return self._fail(STATUS_CONNECTION_ERROR, type(e).__name__)
+                await asyncio.sleep(self.retry.delay(attempt))
+                attempt += 1
+                probe_stats['retries'] += 1
+        circuit_breaker.record_success(host)
+        truncated = size > len(data) if size is not None else len(data) >= wanted
+        return BoundedStream(io.BytesIO(data[:wanted]), self.max_bytes, truncated)
+
+    def __buffer_stream(self) -> BoundedStream:
+        """
+        Return a stream over the caller's in-memory buffer, limited to the
+        per-probe cap.
+
+        The buffer is read in place, so nothing is copied up front or reserved
+        from the byte budget, and no filesystem lookup is made.
+
+        Returns:
+            BoundedStream: A stream over the buffer.
+        """
+        self.__buffer = BufferStream(self.input)
+        return BoundedStream(self.__buffer, self.max_bytes)
 
     async def close_session(self):
         """
-        Close the session.
+        Close the session, unless it belongs to a shared client.
         """
-        if self.__session:
-            await self.__session.close()
+        if self.__own_client:
+            await self.__own_client.close()
+
+
+class Backend:
+    """Source of the bytes behind a URI scheme, see register_backend()"""
+
+    # Whether inputs are fetched from somewhere else: their failures count
+    # against the host's circuit breaker, and lasting ones are cached.
+    remote = True
+
+    async def open(self, opener: OpenStream) -> BoundedStream:
+        """
+        Open the input of ``opener`` for probing.
+
+        By default the first ``max_bytes`` are read with read_range(), reserved
+        from the byte budget; built-in backends override this.
+
+        Args:
+            opener (OpenStream): The stream being opened, holding the input,
+                budget, timeouts and retry policy.
+
+        Returns:
+            BoundedStream: The stream to probe, or None after calling
+            ``opener._fail()``.
+        """
+        return await opener._ranged_stream(self)
+
+    async def read_range(self, uri: str, start: int, length: int) -> tuple:
+        """
+        Read up to ``length`` bytes of ``uri`` from offset ``start``.
+
+        Raise FileNotFoundError when there is no such object, HttpStatusError
+        for other lasting failures, and ConnectionError or asyncio.TimeoutError
+        for failures worth retrying; client library errors should be wrapped
+        in those.
+
+        Returns:
+            tuple: The bytes read and the full size of the object, or None when
+            it is not known.
+        """
+        raise NotImplementedError
+
+
+class FileBackend(Backend):
+    """Local files named by ``file://`` URIs"""
+
+    remote = False
+
+    async def open(self, opener: OpenStream) -> BoundedStream:
+        from urllib.request import url2pathname
+        path = url2pathname(urlsplit(opener.input).path)
+        if not os.path.isfile(path):
+            return opener._fail(STATUS_NOT_FOUND, path)
+        return await opener._file_stream(path)
+
+
+class HttpBackend(Backend):
+    """``http://`` and ``https://`` URLs, fetched with ranged GETs"""
+
+    async def open(self, opener: OpenStream) -> BoundedStream:
+        return await opener._http_stream()
+
+
+class DataBackend(Backend):
+    """Base64 ``data:`` URIs"""
+
+    remote = False
+
+    async def open(self, opener: OpenStream) -> BoundedStream:
+        return await opener._data_stream()
+
+
+class ArchiveBackend(Backend):
+    """``archive://<path>!<member>`` members of zip and tar files, see imgspy_archive"""
+
+    remote = False
+
+    async def open(self, opener: OpenStream) -> BoundedStream:
+        import imgspy_archive
+        return await imgspy_archive.open_member(opener)
+
+
+# URI scheme → backend. Inputs are dispatched with one lookup on their scheme;
+# strings without a registered scheme are taken as file paths.
+backends = {
+    'file': FileBackend(),
+    'http': HttpBackend(),
+    'https': HttpBackend(),
+    'data': DataBackend(),
+    'archive': ArchiveBackend(),
+}
+
+
+def register_backend(scheme: str, backend: Backend) -> None:
+    """
+    Probe inputs of a URI scheme, such as ``s3`` or ``gs``, through ``backend``.
+
+    Args:
+        scheme (str): The scheme, without the ``://``.
+        backend (Backend): Usually a subclass implementing read_range().
+    """
+    backends[scheme.lower()] = backend
 
 
 class Probe(OpenStream):
-    def __init__(self) -> None:
+    def __init__(self, budget: ByteBudget = None, max_bytes: int = MAX_PROBE_BYTES,
+                 timeout: tuple = None, retry: RetryPolicy = None, client: HttpClient = None,
+                 fields=None) -> None:
         """
         Initialize the Probe object with the input stream.
 
         Args:
-            stream (io.BytesIO): An asynchronous byte stream.
+            budget (ByteBudget): The budget buffered bytes are reserved from.
+            max_bytes (int): The number of bytes a single probe may buffer.
+            timeout (tuple): The connect and read timeouts for URLs, in seconds.
+            retry (RetryPolicy): How URL fetches are retried and hedged.
+            client (HttpClient): The shared HTTP client.
+            fields: The result fields wanted, see resolve_fields(). Parsers
+                read no further than these need.
         """
         self.stream = None
         self.chunk = None
-        self.logger = logging.getLogger(__class__.__name__)
+        self.budget = budget
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.retry = retry
+        self.client = client
+        self.fields = resolve_fields(fields)
+        self.parser = None
 
     async def get_info(self, input) -> dict:
         """
         Get the image metadata.
 
+        Remote sources are first fetched with the read size ``read_sizes`` has
+        learned for their host and extension, and fetched again up to the
+        per-probe cap when the header turns out to lie beyond it. Only probes of
+        the default fields teach it sizes: extended fields such as ``frames``
+        may walk the whole image.
+
         Returns:
-            dict: The image metadata.
+            dict: The image metadata with an ``ok`` status, or the status and
+            optional error detail of the failure; ``too_large`` when the image
+            header lies beyond the per-probe byte cap.
+        """
+        backend = backend_for(input)
+        url = backend is not None and backend.remote
+        if url and input in negative_cache:
+            return negative_cache[input]
+
+        if not url:
+            return await self.__get_info(input, self.max_bytes)
+        read_size = read_sizes.size(input, self.max_bytes)
+        result = await self.__get_info(input, read_size)
+        if result['status'] == STATUS_TOO_LARGE and read_size < self.max_bytes:
+            probe_stats['refetches'] += 1
+            result = await self.__get_info(input, self.max_bytes)
+        if result['status'] == STATUS_OK and self.fields <= DEFAULT_FIELDS:
+            read_sizes.record(input, self.stream.consumed)
+        elif result['status'] in NEGATIVE_STATUSES:
+            negative_cache.add(input, result)
+        return result
+
+    async def __get_info(self, input, max_bytes: int) -> dict:
+        """
+        Open the input, reading no more than ``max_bytes``, and probe it.
+
+        Returns:
+            dict: See get_info().
+        """
+        opener = OpenStream(input, self.budget, max_bytes, self.timeout, self.retry, self.client)
+        self.parser = None
+        try:
+            self.stream = await opener._get_stream()
+            if self.stream is None:
+                result = failure(opener.status or STATUS_INVALID_INPUT, opener.error)
+            else:
+                result = await self.__offload() if opener.offload else self.__probe()
+                if self.parser is not None:
+                    read_audit.record(self.parser, self.stream.consumed, self.stream.reads)
+                if result is None:
+                    result = failure(STATUS_TOO_LARGE, str(max_bytes)) if self.stream.overflowed \
+                        else failure(STATUS_CORRUPT)
+                elif 'status' not in result:
+                    result['status'] = STATUS_OK
+            if opener.strategy is not None:
+                result['strategy'] = opener.strategy
+            return result
+        finally:
+            opener.release()
+
+    async def __offload(self) -> dict:
+        """
+        Probe a stream whose reads may block on an executor thread.
+
+        Returns:
+            dict: See __probe().
+        """
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, self.__probe)
+        except asyncio.CancelledError:
+            if isinstance(self.stream.raw, (StreamBridge, LocalReader)):
+                self.stream.raw.cancel()
+            raise
+
+    def __probe(self) -> dict:
+        """
+        Dispatch the stream to the parser matching its signature, and keep the
+        wanted fields of its result.
+
+        Returns:
+            dict: The image metadata, a failure for unreadable or unknown data,
+            or None when the parser could not make sense of the header.
         """
         try:
-            self.stream = await OpenStream(input)._get_stream()
             self.chunk = self.stream.read(26)
         except Exception as e:
-            self.logger.error(f"Error while reading stream: {e}")
+            return failure(STATUS_READ_ERROR, type(e).__name__)
+        if self.chunk.startswith(b'\x89PNG\r\n\x1a\n'):
+            parser = self.__probe_png
+        elif self.chunk.startswith(b'GIF89a') or self.chunk.startswith(b'GIF87a'):
+            parser = self.__probe_gif
+        elif self.chunk.startswith(b'\xff\xd8'):
+            parser = self.__probe_jpeg
+        elif self.chunk.startswith(b'\x00\x00\x01\x00') or self.chunk.startswith(b'\x00\x00\x02\x00'):
+            parser = self.__probe_ico
+        elif self.chunk.startswith(b'BM'):
+            parser = self.__probe_bmp
+        elif self.chunk.startswith(b'MM\x00\x2a') or self.chunk.startswith(b'II\x2a\x00'):
+            parser = self.__probe_tiff
+        elif self.chunk.startswith(b'RIFF') and self.chunk[8:12] == b'WEBP':
+            parser = self.__probe_webp
+        elif self.chunk.startswith(b'8BPS'):
+            parser = self.__probe_psd
+        elif self.chunk[4:8] == b'ftyp':
+            parser = self.__probe_heif
+        elif self.chunk.startswith(b'\x1f\x8b') or MARKUP.match(self.chunk):
+            parser = self.__probe_svg
         else:
-            if self.chunk.startswith(b'\x89PNG\r\n\x1a\n'):
-                return self.__probe_png()
-            elif self.chunk.startswith(b'GIF89a') or self.chunk.startswith(b'GIF87a'):
-                return self.__probe_gif()
-            elif self.chunk.startswith(b'\xff\xd8'):
-                return self.__probe_jpeg()
-            elif self.chunk.startswith(b'\x00\x00\x01\x00') or self.chunk.startswith(b'\x00\x00\x02\x00'):
-                return self.__probe_ico()
-            elif self.chunk.startswith(b'BM'):
-                return self.__probe_bmp()
-            elif self.chunk.startswith(b'MM\x00\x2a') or self.chunk.startswith(b'II\x2a\x00'):
-                return self.__probe_tiff()
-            elif self.chunk[:4] == b'\x00\x00\x00\x0c':
-                return self.__probe_webp()
-            elif self.chunk.startswith(b'8BPS'):
-                return self.__probe_psd()
+            return failure(STATUS_UNSUPPORTED)
+        self.parser = parser.__name__.rpartition('__probe_')[2]
+        try:
+            result = parser()
+        except Exception:
+            return None
+        if result is None or 'status' in result:
+            return result
+        return {name: value for name, value in result.items() if name in self.fields}
 
+    def __fill(self, size: int) -> bool:
+        """
+        Read on until the chunk holds ``size`` bytes.
 
-    def __probe_png(self) -> dict:
+        Returns:
+            bool: False when the stream ended, or reached the byte cap, first.
+        """
+        if len(self.chunk) < size:
+            if not isinstance(self.chunk, bytearray):
+                self.chunk = bytearray(self.chunk)
+            self.chunk += self.stream.read(size - len(self.chunk))
+        return len(self.chunk) >= size
+
+    def __ifd(self, base: int, tags: set, end: int = None) -> dict:
         """
-        Probe a PNG image.
+        Read tags from the first IFD of TIFF data, stopping after the last of
+        them; IFD entries are sorted by tag.
+
+        Args:
+            base (int): The offset of the TIFF header in the chunk.
+            tags (set): The tags wanted.
+            end (int): The offset the TIFF data ends at, if it is embedded.
 
         Returns:
-            dict: The image metadata.
+            dict: The first value of each tag found, by tag.
         """
-        try:
-            if self.chunk[12:16] == b'IHDR':
-                w, h = struct.unpack(">LL", self.chunk[16:24])
-            elif self.chunk[12:16] == b'CgBI':
-                self.chunk += self.stream.read(40 - len(self.chunk))
-                w, h = struct.unpack('>LL', self.chunk[32:40])
+        def fill(size):
+            return (end is None or size <= end) and self.__fill(size)
+
+        endian = '>' if self.chunk[base:base + 2] == b'MM' else '<'
+        offset = base + struct.unpack(endian + 'I', self.chunk[base + 4:base + 8])[0]
+        if not fill(offset + 2):
+            return {}
+        count, = struct.unpack(endian + 'H', self.chunk[offset:offset + 2])
+        values, last = {}, max(tags)
+        for entry in range(offset + 2, offset + 2 + 12 * count, 12):
+            if not fill(entry + 12):
+                break
+            tag, kind, length = struct.unpack(endian + 'HHI', self.chunk[entry:entry + 8])
+            if tag > last:
+                break
+            if tag not in tags or kind not in (1, 3, 4):
+                continue
+            if kind == 3 and length > 2:
+                # SHORTs that do not fit in the entry are stored at an offset
+                position = base + struct.unpack(endian + 'I', self.chunk[entry + 8:entry + 12])[0]
+                if not fill(position + 2):
+                    continue
+                values[tag], = struct.unpack(endian + 'H', self.chunk[position:position + 2])
+            elif kind == 3:
+                values[tag], = struct.unpack(endian + 'H', self.chunk[entry + 8:entry + 10])
+            elif kind == 4:
+                values[tag], = struct.unpack(endian + 'I', self.chunk[entry + 8:entry + 12])
             else:
-                w, h = struct.unpack(">LL", self.chunk[8:16])
-            return {'type': 'png', 'width': w, 'height': h}
-        except Exception as e:
-            self.logger.error(f"Error while probing PNG: {e}")
+                values[tag] = self.chunk[entry + 8]
+            if len(values) == len(tags):
+                break
+        return values
+
+    def __probe_png(self) -> dict:
+        """
+        Probe a PNG image; the frame count of an APNG is in its acTL chunk,
+        ahead of the image data.
 
+        Returns:
+            dict: The image metadata.
+        """
+        if self.chunk[12:16] == b'IHDR':
+            ihdr = 16
+        elif self.chunk[12:16] == b'CgBI':
+            self.__fill(40)
+            ihdr = 32
+        else:
+            ihdr = None
+        w, h = struct.unpack('>LL', self.chunk[ihdr or 8:(ihdr or 8) + 8])
+        result = {'type': 'png', 'width': w, 'height': h}
+        if ihdr is None:
+            return result
+        if 'bit_depth' in self.fields and self.__fill(ihdr + 10):
+            result['bit_depth'] = self.chunk[ihdr + 8] * PNG_CHANNELS.get(self.chunk[ihdr + 9], 1)
+        if 'frames' in self.fields:
+            offset = 8
+            while self.__fill(offset + 8):
+                length, kind = struct.unpack('>L4s', self.chunk[offset:offset + 8])
+                if kind == b'acTL':
+                    if self.__fill(offset + 12):
+                        result['frames'], = struct.unpack('>L', self.chunk[offset + 8:offset + 12])
+                    break
+                if kind in (b'IDAT', b'IEND'):
+                    result['frames'] = 1
+                    break
+                offset += 12 + length
+        return result
 
     def __probe_gif(self) -> dict:
         """
-        Probe a GIF image.
+        Probe a GIF image; counting its frames walks the whole file.
 
         Returns:
             dict: The image metadata.
         """
-        try:
-            w, h = struct.unpack('<HH', self.chunk[6:10])
-            return {'type': 'gif', 'width': w, 'height': h}
-        except Exception as e:
-            self.logger.error(f"Error while probing GIF: {e}")
+        w, h = struct.unpack('<HH', self.chunk[6:10])
+        result = {'type': 'gif', 'width': w, 'height': h}
+        packed = self.chunk[10]
+        if 'bit_depth' in self.fields:
+            result['bit_depth'] = (packed & 7) + 1
+        if 'frames' in self.fields:
+            frames = self.__gif_frames(13 + (3 << ((packed & 7) + 1) if packed & 0x80 else 0))
+            if frames is not None:
+                result['frames'] = frames
+        return result
+
+    def __gif_frames(self, offset: int) -> int:
+        """
+        Count the image descriptors from ``offset`` to the trailer.
 
+        Returns:
+            int: The frame count, or None when the trailer is out of reach.
+        """
+        frames = 0
+        while self.__fill(offset + 1):
+            block = self.chunk[offset]
+            if block == 0x3b:
+                return frames
+            if block == 0x2c:
+                if not self.__fill(offset + 10):
+                    return None
+                flags = self.chunk[offset + 9]
+                offset += 11 + (3 << ((flags & 7) + 1) if flags & 0x80 else 0)
+                frames += 1
+            elif block == 0x21:
+                offset += 2
+            else:
+                return None
+            # data sub-blocks, up to an empty one
+            while self.__fill(offset + 1) and self.chunk[offset]:
+                offset += 1 + self.chunk[offset]
+            offset += 1
+        return None
 
     def __probe_jpeg(self) -> dict:
         """
-        Probe a JPEG image.
+        Probe a JPEG image; the EXIF orientation is in an APP1 segment, ahead
+        of the frame header.
 
         Returns:
             dict: The image metadata.
         """
-        try:
-            start = 2
-            data = self.chunk
-            while True:
-                if data[start:start+1] != b'\xff':
-                    return
-                if data[start+1] in b'\xc0\xc2':
-                    h, w = struct.unpack('>HH', data[start+5:start+9])
-                    return {'type': 'jpg', 'width': w, 'height': h}
-                segment_size, = struct.unpack('>H', data[start+2:start+4])
-                data += self.stream.read(segment_size + 9)
-                start = start + segment_size + 2
-        except Exception as e:
-            self.logger.error(f"Error while probing JPEG: {e}")
-
-
-    def __probe_ico(self):
+        start, orientation = 2, None
+        while self.__fill(start + 9):
+            if self.chunk[start] != 0xff:
+                return None
+            marker = self.chunk[start + 1]
+            if marker in (0xc0, 0xc2):
+                h, w = struct.unpack('>HH', self.chunk[start + 5:start + 9])
+                result = {'type': 'jpg', 'width': w, 'height': h, 'frames': 1}
+                if 'bit_depth' in self.fields and self.__fill(start + 10):
+                    result['bit_depth'] = self.chunk[start + 4] * self.chunk[start + 9]
+                if orientation is not None:
+                    result['orientation'] = orientation
+                return result
+            segment_size, = struct.unpack('>H', self.chunk[start + 2:start + 4])
+            end = start + segment_size + 2
+            if marker == 0xe1 and 'orientation' in self.fields and orientation is None \
+                    and self.__fill(end) and self.chunk[start + 4:start + 10] == b'Exif\x00\x00':
+                orientation = self.__ifd(start + 10, {TIFF_ORIENTATION}, end).get(TIFF_ORIENTATION)
+            start = end
+        return None
+
+    def __probe_ico(self) -> dict:
         """
-        Probe an ICO image.
+        Probe an ICO or CUR image; the size is the first directory entry's.
 
         Returns:
             dict: The image metadata.
         """
-        try:
-            img_type = 'ico' if self.chunk[2:3] == b'\x01' else 'cur'
-            num_images = struct.unpack('<H', self.chunk[4:6])[0]
-            w, h = struct.unpack('BB', self.chunk[6:8])
-            w = 256 if w == 0 else w
-            h = 256 if h == 0 else h
-            return {'type': img_type, 'width': w, 'height': h, 'num_images': num_images}
-        except Exception as e:
-            self.logger.error(f"Error while probing ICO: {e}")
-
-
-    def __probe_bmp(self):
+        img_type = 'ico' if self.chunk[2:3] == b'\x01' else 'cur'
+        num_images, = struct.unpack('<H', self.chunk[4:6])
+        w, h = struct.unpack('BB', self.chunk[6:8])
+        result = {'type': img_type, 'width': w or 256, 'height': h or 256, 'frames': num_images}
+        if 'images' in self.fields or 'bit_depth' in self.fields:
+            count = num_images if 'images' in self.fields else 1
+            self.__fill(6 + 16 * count)
+            images = []
+            for entry in range(6, min(6 + 16 * count, len(self.chunk) - 15), 16):
+                w, h, _, _, _, bit_count = struct.unpack('<BBBBHH', self.chunk[entry:entry + 8])
+                image = {'width': w or 256, 'height': h or 256}
+                # a cursor keeps its hotspot where an icon keeps its bit depth
+                if img_type == 'ico' and bit_count:
+                    image['bit_depth'] = bit_count
+                images.append(image)
+            if images and 'bit_depth' in images[0]:
+                result['bit_depth'] = images[0]['bit_depth']
+            if len(images) == count:
+                result['images'] = images
+        return result
+
+    def __probe_bmp(self) -> dict:
         """
         Probe a BMP image.
 
         Returns:
             dict: The image metadata.
         """
-        try:
-            headersize = struct.unpack("<I", self.chunk[14:18])[0]
-            if headersize == 12:
-                w, h = struct.unpack("<HH", self.chunk[18:22])
-            elif headersize >= 40:
-                w, h = struct.unpack("<ii", self.chunk[18:26])
-            else:
-                return
-            return {'type': 'bmp', 'width': w, 'height': h}
-        except Exception as e:
-            self.logger.error(f"Error while probing BMP: {e}")
-
+        headersize, = struct.unpack('<I', self.chunk[14:18])
+        if headersize == 12:
+            w, h = struct.unpack('<HH', self.chunk[18:22])
+            bits = 24
+        elif headersize >= 40:
+            w, h = struct.unpack('<ii', self.chunk[18:26])
+            bits = 28
+        else:
+            return None
+        result = {'type': 'bmp', 'width': w, 'height': h, 'frames': 1}
+        if 'bit_depth' in self.fields and self.__fill(bits + 2):
+            result['bit_depth'], = struct.unpack('<H', self.chunk[bits:bits + 2])
+        return result
 
-    def __probe_tiff(self):
+    def __probe_tiff(self) -> dict:
         """
-        Probe a TIFF image.
+        Probe a TIFF image, reading its first IFD up to the last tag wanted.
+        Like the sync module, the width and height are swapped when the
+        orientation turns the image a quarter turn, so the orientation is
+        read whether it is asked for or not.
 
         Returns:
             dict: The image metadata.
         """
-        try:
-            w, h, orientation = None, None, None
-
-            endian = '>' if self.chunk[0:2] == b'MM' else '<'
-            offset = struct.unpack(endian + 'I', self.chunk[4:8])[0]
-            self.chunk += self.stream.read(offset - len(self.chunk) + 2)
-
-            tag_count = struct.unpack(endian + 'H', self.chunk[offset:offset+2])[0]
-            offset += 2
-            for i in range(tag_count):
-                if len(self.chunk) - offset < 12:
-                    self.chunk += self.stream.read(12)
-                type = struct.unpack(endian + 'H', self.chunk[offset:offset+2])[0]
-                data = struct.unpack(endian + 'H', self.chunk[offset+8:offset+10])[0]
-                offset += 12
-                if type == 0x100:
-                    w = data
-                elif type == 0x101:
-                    h = data
-                elif type == 0x112:
-                    orientation = data
-                if all([w, h, orientation]):
-                    break
+        tags = {TIFF_WIDTH, TIFF_HEIGHT, TIFF_ORIENTATION}
+        if 'bit_depth' in self.fields:
+            tags.update((TIFF_BITS, TIFF_SAMPLES))
+        values = self.__ifd(0, tags)
+        if TIFF_WIDTH not in values or TIFF_HEIGHT not in values:
+            return None
+        result = {'type': 'tiff', 'width': values[TIFF_WIDTH], 'height': values[TIFF_HEIGHT]}
+        if values.get(TIFF_ORIENTATION, 1) >= 5:
+            result['width'], result['height'] = result['height'], result['width']
+        if TIFF_ORIENTATION in values:
+            result['orientation'] = values[TIFF_ORIENTATION]
+        if 'bit_depth' in self.fields:
+            result['bit_depth'] = values.get(TIFF_BITS, 1) * values.get(TIFF_SAMPLES, 1)
+        return result
+
+    def __probe_webp(self) -> dict:
+        """
+        Probe a WEBP image; counting the frames of an animation walks its
+        ANMF chunks.
 
-            if orientation >= 5:
-                w, h = h, w
-            return {'type': 'tiff', 'width': w, 'height': h, 'orientation': orientation}
-        except Exception as e:
-            self.logger.error(f"Error while probing TIFF: {e}")
+        Returns:
+            dict: The image metadata.
+        """
+        w, h = None, None
+        type = self.chunk[15:16]
+        self.__fill(30)
+        if type == b' ':
+            w, h = struct.unpack('<HH', self.chunk[26:30])
+            w, h = w & 0x3fff, h & 0x3fff
+            alpha, animated = False, False
+        elif type == b'L':
+            w = 1 + (((self.chunk[22] & 0x3F) << 8) | self.chunk[21])
+            h = 1 + (((self.chunk[24] & 0xF) << 10) | (self.chunk[23] << 2) | ((self.chunk[22] & 0xC0) >> 6))
+            alpha, animated = bool(self.chunk[24] & 0x10), False
+        elif type == b'X':
+            w = 1 + struct.unpack('<I', self.chunk[24:27] + b'\x00')[0]
+            h = 1 + struct.unpack('<I', self.chunk[27:30] + b'\x00')[0]
+            alpha, animated = bool(self.chunk[20] & 0x10), bool(self.chunk[20] & 0x02)
+        else:
+            return None
+        result = {'type': 'webp', 'width': w, 'height': h, 'bit_depth': 32 if alpha else 24}
+        if not animated:
+            result['frames'] = 1
+        elif 'frames' in self.fields:
+            size = 8 + struct.unpack('<I', self.chunk[4:8])[0]
+            offset, frames = 12, 0
+            while offset < size and self.__fill(offset + 8):
+                fourcc, length = struct.unpack('<4sI', self.chunk[offset:offset + 8])
+                frames += fourcc == b'ANMF'
+                offset += 8 + length + (length & 1)
+            if offset >= size:
+                result['frames'] = frames
+        return result
+
+    def __probe_psd(self) -> dict:
+        """
+        Probe a PSD image.
 
+        Returns:
+            dict: The image metadata.
+        """
+        channels, h, w, depth = struct.unpack('>HLLH', self.chunk[12:24])
+        return {'type': 'psd', 'width': w, 'height': h, 'frames': 1, 'bit_depth': channels * depth}
 
-    def __probe_webp(self):
+    def __box(self, offset: int, end: int = None) -> tuple:
         """
-        Probe a WEBP image.
+        Read the header of the ISOBMFF box at ``offset``.
 
         Returns:
-            dict: The image metadata.
+            tuple: The box type and the offsets its payload starts and ends
+            at, or None when the header is out of reach or malformed.
         """
-        try:
-            w, h = None, None
-            type = self.chunk[15:16]
-            self.chunk += self.stream.read(30 - len(self.chunk))
-            if type == b' ':
-                w, h = struct.unpack('<HH', self.chunk[26:30])
-                w, h = w & 0x3fff, h & 0x3fff
-            elif type == b'L':
-                w = 1 + (((ord(self.chunk[22:23]) & 0x3F) << 8) | ord(self.chunk[21:22]))
-                h = 1 + (((ord(self.chunk[24:25]) & 0xF) << 10) |
-                         (ord(self.chunk[23:24]) << 2) | ((ord(self.chunk[22:23]) & 0xC0) >> 6))
-            elif type == b'X':
-                w = 1 + struct.unpack('<I', self.chunk[24:27] + b'\x00')[0]
-                h = 1 + struct.unpack('<I', self.chunk[27:30] + b'\x00')[0]
-            return {'type': 'webp', 'width': w, 'height': h}
-        except Exception as e:
-            self.logger.error(f"Error while probing WEBP: {e}")
+        if end is not None and offset + 8 > end or not self.__fill(offset + 8):
+            return None
+        size, kind = struct.unpack('>I4s', self.chunk[offset:offset + 8])
+        header = 8
+        if size == 1:
+            if not self.__fill(offset + 16):
+                return None
+            size, = struct.unpack('>Q', self.chunk[offset + 8:offset + 16])
+            header = 16
+        elif size == 0:
+            # the last box, up to the end of its container
+            size = (end if end is not None else sys.maxsize) - offset
+        if size < header or end is not None and offset + size > end:
+            return None
+        return kind, offset + header, offset + size
+
+    def __boxes(self, start: int, end: int):
+        """
+        Iterate the boxes of a container whose payload is in the chunk.
+        """
+        offset = start
+        while offset < end:
+            box = self.__box(offset, end)
+            if box is None:
+                return
+            yield box
+            offset = box[2]
 
+    def __probe_heif(self) -> dict:
+        """
+        Probe an AVIF or HEIF image: ftyp → meta → pitm, and the ispe, irot and
+        pixi properties iprp → ipco associates with the primary item through
+        ipma. Boxes ahead of meta are skipped by their size, and nothing past
+        meta is read.
 
-    def __probe_psd(self):
+        Returns:
+            dict: The image metadata, or unsupported for other ISOBMFF brands.
         """
-        Probe a PSD image.
+        ftyp = self.__box(0)
+        if ftyp is None or not self.__fill(ftyp[2]):
+            return None
+        _, start, end = ftyp
+        # the major brand, then the compatible ones after the minor version
+        brands = {bytes(self.chunk[offset:offset + 4]) for offset in range(start + 8, end, 4)}
+        brands.add(bytes(self.chunk[start:start + 4]))
+        if brands & HEIF_BRANDS['avif']:
+            img_type = 'avif'
+        elif brands & HEIF_BRANDS['heic']:
+            img_type = 'heic'
+        elif brands & HEIF_BRANDS['heif']:
+            img_type = 'heif'
+        else:
+            return failure(STATUS_UNSUPPORTED)
+
+        meta = self.__box(ftyp[2])
+        while meta is not None and meta[0] != b'meta':
+            meta = self.__box(meta[2])
+        if meta is None or not self.__fill(meta[2]):
+            return None
+        primary, properties, associations = None, [], {}
+        for kind, start, end in self.__boxes(meta[1] + 4, meta[2]):
+            if kind == b'pitm' and self.chunk[start] == 0:
+                primary, = struct.unpack('>H', self.chunk[start + 4:start + 6])
+            elif kind == b'pitm':
+                primary, = struct.unpack('>I', self.chunk[start + 4:start + 8])
+            elif kind == b'iprp':
+                for kind, start, end in self.__boxes(start, end):
+                    if kind == b'ipco':
+                        properties = list(self.__boxes(start, end))
+                    elif kind == b'ipma':
+                        associations = self.__ipma(start)
+
+        result = {'type': img_type}
+        indices = associations.get(primary) or range(1, len(properties) + 1)
+        for index in indices:
+            if not 0 < index <= len(properties):
+                continue
+            kind, start, end = properties[index - 1]
+            if kind == b'ispe' and 'width' not in result:
+                result['width'], result['height'] = struct.unpack('>II', self.chunk[start + 4:start + 12])
+            elif kind == b'irot':
+                result['orientation'] = IROT_ORIENTATION[self.chunk[start] & 3]
+            elif kind == b'pixi':
+                result['bit_depth'] = sum(self.chunk[start + 5:start + 5 + self.chunk[start + 4]])
+        if 'width' not in result:
+            return None
+        result.setdefault('orientation', 1)
+        return result
+
+    def __probe_svg(self) -> dict:
+        """
+        Probe an SVG or gzip compressed SVGZ image, scanning no further than the
+        root ``<svg>`` start tag: past a BOM, the XML declaration, comments and
+        the doctype. The size comes from ``width`` and ``height``, or from the
+        ``viewBox`` where these are missing or relative; it is None when the
+        image has neither.
 
         Returns:
-            dict: The image metadata.
+            dict: The image metadata, or unsupported when the markup is no SVG.
         """
-        try:
-            h, w = struct.unpack('>LL', self.chunk[14:22])
-            return {'type': 'psd', 'width': w, 'height': h}
-        except Exception as e:
-            self.logger.error(f"Error while probing PSD: {e}")
+        pieces = [bytes(self.chunk)]
+        if self.chunk.startswith(b'\x1f\x8b'):
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+            def read():
+                while not decompressor.eof:
+                    data = decompressor.unconsumed_tail or (pieces.pop() if pieces else
+                                                            self.stream.read(SVG_READ_SIZE))
+                    if not data:
+                        break
+                    text = decompressor.decompress(data, SVG_READ_SIZE)
+                    if text:
+                        return text
+                return b''
+        else:
+            def read():
+                return pieces.pop() if pieces else self.stream.read(SVG_READ_SIZE)
+
+        first = read()
+        encoding = 'utf-16' if first[:2] in (b'\xff\xfe', b'\xfe\xff') else 'utf-8-sig'
+        decoder = codecs.getincrementaldecoder(encoding)('replace')
+        text, data = '', first
+        while data:
+            text += decoder.decode(data)
+            root = svg_root(text)
+            if root is False:
+                return failure(STATUS_UNSUPPORTED)
+            if root is not None:
+                break
+            if len(text) >= MAX_SVG_PROLOG:
+                return failure(STATUS_TOO_LARGE, f'no <svg> start tag in the first {MAX_SVG_PROLOG} characters')
+            data = read()
+        else:
+            return None
+
+        attributes = {name: value[1:-1] for name, value in SVG_ATTRIBUTE.findall(root)}
+        w, h = svg_length(attributes.get('width')), svg_length(attributes.get('height'))
+        box = [float(n) for n in SVG_NUMBER.findall(attributes.get('viewBox', ''))]
+        if len(box) == 4 and box[2] > 0 and box[3] > 0:
+            if w is None and h is None:
+                w, h = box[2], box[3]
+            elif w is None:
+                w = h * box[2] / box[3]
+            elif h is None:
+                h = w * box[3] / box[2]
+        return {'type': 'svg', 'width': None if w is None else round(w),
+                'height': None if h is None else round(h), 'frames': 1}
+
+    def __ipma(self, start: int) -> dict:
+        """
+        Read an item property association box.
 
+        Returns:
+            dict: The 1-based property indices of each item, by item ID.
+        """
+        version, flags = self.chunk[start], self.chunk[start + 3]
+        count, = struct.unpack('>I', self.chunk[start + 4:start + 8])
+        offset, associations = start + 8, {}
+        for _ in range(count):
+            if version < 1:
+                item, = struct.unpack('>H', self.chunk[offset:offset + 2])
+                offset += 2
+            else:
+                item, = struct.unpack('>I', self.chunk[offset:offset + 4])
+                offset += 4
+            indices = []
+            for _ in range(self.chunk[offset]):
+                if flags & 1:
+                    index, = struct.unpack('>H', self.chunk[offset + 1:offset + 3])
+                    indices.append(index & 0x7fff)
+                    offset += 2
+                else:
+                    indices.append(self.chunk[offset + 1] & 0x7f)
+                    offset += 1
+            offset += 1
+            associations[item] = indices
+        return associations
 
 
 class Imgspy:
     """Processing multiple image streams concurrently to extract their metadata"""
 
     @classmethod
-    async def info(cls, *input) -> List[dict]:
+    async def info(cls, *input, max_bytes: int = MAX_PROBE_BYTES,
+                   connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                   read_timeout: float = DEFAULT_READ_TIMEOUT,
+                   deadline: float = None, retry: RetryPolicy = None,
+                   summary: bool = False, log_errors: bool = False,
+                   client: HttpClient = None, fields=None) -> List[dict]:
         """
         Get the image metadata.
+
+        Failures come back as values: every result has a ``status`` and failed
+        ones an ``error`` detail, nothing is logged unless asked for.
+
+        Args:
+            max_bytes (int): The number of bytes a single probe may buffer; inputs
+                needing more come back with a ``too_large`` status.
+            connect_timeout (float): Seconds allowed to connect to a URL.
+            read_timeout (float): Seconds allowed between two reads of a response.
+            deadline (float): Seconds allowed for the whole batch. Probes still
+                running then are cancelled and come back with a ``timeout`` status.
+            retry (RetryPolicy): How URL fetches are retried and hedged; the
+                counts are kept in ``probe_stats``.
+            summary (bool): Also return the summary of the batch's failures,
+                see summarize().
+            log_errors (bool): Log failed probes through ``error_log``, which
+                is rate limited.
+            client (HttpClient): The HTTP client to fetch URLs with. By default
+                one is opened for the batch and closed at its end.
+            fields: The fields of the results, such as ``{'type', 'width'}``,
+                or ``'+orientation,+frames'`` to add to the default ``type``,
+                ``width`` and ``height``; extended fields are read only when
+                asked for. See resolve_fields().
+
+        Returns:
+            List[dict]: The results in input order, or a tuple of the results
+            and their summary.
+
+        Raises:
+            ValueError: On an unknown field name.
+        """
+        timeout = (connect_timeout, read_timeout)
+        fields = resolve_fields(fields)
+        batch_client = client or HttpClient()
+        results = [None] * len(input)
+
+        async def process(index):
+            results[index] = await cls.__processor(input[index], max_bytes, timeout, retry, log_errors,
+                                                   batch_client, fields)
+
+        hosts, tasks = OrderedDict(), []
+        for index, item in enumerate(input):
+            backend = backend_for(item)
+            if backend is not None and backend.remote:
+                hosts.setdefault(source_host(item), deque()).append(index)
+            else:
+                tasks.append(asyncio.ensure_future(process(index)))
+        if hosts:
+            tasks.append(asyncio.ensure_future(cls.__drain_hosts(hosts, input, process, batch_client)))
+        try:
+            if tasks:
+                _, pending = await asyncio.wait(tasks, timeout=deadline)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.wait(pending)
+            results = [failure(STATUS_TIMEOUT, 'batch deadline exceeded') if result is None else result
+                       for result in results]
+        finally:
+            if client is None:
+                await batch_client.close()
+        return (results, cls.summarize(input, results)) if summary else results
+
+    @classmethod
+    async def scan_archive(cls, path: str, max_bytes: int = MAX_PROBE_BYTES) -> AsyncIterator[tuple]:
+        """
+        Probe every file in a zip or tar archive without extracting it: only the
+        leading bytes of each member are read, or decompressed.
+
+        Args:
+            path (str): The path of the archive.
+            max_bytes (int): The number of bytes a single probe may read.
+
+        Yields:
+            tuple: The member name and its probe result, as each member is probed.
+        """
+        import imgspy_archive
+        async for item in imgspy_archive.scan(path, max_bytes):
+            yield item
+
+    @classmethod
+    async def watch(cls, path: str, max_bytes: int = MAX_PROBE_BYTES, **options) -> AsyncIterator[tuple]:
+        """
+        Probe the image files written into a directory as they land: through
+        inotify on Linux, once each file is closed after writing, and by
+        scanning the directory elsewhere.
+
+        Args:
+            path (str): The directory to watch.
+            max_bytes (int): The number of bytes a single probe may read.
+            options: ``debounce``, ``poll_interval`` and ``poll``, see ``imgspy_watch.watch``.
+
+        Yields:
+            tuple: The path of each image file written and its probe result.
+        """
+        import imgspy_watch
+        async for item in imgspy_watch.watch(path, max_bytes, **options):
+            yield item
+
+    @staticmethod
+    def summarize(inputs, results: List[dict]) -> dict:
+        """
+        Aggregate a batch's results.
+
+        Returns:
+            dict: The number of results and of failures, the count of each
+            status, and the count of each failure status by source host.
+        """
+        by_status, by_host = Counter(), {}
+        for input, result in zip(inputs, results):
+            status = result['status']
+            by_status[status] += 1
+            if status != STATUS_OK:
+                by_host.setdefault(source_host(input), Counter())[status] += 1
+        return {
+            'total': len(results),
+            'failed': len(results) - by_status[STATUS_OK],
+            'by_status': by_status,
+            'by_host': by_host,
+        }
+
+    @staticmethod
+    async def __drain_hosts(hosts: OrderedDict, inputs, process, client: HttpClient) -> None:
+        """
+        Probe remote inputs host by host, in the order the hosts first appear.
+
+        Each host gets up to ``connections_per_host`` workers draining its queue
+        over the same keep-alive connections, and no more workers than the
+        client's connections run at once. The next hosts in line are resolved
+        ahead of their turn, and a host waiting for workers has connections
+        opened to it in the meantime.
+
+        Args:
+            hosts (OrderedDict): The queue of input indexes of each host.
+            inputs: The batch's inputs.
+            process: The coroutine function probing one input by index.
+            client (HttpClient): The HTTP client of the batch.
         """
-        tasks = [cls.__processor(i) for i in input]
-        return await asyncio.gather(*tasks)
+        slots = asyncio.Semaphore(client.connections)
+        queues = list(hosts.values())
+        workers, helpers = [], []
+
+        def ahead(position, helper):
+            if position < len(queues) and isinstance(backend_for(inputs[queues[position][0]]), HttpBackend):
+                helpers.append(asyncio.ensure_future(helper(inputs[queues[position][0]])))
+
+        async def worker(queue):
+            try:
+                while queue:
+                    await process(queue.popleft())
+            finally:
+                slots.release()
+
+        try:
+            for position in range(DEFAULT_PREFETCH_HOSTS):
+                ahead(position, client.prefetch)
+            for position, queue in enumerate(queues):
+                ahead(position + DEFAULT_PREFETCH_HOSTS, client.prefetch)
+                if slots.locked():
+                    ahead(position, lambda url: client.warm(url, min(len(queue), client.warm_connections)))
+                for _ in range(min(len(queue), client.connections_per_host)):
+                    await slots.acquire()
+                    workers.append(asyncio.ensure_future(worker(queue)))
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers + helpers:
+                task.cancel()
+            if workers or helpers:
+                await asyncio.wait(workers + helpers)
 
     @classmethod
-    async def __processor(cls, input) -> List[dict]:
+    async def __processor(cls, input, max_bytes: int = MAX_PROBE_BYTES, timeout: tuple = None,
+                          retry: RetryPolicy = None, log_errors: bool = False,
+                          client: HttpClient = None, fields: frozenset = DEFAULT_FIELDS) -> dict:
         """
         Process the input source.
 
         Returns:
-            List[dict]: List of image metadata.
+            dict: The image metadata or the failure.
         """
         try:
-            probe = Probe()
+            probe = Probe(max_bytes=max_bytes, timeout=timeout, retry=retry, client=client, fields=fields)
             result = await probe.get_info(input)
         except Exception as e:
-            logging.error(f"Error while processing {input}: {e}")
-        finally:
-            return result
+            result = failure(STATUS_ERROR, type(e).__name__)
+        if log_errors and result['status'] != STATUS_OK:
+            error_log.log(input, result)
+        return result
+
+
+class Runner:
+    """Long-lived event loop on a background thread, serving synchronous callers"""
+
+    def __init__(self, client: HttpClient = None) -> None:
+        """
+        Initialize the Runner object. The thread starts on first use.
+
+        Args:
+            client (HttpClient): The HTTP client kept open across calls.
+        """
+        self.client = client or HttpClient()
+        self.__loop = None
+        self.__thread = None
+        self.__lock = threading.Lock()
+
+    def __start(self) -> asyncio.AbstractEventLoop:
+        """
+        Start the loop thread unless it is running.
+
+        Returns:
+            asyncio.AbstractEventLoop: The runner's loop.
+        """
+        with self.__lock:
+            if self.__thread is None:
+                self.__loop = asyncio.new_event_loop()
+                self.__thread = threading.Thread(target=self.__loop.run_forever, name='imgspy-runner', daemon=True)
+                self.__thread.start()
+                atexit.register(self.close)
+            return self.__loop
+
+    def submit(self, input, **options) -> concurrent.futures.Future:
+        """
+        Probe one input on the runner's loop.
+
+        Args:
+            input: The input source.
+            **options: Keyword arguments of Imgspy.info().
+
+        Returns:
+            concurrent.futures.Future: The future of the probe result.
+        """
+        return asyncio.run_coroutine_threadsafe(self.__probe(input, options), self.__start())
+
+    def info_many(self, inputs, **options) -> List[dict]:
+        """
+        Probe a batch of inputs on the runner's loop and wait for the results.
+
+        Args:
+            inputs: The input sources.
+            **options: Keyword arguments of Imgspy.info().
+
+        Returns:
+            List[dict]: The results in input order.
+        """
+        coroutine = Imgspy.info(*inputs, client=self.client, **options)
+        return asyncio.run_coroutine_threadsafe(coroutine, self.__start()).result()
+
+    async def __probe(self, input, options: dict) -> dict:
+        results = await Imgspy.info(input, client=self.client, **options)
+        return results[0]
+
+    def close(self) -> None:
+        """
+        Close the HTTP client and stop the loop thread.
+        """
+        with self.__lock:
+            loop, thread = self.__loop, self.__thread
+            self.__loop = self.__thread = None
+        if thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.client.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        atexit.unregister(self.close)
+
+
+runner = Runner()
+
+
+def submit(input, **options) -> concurrent.futures.Future:
+    """
+    Probe one input on the shared background loop, from synchronous code.
+
+    Returns:
+        concurrent.futures.Future: The future of the probe result.
+    """
+    return runner.submit(input, **options)
+
+
+def info_many(inputs, **options) -> List[dict]:
+    """
+    Probe a batch of inputs on the shared background loop, from synchronous
+    code. Connections, DNS and caches stay warm across calls.
+
+    Returns:
+        List[dict]: The results in input order.
+    """
+    return runner.info_many(inputs, **options)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        format="%(asctime)s %(levelname)s:%(name)s: %(message)s",
+        level=logging.DEBUG,
+        datefmt="%H:%M:%S",
+        stream=sys.stderr,
+    )
+
     async def main():
 
         urls = ['http://via.placeholderssss.com/1920x1080',
@@ -408,10 +2616,14 @@ if __name__ == "__main__":
         KAAAAD0lEQVR42mNk+M9QzwAEAAmGAYCF+yOnAAAAAElFTkSuQmCC''',
         "/home/belovedtech/Downloads/6-Figure3-1.png"]
 
-        results = await Imgspy.info(*urls)
-        expected_result = [None, {'type': 'png', 'width': 1920, 'height': 1080}, {'type': 'png', 'width': 1920, 'height': 1080}, {'type': 'png', 'width': 2, 'height': 1}, {'type': 'png', 'width': 2, 'height': 1}, {'type': 'png', 'width': 1192, 'height': 550}]
+        results, summary = await Imgspy.info(*urls, summary=True, log_errors=True)
+        expected_result = ['connection_error', {'type': 'png', 'width': 1920, 'height': 1080, 'status': 'ok'}, {'type': 'png', 'width': 1920, 'height': 1080, 'status': 'ok'}, {'type': 'png', 'width': 2, 'height': 1, 'status': 'ok'}, {'type': 'png', 'width': 2, 'height': 1, 'status': 'ok'}, {'type': 'png', 'width': 1192, 'height': 550, 'status': 'ok'}]
 
-        assert results == expected_result
+        # how each URL was read varies with the server, so 'strategy' is left out
+        assert results[0]['status'] == expected_result[0]
+        assert [{key: value for key, value in result.items() if key != 'strategy'}
+                for result in results[1:]] == expected_result[1:]
+        print(summary)
 
     asyncio.run(main())
 
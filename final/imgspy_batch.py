@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+imgspy batch
+======
+
+Probes a manifest of inputs, one per line, into a JSON Lines file of results,
+and survives being killed part way. The manifest is read and probed a chunk at a
+time, results are appended in manifest order, and a small checkpoint records how
+far the manifest and the results file have got. A restarted run cuts the results
+file back to the checkpoint and carries on from the line after it, so every
+input ends up in the results exactly once.
+
+usage
+-----
+::
+    $ python imgspy_batch.py urls.txt results.jsonl --chunk-size 1000
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+
+from imgspy_asyncio import Imgspy, HttpClient
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CHUNKS_IN_FLIGHT = 2
+DEFAULT_CHECKPOINT_INTERVAL = 5.0
+
+
+class BatchRunner:
+    """Checkpointed, resumable probing of a manifest into a JSON Lines file"""
+
+    def __init__(self, manifest: str, output: str, checkpoint: str = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, chunks_in_flight: int = DEFAULT_CHUNKS_IN_FLIGHT,
+                 checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL, **options) -> None:
+        """
+        Initialize the BatchRunner object.
+
+        Args:
+            manifest (str): The file of inputs, one per line; blank lines are skipped.
+            output (str): The JSON Lines file results are appended to, each with
+                the ``line`` and ``input`` it belongs to.
+            checkpoint (str): The checkpoint file, ``output`` + ``.checkpoint`` by default.
+            chunk_size (int): The inputs probed together by one ``Imgspy.info`` call.
+            chunks_in_flight (int): The chunks probed at once, so that a slow
+                input does not hold up the whole run.
+            checkpoint_interval (float): The seconds between two checkpoints.
+            options: Passed on to ``Imgspy.info``.
+        """
+        self.manifest = manifest
+        self.output = output
+        self.checkpoint = checkpoint or output + '.checkpoint'
+        self.chunk_size = chunk_size
+        self.chunks_in_flight = chunks_in_flight
+        self.checkpoint_interval = checkpoint_interval
+        self.options = options
+
+    def load_checkpoint(self) -> dict:
+        """
+        Read the checkpoint of an earlier run of the same manifest.
+
+        Returns:
+            dict: The lines done, the manifest and output offsets they end at,
+            and whether the run completed; a fresh start without a checkpoint.
+
+        Raises:
+            ValueError: When the checkpoint belongs to another manifest, or the
+                manifest has shrunk since.
+        """
+        try:
+            with open(self.checkpoint) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return {'manifest': os.path.abspath(self.manifest), 'line': 0, 'manifest_offset': 0,
+                    'output_offset': 0, 'complete': False}
+        if state['manifest'] != os.path.abspath(self.manifest) \
+                or os.path.getsize(self.manifest) < state['manifest_offset']:
+            raise ValueError(f'{self.checkpoint} does not belong to {self.manifest}')
+        return state
+
+    def save_checkpoint(self, state: dict, output) -> None:
+        """
+        Make the results written so far durable, then record them in the
+        checkpoint, which is replaced atomically.
+        """
+        output.flush()
+        os.fsync(output.fileno())
+        state['output_offset'] = output.tell()
+        temporary = self.checkpoint + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.checkpoint)
+
+    @staticmethod
+    def read_chunk(manifest, line: int, size: int) -> tuple:
+        """
+        Read up to ``size`` inputs from the manifest.
+
+        Returns:
+            tuple: The line numbers and inputs read, and the line number after
+            the last line read.
+        """
+        lines, inputs = [], []
+        while len(inputs) < size:
+            raw = manifest.readline()
+            if not raw:
+                break
+            item = raw.decode('utf-8').strip()
+            if item:
+                lines.append(line)
+                inputs.append(item)
+            line += 1
+        return lines, inputs, line
+
+    async def run(self) -> dict:
+        """
+        Probe the manifest from the last checkpoint on.
+
+        Returns:
+            dict: The line the run resumed from, and the inputs it probed.
+        """
+        state = self.load_checkpoint()
+        resumed_from, probed = state['line'], 0
+        if state['complete']:
+            return {'resumed_from': resumed_from, 'probed': 0}
+        client = HttpClient()
+        pending = deque()
+        with open(self.manifest, 'rb') as manifest, open(self.output, 'ab') as output:
+            if output.seek(0, os.SEEK_END) < state['output_offset']:
+                raise ValueError(f'{self.output} is shorter than its checkpoint')
+            manifest.seek(state['manifest_offset'])
+            output.truncate(state['output_offset'])
+            output.seek(state['output_offset'])
+            line, last_checkpoint = state['line'], time.monotonic()
+            try:
+                while True:
+                    while len(pending) < self.chunks_in_flight:
+                        lines, inputs, line = self.read_chunk(manifest, line, self.chunk_size)
+                        if not inputs:
+                            break
+                        task = asyncio.ensure_future(Imgspy.info(*inputs, client=client, **self.options))
+                        pending.append((lines, inputs, line, manifest.tell(), task))
+                    if not pending:
+                        break
+                    lines, inputs, end_line, end_offset, task = pending.popleft()
+                    for number, item, result in zip(lines, inputs, await task):
+                        output.write(json.dumps(dict(result, line=number, input=item)).encode() + b'\n')
+                    probed += len(inputs)
+                    state.update(line=end_line, manifest_offset=end_offset)
+                    if time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                        self.save_checkpoint(state, output)
+                        last_checkpoint = time.monotonic()
+                state['complete'] = True
+                self.save_checkpoint(state, output)
+            finally:
+                for *_, task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.wait([task for *_, task in pending])
+                await client.close()
+        return {'resumed_from': resumed_from, 'probed': probed}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('manifest')
+    parser.add_argument('output')
+    parser.add_argument('--checkpoint')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--checkpoint-interval', type=float, default=DEFAULT_CHECKPOINT_INTERVAL)
+    args = parser.parse_args(argv)
+
+    runner = BatchRunner(args.manifest, args.output, args.checkpoint, args.chunk_size,
+                         checkpoint_interval=args.checkpoint_interval)
+    stats = asyncio.run(runner.run())
+    print(f"resumed from line {stats['resumed_from']}, probed {stats['probed']} inputs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
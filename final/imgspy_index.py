@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+imgspy index
+======
+
+Writes probe results into a compact binary index, and looks them up again
+through a memory map, so that downstream jobs neither probe the images again
+nor parse JSON dumps of the results. Opening an index reads its header and
+its table of type and status names, whatever the number of entries.
+
+The file holds a header, the names table, fixed-width records sorted by a
+64-bit hash of their key, and a heap of the keys themselves::
+
+    header   magic, version, names length, count, records and heap offsets
+    names    type and status names, newline separated; code 0 is ''
+    records  hash (8s), width (i), height (i), type (B), status (B), pad,
+             key offset (Q) and length (I) in the heap; big-endian, 32 bytes
+    heap     the UTF-8 keys
+
+A lookup binary searches the records by hash and compares the keys of the
+records sharing it. Only the width, height, type and status of a result are
+kept. Sizes are signed, as a BMP stored top-down reports a negative height, and
+a size the result lacks, such as that of an SVG without one, is stored as
+``MISSING`` and read back as None.
+
+usage
+-----
+::
+    $ python imgspy_index.py export results.jsonl results.idx
+    $ python imgspy_index.py get results.idx https://example.com/cat.png
+
+    >>> with Index('results.idx') as index:
+    ...     index.get('https://example.com/cat.png')
+    {'type': 'png', 'width': 640, 'height': 480, 'status': 'ok'}
+"""
+import os
+import sys
+import json
+import mmap
+import heapq
+import shutil
+import struct
+import hashlib
+import argparse
+import tempfile
+from typing import Iterable, Iterator
+
+from imgspy_asyncio import STATUS_OK
+
+MAGIC = b'IMGSPYX1'
+VERSION = 2
+HEADER = struct.Struct('>8sIIQQQ')
+RECORD = struct.Struct('>8siiBB2xQI')
+MAX_NAMES = 256
+
+# the width or height stored for a result without one
+MISSING = -2 ** 31
+
+# records sorted in memory before they are spilled to a run file
+DEFAULT_RUN_SIZE = 1000000
+
+
+def key_hash(key: bytes) -> bytes:
+    return hashlib.blake2b(key, digest_size=8).digest()
+
+
+def write_index(path: str, items: Iterable[tuple], run_size: int = DEFAULT_RUN_SIZE) -> int:
+    """
+    Write probe results into an index, replacing the file atomically.
+
+    Records are sorted ``run_size`` at a time and the sorted runs merged, so
+    the memory used does not grow with the number of results.
+
+    Args:
+        path (str): The index file.
+        items (Iterable[tuple]): The keys, unique, and their result dicts.
+        run_size (int): The records sorted in memory at once.
+
+    Returns:
+        int: The number of entries written.
+
+    Raises:
+        ValueError: When the results use more than 255 type and status names,
+            or a size does not fit 32 signed bits.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    names = {'': 0}
+
+    def code(name: str) -> int:
+        if name not in names:
+            if len(names) == MAX_NAMES:
+                raise ValueError(f'more than {MAX_NAMES - 1} type and status names')
+            names[name] = len(names)
+        return names[name]
+
+    runs, run, count, heap_size = [], [], 0, 0
+    try:
+        with tempfile.TemporaryFile(dir=directory) as heap:
+            for key, result in items:
+                data = key.encode('utf-8')
+                run.append(RECORD.pack(key_hash(data), size(result.get('width')), size(result.get('height')),
+                                       code(result.get('type') or ''), code(result.get('status', STATUS_OK)),
+                                       heap_size, len(data)))
+                heap.write(data)
+                heap_size += len(data)
+                count += 1
+                if len(run) >= run_size:
+                    runs.append(spill(run, directory))
+                    run = []
+            run.sort()
+
+            table = '\n'.join(names).encode('utf-8')
+            records_offset = -(-(HEADER.size + len(table)) // RECORD.size) * RECORD.size
+            heap_offset = records_offset + count * RECORD.size
+            temporary = path + '.tmp'
+            with open(temporary, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, len(table), count, records_offset, heap_offset))
+                f.write(table.ljust(records_offset - HEADER.size, b'\x00'))
+                for record in heapq.merge(run, *(read_run(r) for r in runs)):
+                    f.write(record)
+                heap.seek(0)
+                shutil.copyfileobj(heap, f)
+            os.replace(temporary, path)
+    finally:
+        for r in runs:
+            r.close()
+    return count
+
+
+def size(value: int) -> int:
+    """
+    Encode a width or height, None as ``MISSING``.
+    """
+    if value is None:
+        return MISSING
+    if not MISSING < value < 2 ** 31:
+        raise ValueError(f'size {value} does not fit an index record')
+    return value
+
+
+def spill(run: list, directory: str):
+    """
+    Sort a run of records into a temporary file.
+    """
+    run.sort()
+    f = tempfile.TemporaryFile(dir=directory)
+    f.write(b''.join(run))
+    f.seek(0)
+    return f
+
+
+def read_run(f) -> Iterator[bytes]:
+    while True:
+        records = f.read(RECORD.size * 4096)
+        if not records:
+            return
+        for offset in range(0, len(records), RECORD.size):
+            yield records[offset:offset + RECORD.size]
+
+
+class Index:
+    """Probe results looked up by key through a memory-mapped index"""
+
+    def __init__(self, path: str) -> None:
+        """
+        Map the index and read its header and names table.
+
+        Raises:
+            ValueError: When the file is not an index of this version.
+        """
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, names_length, self.count, self.records_offset, self.heap_offset = \
+                HEADER.unpack_from(self.map)
+        except struct.error:
+            magic = version = None
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError(f'{path} is not an imgspy index')
+        self.names = self.map[HEADER.size:HEADER.size + names_length].decode('utf-8').split('\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key: str) -> dict:
+        result = self.get(key)
+        if result is None:
+            raise KeyError(key)
+        return result
+
+    def get(self, key: str, default: dict = None) -> dict:
+        """
+        Look a key up in O(log n).
+
+        Returns:
+            dict: The result of the key, or ``default`` when it is not indexed.
+        """
+        data = key.encode('utf-8')
+        digest = key_hash(data)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            offset = self.records_offset + middle * RECORD.size
+            if self.map[offset:offset + 8] < digest:
+                low = middle + 1
+            else:
+                high = middle
+        for position in range(low, self.count):
+            record = RECORD.unpack_from(self.map, self.records_offset + position * RECORD.size)
+            if record[0] != digest:
+                break
+            if self.__key(record) == data:
+                return self.__result(record)
+        return default
+
+    def items(self) -> Iterator[tuple]:
+        """
+        Iterate the keys and results in hash order.
+        """
+        for position in range(self.count):
+            record = RECORD.unpack_from(self.map, self.records_offset + position * RECORD.size)
+            yield self.__key(record).decode('utf-8'), self.__result(record)
+
+    def __key(self, record: tuple) -> bytes:
+        offset = self.heap_offset + record[5]
+        return self.map[offset:offset + record[6]]
+
+    def __result(self, record: tuple) -> dict:
+        _, width, height, type, status, _, _ = record
+        if self.names[status] != STATUS_OK:
+            return {'status': self.names[status]}
+        return {'type': self.names[type], 'width': None if width == MISSING else width,
+                'height': None if height == MISSING else height, 'status': STATUS_OK}
+
+    def close(self) -> None:
+        self.map.close()
+
+
+def read_results(path: str, key: str = 'input') -> Iterator[tuple]:
+    """
+    Read the JSON Lines results ``imgspy_batch`` writes.
+
+    Yields:
+        tuple: The ``key`` field of each result and the result.
+    """
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                result = json.loads(line)
+                yield result[key], result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help='index a JSON Lines file of results')
+    export.add_argument('results')
+    export.add_argument('index')
+    export.add_argument('--key', default='input')
+    get = commands.add_parser('get', help='look keys up in an index')
+    get.add_argument('index')
+    get.add_argument('keys', nargs='+')
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        print(f'{write_index(args.index, read_results(args.results, args.key))} entries indexed')
+        return 0
+    with Index(args.index) as index:
+        results = [index.get(key) for key in args.keys]
+    for key, result in zip(args.keys, results):
+        print(key, json.dumps(result))
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
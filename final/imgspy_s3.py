@@ -0,0 +1,273 @@
+# coding: utf-8
+"""
+imgspy s3
+======
+
+Backend for ``s3://bucket/key`` inputs of S3-compatible object stores. Only the
+header bytes of an object are fetched, with a Signature V4 signed ranged GET over
+the pooled connections of an ``HttpClient``, and whole prefixes can be probed
+page by page through ListObjectsV2.
+
+Credentials, region and endpoint default to the usual ``AWS_*`` environment
+variables; without credentials, requests are sent unsigned.
+
+usage
+-----
+::
+    import imgspy_s3
+    from imgspy_asyncio import Imgspy
+
+    >>> backend = imgspy_s3.register(endpoint_url='http://localhost:9000')
+    >>> await Imgspy.info('s3://images/cat.png')
+    [{'type': 'png', 'width': 640, 'height': 480, 'status': 'ok'}]
+    >>> async for uri, result in backend.info_prefix('s3://images/2023/'):
+    ...     print(uri, result)
+"""
+import os
+import hmac
+import asyncio
+import hashlib
+import datetime
+from urllib.parse import urlsplit, quote, unquote
+from typing import AsyncIterator, List
+
+from imgspy_asyncio import Backend, HttpClient, HttpStatusError, Imgspy, backends, register_backend, \
+    _import_aiohttp
+
+DEFAULT_REGION = 'us-east-1'
+DEFAULT_PAGE_SIZE = 1000
+
+# Hash sent instead of the payload's: GETs have none worth hashing.
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+
+
+def split_uri(uri: str) -> tuple:
+    """
+    Split an ``s3://bucket/key`` URI.
+
+    Returns:
+        tuple: The bucket and the key.
+    """
+    parts = urlsplit(uri)
+    return parts.netloc, parts.path[1:]
+
+
+def sign(method: str, url: str, headers: dict, region: str, access_key: str, secret_key: str,
+         now: datetime.datetime = None, payload_hash: str = UNSIGNED_PAYLOAD) -> dict:
+    """
+    Sign a request with AWS Signature Version 4.
+
+    Args:
+        method (str): The HTTP method.
+        url (str): The request URL, its path and query already percent-encoded.
+        headers (dict): The headers to sign besides ``host``.
+        region (str): The region of the store.
+        access_key (str): The access key id.
+        secret_key (str): The secret access key.
+        now (datetime.datetime): The signing time, the current UTC time by default.
+        payload_hash (str): The hex SHA-256 of the body, or ``UNSIGNED-PAYLOAD``.
+
+    Returns:
+        dict: The headers to send, including ``x-amz-date``,
+        ``x-amz-content-sha256`` and ``Authorization``.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    date = amz_date[:8]
+    parts = urlsplit(url)
+
+    signed = {k.lower(): str(v).strip() for k, v in headers.items()}
+    signed.update({'host': parts.netloc, 'x-amz-date': amz_date, 'x-amz-content-sha256': payload_hash})
+    names = sorted(signed)
+    # the query is decoded first, so that it is encoded exactly once
+    query = '&'.join(sorted(
+        '='.join(quote(unquote(p), safe='-_.~') for p in (pair.partition('=')[0], pair.partition('=')[2]))
+        for pair in parts.query.split('&') if pair))
+    canonical = '\n'.join([method, parts.path or '/', query,
+                           ''.join(f'{n}:{signed[n]}\n' for n in names), ';'.join(names), payload_hash])
+
+    scope = f'{date}/{region}/s3/aws4_request'
+    string_to_sign = '\n'.join(['AWS4-HMAC-SHA256', amz_date, scope,
+                                hashlib.sha256(canonical.encode()).hexdigest()])
+    key = ('AWS4' + secret_key).encode()
+    for part in (date, region, 's3', 'aws4_request'):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    signed.pop('host')
+    signed['authorization'] = (f'AWS4-HMAC-SHA256 Credential={access_key}/{scope}, '
+                               f'SignedHeaders={";".join(names)}, Signature={signature}')
+    return signed
+
+
+class S3Backend(Backend):
+    """Ranged reads and listings of an S3-compatible object store"""
+
+    def __init__(self, endpoint_url: str = None, region: str = None, access_key: str = None,
+                 secret_key: str = None, session_token: str = None, virtual_host: bool = None,
+                 client: HttpClient = None) -> None:
+        """
+        Initialize the S3Backend object.
+
+        Args:
+            endpoint_url (str): The store's URL, AWS S3 of the region by default.
+            region (str): The region requests are signed for.
+            access_key (str): The access key id; requests are unsigned without one.
+            secret_key (str): The secret access key.
+            session_token (str): The token of temporary credentials.
+            virtual_host (bool): Address buckets as ``bucket.host`` rather than
+                ``host/bucket``; the default for AWS, not for other endpoints.
+            client (HttpClient): The pooled HTTP client requests are sent with.
+        """
+        env = os.environ.get
+        self.region = region or env('AWS_REGION') or env('AWS_DEFAULT_REGION') or DEFAULT_REGION
+        endpoint_url = endpoint_url or env('AWS_ENDPOINT_URL_S3') or env('AWS_ENDPOINT_URL')
+        if virtual_host is None:
+            virtual_host = endpoint_url is None
+        self.endpoint_url = (endpoint_url or f'https://s3.{self.region}.amazonaws.com').rstrip('/')
+        self.virtual_host = virtual_host
+        self.access_key = access_key or env('AWS_ACCESS_KEY_ID')
+        self.secret_key = secret_key or env('AWS_SECRET_ACCESS_KEY')
+        self.session_token = session_token or env('AWS_SESSION_TOKEN')
+        self.client = client or HttpClient()
+
+    def url(self, bucket: str, key: str = '', query: str = '') -> str:
+        """
+        Build the percent-encoded URL of an object, or of a bucket without ``key``.
+        """
+        scheme, _, host = self.endpoint_url.partition('://')
+        path = quote(key, safe='/-_.~')
+        if self.virtual_host:
+            url = f'{scheme}://{bucket}.{host}/{path}'
+        else:
+            url = f'{self.endpoint_url}/{bucket}/{path}' if key else f'{self.endpoint_url}/{bucket}'
+        return url + ('?' + query if query else '')
+
+    async def request(self, url: str, headers: dict = None):
+        """
+        Send a signed GET.
+
+        Returns:
+            aiohttp.ClientResponse: The response, to be used as a context manager.
+        """
+        headers = dict(headers or {})
+        if self.session_token:
+            headers['x-amz-security-token'] = self.session_token
+        if self.access_key and self.secret_key:
+            headers = sign('GET', url, headers, self.region, self.access_key, self.secret_key)
+        from yarl import URL
+        session = await self.client.session()
+        return session.get(URL(url, encoded=True), headers=headers)
+
+    async def read_range(self, uri: str, start: int, length: int) -> tuple:
+        """
+        Fetch ``length`` bytes of an object from offset ``start``.
+
+        aiohttp errors are raised as ConnectionError and timeouts as
+        asyncio.TimeoutError, so that they are retried.
+
+        Returns:
+            tuple: The bytes read and the full size of the object.
+        """
+        try:
+            return await self.__read_range(uri, start, length)
+        except asyncio.TimeoutError:
+            raise
+        except _import_aiohttp().ClientError as e:
+            raise ConnectionError(f'{type(e).__name__}: {e}') from e
+
+    async def __read_range(self, uri: str, start: int, length: int) -> tuple:
+        bucket, key = split_uri(uri)
+        headers = {'Range': f'bytes={start}-{start + length - 1}'}
+        async with await self.request(self.url(bucket, key), headers) as response:
+            if response.status in (404, 410):
+                raise FileNotFoundError(uri)
+            if response.status >= 500 or response.status == 429:
+                raise ConnectionError(f'HTTP {response.status}')
+            if response.status == 416:
+                return b'', 0
+            if response.status not in (200, 206):
+                raise HttpStatusError(response.status)
+            chunks, received = [], 0
+            while received < length:
+                chunk = await response.content.read(length - received)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                received += len(chunk)
+            data = b''.join(chunks)
+            size = response.content_length
+            if response.status == 206:
+                total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                size = int(total) if total.isdigit() else None
+            return data, size
+
+    async def list(self, uri: str, page_size: int = DEFAULT_PAGE_SIZE) -> AsyncIterator[List[str]]:
+        """
+        List the objects under an ``s3://bucket/prefix`` URI with ListObjectsV2.
+
+        Args:
+            uri (str): The bucket and key prefix.
+            page_size (int): The keys asked for per request.
+
+        Yields:
+            List[str]: The ``s3://`` URIs of one page of objects.
+        """
+        import xml.etree.ElementTree as ElementTree
+        bucket, prefix = split_uri(uri)
+        token = None
+        while True:
+            params = {'list-type': '2', 'max-keys': str(page_size), 'prefix': prefix}
+            if token:
+                params['continuation-token'] = token
+            query = '&'.join(f"{k}={quote(v, safe='-_.~')}" for k, v in sorted(params.items()))
+            async with await self.request(self.url(bucket, query=query)) as response:
+                if response.status == 404:
+                    raise FileNotFoundError(uri)
+                if response.status != 200:
+                    raise OSError(f'HTTP {response.status}')
+                root = ElementTree.fromstring(await response.read())
+            yield [f's3://{bucket}/{key.text}' for key in root.iterfind('{*}Contents/{*}Key')]
+            token = root.findtext('{*}NextContinuationToken')
+            if root.findtext('{*}IsTruncated') != 'true' or not token:
+                break
+
+    async def info_prefix(self, uri: str, page_size: int = DEFAULT_PAGE_SIZE, **options):
+        """
+        Probe every object under an ``s3://bucket/prefix`` URI, one listing page
+        at a time.
+
+        Args:
+            uri (str): The bucket and key prefix.
+            page_size (int): The objects listed and probed per batch.
+            options: Passed on to ``Imgspy.info``.
+
+        Yields:
+            tuple: The URI of an object and its probe result.
+        """
+        if backends.get('s3') is not self:
+            raise ValueError('the backend is not registered for s3://, see register()')
+        async for page in self.list(uri, page_size):
+            for item in zip(page, await Imgspy.info(*page, **options)):
+                yield item
+
+    async def close(self) -> None:
+        """
+        Close the pooled connections.
+        """
+        await self.client.close()
+
+
+def register(**config) -> S3Backend:
+    """
+    Probe ``s3://`` inputs through a new S3Backend.
+
+    Args:
+        config: Passed on to S3Backend.
+
+    Returns:
+        S3Backend: The registered backend.
+    """
+    backend = S3Backend(**config)
+    register_backend('s3', backend)
+    return backend
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+imgspy shard
+======
+
+Splits one manifest across several machines. The manifest is cut into shards of
+consecutive lines, recorded in a SQLite work queue that every node can reach,
+for instance on a shared filesystem. Workers claim a shard under a lease, keep
+the lease alive with heartbeats while they probe it, and write the shard's
+results to a file of their own; a shard whose worker stops heartbeating is
+handed out again once its lease expires.
+
+Leases are compared against the wall clock, so the nodes' clocks should agree
+to well within the lease.
+
+usage
+-----
+::
+    $ python imgspy_shard.py split queue.db urls.txt --shard-size 10000
+    $ python imgspy_shard.py work queue.db results/      # on every node
+    $ python imgspy_shard.py merge queue.db results/ results.jsonl
+"""
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import asyncio
+import argparse
+import functools
+import concurrent.futures
+
+from imgspy_asyncio import Imgspy, HttpClient
+
+DEFAULT_SHARD_SIZE = 10000
+DEFAULT_LEASE = 60.0
+DEFAULT_CHUNK_SIZE = 1000
+# seconds between two looks at the queue while the shards left are leased to
+# other workers
+DEFAULT_POLL_INTERVAL = 1.0
+
+SHARD_PENDING = 'pending'
+SHARD_LEASED = 'leased'
+SHARD_DONE = 'done'
+
+
+class ShardQueue:
+    """Work queue of manifest shards in a shared SQLite database"""
+
+    def __init__(self, path: str, lease: float = DEFAULT_LEASE) -> None:
+        """
+        Open the queue, creating it when needed.
+
+        Args:
+            path (str): The SQLite database shared by the coordinator and workers.
+            lease (float): The seconds a claimed shard stays with its worker
+                without a heartbeat.
+        """
+        self.path = path
+        self.lease = lease
+        # workers call the queue from an executor thread, one call at a time
+        self.db = sqlite3.connect(path, timeout=60.0, isolation_level=None, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('CREATE TABLE IF NOT EXISTS shards ('
+                        'id INTEGER PRIMARY KEY, manifest TEXT, first_line INTEGER, '
+                        'start INTEGER, end INTEGER, state TEXT, worker TEXT, '
+                        'expires REAL, attempts INTEGER DEFAULT 0)')
+
+    def split(self, manifest: str, shard_size: int = DEFAULT_SHARD_SIZE) -> int:
+        """
+        Cut the manifest into shards of ``shard_size`` lines, by byte offset.
+
+        Returns:
+            int: The number of shards queued.
+
+        Raises:
+            ValueError: When the queue already holds shards.
+        """
+        shards, line, start = [], 0, 0
+        manifest = os.path.abspath(manifest)
+        with open(manifest, 'rb') as f:
+            while True:
+                count = 0
+                while count < shard_size and f.readline():
+                    count += 1
+                if not count:
+                    break
+                shards.append((manifest, line, start, f.tell(), SHARD_PENDING))
+                line, start = line + count, f.tell()
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            if self.db.execute('SELECT COUNT(*) FROM shards').fetchone()[0]:
+                raise ValueError(f'{self.path} already holds shards')
+            self.db.executemany('INSERT INTO shards (manifest, first_line, start, end, state) '
+                                'VALUES (?, ?, ?, ?, ?)', shards)
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+        self.db.execute('COMMIT')
+        return len(shards)
+
+    def claim(self, worker: str) -> dict:
+        """
+        Lease the first pending shard, or the first one whose lease has expired.
+
+        Returns:
+            dict: The shard, or None when every shard is done or leased.
+        """
+        now = time.time()
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.db.execute('SELECT * FROM shards WHERE state = ? OR (state = ? AND expires < ?) '
+                                  'ORDER BY id LIMIT 1', (SHARD_PENDING, SHARD_LEASED, now)).fetchone()
+            if row is not None:
+                self.db.execute('UPDATE shards SET state = ?, worker = ?, expires = ?, attempts = attempts + 1 '
+                                'WHERE id = ?', (SHARD_LEASED, worker, now + self.lease, row['id']))
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+        self.db.execute('COMMIT')
+        return dict(row) if row is not None else None
+
+    def heartbeat(self, shard: int, worker: str) -> bool:
+        """
+        Extend the worker's lease of a shard.
+
+        Returns:
+            bool: False when the lease has been lost to another worker.
+        """
+        cursor = self.db.execute('UPDATE shards SET expires = ? WHERE id = ? AND state = ? AND worker = ?',
+                                 (time.time() + self.lease, shard, SHARD_LEASED, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, shard: int, worker: str) -> bool:
+        """
+        Mark a shard done, provided the worker still holds its lease.
+
+        Returns:
+            bool: False when the lease has been lost to another worker.
+        """
+        cursor = self.db.execute('UPDATE shards SET state = ?, expires = NULL WHERE id = ? AND state = ? '
+                                 'AND worker = ?', (SHARD_DONE, shard, SHARD_LEASED, worker))
+        return cursor.rowcount == 1
+
+    def next_expiry(self) -> float:
+        """
+        Find when the first lease still running expires.
+
+        Returns:
+            float: The wall-clock time, or None when no shard is leased.
+        """
+        return self.db.execute('SELECT MIN(expires) FROM shards WHERE state = ?', (SHARD_LEASED,)).fetchone()[0]
+
+    def progress(self) -> dict:
+        """
+        Count the shards in each state.
+        """
+        counts = dict.fromkeys((SHARD_PENDING, SHARD_LEASED, SHARD_DONE), 0)
+        counts.update(self.db.execute('SELECT state, COUNT(*) FROM shards GROUP BY state').fetchall())
+        return counts
+
+    def shards(self) -> list:
+        """
+        List the shard ids in manifest order.
+        """
+        return [row[0] for row in self.db.execute('SELECT id FROM shards ORDER BY id')]
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def shard_path(directory: str, shard: int) -> str:
+    return os.path.join(directory, f'shard-{shard:06d}.jsonl')
+
+
+class Worker:
+    """Claims shards from a queue and probes them until none is left"""
+
+    def __init__(self, queue: ShardQueue, directory: str, name: str = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, **options) -> None:
+        """
+        Initialize the Worker object.
+
+        Args:
+            queue (ShardQueue): The queue to claim shards from.
+            directory (str): The shared directory shard results are written to.
+            name (str): The worker's name in leases, host and pid by default.
+            chunk_size (int): The inputs probed together by one ``Imgspy.info`` call.
+            options: Passed on to ``Imgspy.info``.
+        """
+        self.queue = queue
+        self.directory = directory
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.chunk_size = chunk_size
+        self.options = options
+        self.__executor = None
+
+    async def __queue(self, method, *args):
+        """
+        Call a ShardQueue method on the worker's queue thread, so that waiting
+        for the database lock does not stall the probes in flight.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self.__executor, functools.partial(method, *args))
+
+    async def run(self) -> dict:
+        """
+        Probe shards until every shard is done. While the shards left are
+        leased to other workers, wait for them to be done or for their leases
+        to expire, so that the shards of a worker that died are probed again.
+
+        Returns:
+            dict: The shards completed, the shards whose lease was lost, and
+            the inputs probed.
+        """
+        stats = {'shards': 0, 'lost': 0, 'probed': 0}
+        client = HttpClient()
+        self.__executor = concurrent.futures.ThreadPoolExecutor(1)
+        try:
+            while True:
+                shard = await self.__queue(self.queue.claim, self.name)
+                if shard is None:
+                    expiry = await self.__queue(self.queue.next_expiry)
+                    if expiry is None:
+                        return stats
+                    await asyncio.sleep(min(max(expiry - time.time(), 0) + 0.01, DEFAULT_POLL_INTERVAL))
+                    continue
+                path = shard_path(self.directory, shard['id'])
+                temporary = f"{path}.{self.name.replace(os.sep, '_')}.tmp"
+                lost = asyncio.Event()
+                heartbeat = asyncio.ensure_future(self.__heartbeat(shard['id'], lost))
+                try:
+                    probed = await self.__probe(shard, temporary, client, lost)
+                finally:
+                    heartbeat.cancel()
+                if probed is None:
+                    os.remove(temporary)
+                    stats['lost'] += 1
+                    continue
+                # the results are in place before the shard is marked done; when
+                # the lease was lost, the new holder writes the same results
+                os.replace(temporary, path)
+                if await self.__queue(self.queue.complete, shard['id'], self.name):
+                    stats['shards'] += 1
+                    stats['probed'] += probed
+                else:
+                    stats['lost'] += 1
+        finally:
+            await client.close()
+            self.__executor.shutdown()
+
+    async def __heartbeat(self, shard: int, lost: asyncio.Event) -> None:
+        while True:
+            await asyncio.sleep(self.queue.lease / 3)
+            if not await self.__queue(self.queue.heartbeat, shard, self.name):
+                lost.set()
+                return
+
+    async def __probe(self, shard: dict, temporary: str, client: HttpClient, lost: asyncio.Event) -> int:
+        """
+        Probe a shard into a temporary file beside its results file.
+
+        Returns:
+            int: The inputs probed, or None when the lease was lost part way.
+        """
+        probed = 0
+        with open(shard['manifest'], 'rb') as manifest, \
+                open(temporary, 'wb') as output:
+            manifest.seek(shard['start'])
+            line = shard['first_line']
+            while manifest.tell() < shard['end'] and not lost.is_set():
+                lines, inputs = [], []
+                while len(inputs) < self.chunk_size and manifest.tell() < shard['end']:
+                    item = manifest.readline().decode('utf-8').strip()
+                    if item:
+                        lines.append(line)
+                        inputs.append(item)
+                    line += 1
+                for number, item, result in zip(lines, inputs, await Imgspy.info(
+                        *inputs, client=client, **self.options)):
+                    output.write(json.dumps(dict(result, line=number, input=item)).encode() + b'\n')
+                probed += len(inputs)
+            output.flush()
+            os.fsync(output.fileno())
+        return None if lost.is_set() else probed
+
+
+def merge(queue: ShardQueue, directory: str, output: str) -> int:
+    """
+    Concatenate the shard results, in manifest order, into one file.
+
+    Returns:
+        int: The number of shards merged.
+
+    Raises:
+        ValueError: When some shard is not done yet.
+    """
+    progress = queue.progress()
+    if progress[SHARD_PENDING] or progress[SHARD_LEASED]:
+        raise ValueError(f'{progress[SHARD_PENDING] + progress[SHARD_LEASED]} shards are not done')
+    shards = queue.shards()
+    with open(output, 'wb') as out:
+        for shard in shards:
+            with open(shard_path(directory, shard), 'rb') as f:
+                while True:
+                    block = f.read(1024 * 1024)
+                    if not block:
+                        break
+                    out.write(block)
+    return len(shards)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    commands = parser.add_subparsers(dest='command', required=True)
+    split = commands.add_parser('split', help='queue the shards of a manifest')
+    split.add_argument('queue')
+    split.add_argument('manifest')
+    split.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE)
+    work = commands.add_parser('work', help='probe shards until none is left')
+    work.add_argument('queue')
+    work.add_argument('directory')
+    work.add_argument('--name')
+    work.add_argument('--lease', type=float, default=DEFAULT_LEASE)
+    work.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    combine = commands.add_parser('merge', help='concatenate the results of a finished queue')
+    combine.add_argument('queue')
+    combine.add_argument('directory')
+    combine.add_argument('output')
+    args = parser.parse_args(argv)
+
+    queue = ShardQueue(args.queue, getattr(args, 'lease', DEFAULT_LEASE))
+    try:
+        if args.command == 'split':
+            print(f'{queue.split(args.manifest, args.shard_size)} shards queued')
+        elif args.command == 'work':
+            os.makedirs(args.directory, exist_ok=True)
+            stats = asyncio.run(Worker(queue, args.directory, args.name, args.chunk_size).run())
+            print(f"{stats['shards']} shards, {stats['probed']} inputs probed, {stats['lost']} leases lost")
+        else:
+            print(f'{merge(queue, args.directory, args.output)} shards merged')
+    finally:
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
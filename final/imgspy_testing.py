@@ -0,0 +1,71 @@
+# coding: utf-8
+"""
+imgspy testing
+======
+
+Sample images and fixtures shared by the tests and benchmarks.
+"""
+import base64
+import struct
+import unittest
+from unittest.mock import patch
+
+import imgspy_asyncio
+
+# A 2x1 RGBA PNG.
+PNG_DATA = base64.b64decode('iVBORw0KGgoAAAANSUhEUgAAAAIAAAABCAYAAAD0In+KAAAAD0lEQVR42mNk+M9QzwAEAAmGAYCF+yOnAAAAAElFTkSuQmCC')
+
+
+def make_png(width: int, height: int, size: int) -> bytes:
+    """
+    Build a PNG of roughly ``size`` bytes: a valid IHDR followed by filler.
+
+    Args:
+        width (int): The image width.
+        height (int): The image height.
+        size (int): The total number of bytes to produce.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    header = b'\x89PNG\r\n\x1a\n' + struct.pack('>L', 13) + b'IHDR'
+    header += struct.pack('>LLBBBBB', width, height, 8, 6, 0, 0, 0) + b'\x00' * 4
+    return header + b'\x00' * max(size - len(header), 0)
+
+
+def make_jpeg(width: int, height: int, size: int = 48) -> bytes:
+    """
+    Build a JPEG of roughly ``size`` bytes: an APP1 segment ahead of the SOF0.
+
+    Up to 64 KiB, the APP1 segment takes all but 32 bytes, so that the frame
+    header lies ``size - 30`` bytes in.
+
+    Args:
+        width (int): The image width.
+        height (int): The image height.
+        size (int): The total number of bytes to produce.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    app_size = min(max(size - 32, 16), 0xffff)
+    app1 = b'\xff\xe1' + struct.pack('>H', app_size) + b'\x00' * (app_size - 2)
+    sof0 = b'\xff\xc0' + struct.pack('>HBHHB', 17, 8, height, width, 3) + b'\x00' * 9
+    return b'\xff\xd8' + app1 + sof0 + b'\x00' * max(size - app_size - 32, 0)
+
+
+def data_uri(data: bytes, mime: str = 'image/png') -> str:
+    return f'data:{mime};base64,' + base64.b64encode(data).decode()
+
+
+def isolate_backends(test: unittest.TestCase) -> None:
+    """
+    Give a test its own backend registry, circuit breaker and negative cache,
+    put back when it ends.
+    """
+    patchers = [patch.dict(imgspy_asyncio.backends)]
+    for name in ('circuit_breaker', 'negative_cache'):
+        patchers.append(patch.object(imgspy_asyncio, name, type(getattr(imgspy_asyncio, name))()))
+    for patcher in patchers:
+        patcher.start()
+        test.addCleanup(patcher.stop)
@@ -0,0 +1,220 @@
+# coding: utf-8
+"""
+imgspy watch
+======
+
+Probes the images written into a directory as they land, instead of probing the
+whole listing again and again. On Linux the directory is watched with inotify:
+a file is probed once it is closed after writing, or renamed into the
+directory. Elsewhere, or when inotify is not available, the directory is
+scanned every poll interval and a file is probed once its size and modification
+time have held still for one interval.
+
+Files already in the directory when the watch starts are not probed. Rewrites
+of a file within the debounce delay are probed once, after the last one. Each
+probe reads the file in ``LOCAL_INITIAL_READ`` bytes, then in steps, only as far
+as its parser needs. Files that are not in a supported image format are not
+reported; those that are but cannot be read or parsed are, with their failure.
+
+usage
+-----
+::
+    >>> async for path, result in Imgspy.watch('/data/uploads'):
+    ...     print(path, result)
+"""
+import os
+import sys
+import errno
+import struct
+import asyncio
+from typing import AsyncIterator
+
+from imgspy_asyncio import Probe, MAX_PROBE_BYTES, STATUS_UNSUPPORTED
+
+DEFAULT_DEBOUNCE = 0.05
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify(7)
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Files closed after writing, or moved into a directory, through inotify"""
+
+    def __init__(self, path: str) -> None:
+        """
+        Watch the directory.
+
+        Raises:
+            OSError: When inotify is not available or the directory cannot be watched.
+        """
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self.path = path
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1')
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, os.strerror(error), path)
+        self.names = []
+        self.overflowed = False
+        self.ready = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        self.loop.add_reader(self.fd, self.__read)
+
+    def __read(self) -> None:
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\x00')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                self.overflowed = True
+            elif name and not mask & IN_ISDIR:
+                self.names.append(os.fsdecode(name))
+        self.ready.set()
+
+    async def changes(self, timeout: float = None) -> list:
+        """
+        Wait up to ``timeout`` seconds for files to be written.
+
+        Returns:
+            list: The names of the files written since the last call. After an
+            event queue overflow, the names of every file in the directory.
+        """
+        if not self.ready.is_set():
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        self.ready.clear()
+        names, self.names = self.names, []
+        if self.overflowed:
+            self.overflowed = False
+            with os.scandir(self.path) as entries:
+                names.extend(entry.name for entry in entries if entry.is_file())
+        return names
+
+    def close(self) -> None:
+        self.loop.remove_reader(self.fd)
+        os.close(self.fd)
+
+
+class PollWatcher:
+    """Files whose size and modification time settled, found by scanning a directory"""
+
+    def __init__(self, path: str, interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        """
+        Take the directory's first listing, whose files are not reported.
+        """
+        self.path = path
+        self.interval = interval
+        self.snapshot = self.__scan()
+        self.settling = set()
+        self.due = asyncio.get_running_loop().time() + interval
+
+    def __scan(self) -> dict:
+        with os.scandir(self.path) as entries:
+            snapshot = {}
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                except FileNotFoundError:
+                    pass
+            return snapshot
+
+    async def changes(self, timeout: float = None) -> list:
+        """
+        Wait up to ``timeout`` seconds for the next scan.
+
+        Returns:
+            list: The names of the files that changed during the interval
+            before the last one and not during the last one.
+        """
+        loop = asyncio.get_running_loop()
+        wait = self.due - loop.time()
+        if timeout is not None and timeout < wait:
+            await asyncio.sleep(timeout)
+            return []
+        await asyncio.sleep(max(wait, 0))
+        self.due = loop.time() + self.interval
+        snapshot = self.__scan()
+        changed = {name for name, state in snapshot.items() if self.snapshot.get(name) != state}
+        settled = [name for name in self.settling if name in snapshot and name not in changed]
+        self.snapshot, self.settling = snapshot, changed
+        return settled
+
+    def close(self) -> None:
+        pass
+
+
+def open_watcher(path: str, poll_interval: float = DEFAULT_POLL_INTERVAL, poll: bool = False):
+    """
+    Watch a directory with inotify where it is available, by polling otherwise.
+    """
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(path)
+        except OSError as e:
+            if e.errno not in (errno.ENOSYS, errno.EMFILE, errno.ENOSPC):
+                raise
+    if not os.path.isdir(path):
+        raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), path)
+    return PollWatcher(path, poll_interval)
+
+
+async def watch(path: str, max_bytes: int = MAX_PROBE_BYTES, debounce: float = DEFAULT_DEBOUNCE,
+                poll_interval: float = DEFAULT_POLL_INTERVAL, poll: bool = False) -> AsyncIterator[tuple]:
+    """
+    Probe the files written into a directory, as they are written.
+
+    Args:
+        path (str): The directory to watch.
+        max_bytes (int): The number of bytes a single probe may read.
+        debounce (float): The seconds a file must go unwritten before it is probed.
+        poll_interval (float): The seconds between two scans when polling.
+        poll (bool): Whether to poll even where inotify is available.
+
+    Yields:
+        tuple: The path of the file and its probe result. Files in no supported
+        image format are skipped.
+
+    Raises:
+        OSError: When the directory cannot be watched.
+    """
+    loop = asyncio.get_running_loop()
+    watcher = open_watcher(path, poll_interval, poll)
+    deadlines = {}
+    try:
+        while True:
+            timeout = max(min(deadlines.values()) - loop.time(), 0) if deadlines else None
+            for name in await watcher.changes(timeout):
+                deadlines[name] = loop.time() + debounce
+            now = loop.time()
+            for name in sorted((n for n, d in deadlines.items() if d <= now), key=deadlines.get):
+                del deadlines[name]
+                file = os.path.join(path, name)
+                if not os.path.isfile(file):
+                    continue
+                result = await Probe(max_bytes=max_bytes).get_info(file)
+                if result['status'] != STATUS_UNSUPPORTED:
+                    yield file, result
+    finally:
+        watcher.close()
@@ -0,0 +1,18 @@
+import unittest
+import bench_import
+
+
+class TestColdStart(unittest.TestCase):
+
+    def test_local_probe_within_budget(self):
+        records = bench_import.run(runs=3)
+        self.assertEqual([r['engine'] for r in records], ['sync', 'async'])
+        self.assertEqual(bench_import.over_budget(records), [])
+
+    def test_network_backend_fails_budget(self):
+        records = [{'engine': 'async', 'elapsed': 0.01, 'loaded': ['aiohttp']}]
+        self.assertEqual(bench_import.over_budget(records), records)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+import bench_memory
+
+
+class TestMemoryBudget(unittest.TestCase):
+
+    def test_batch_within_budget(self):
+        records = bench_memory.run(batches=(1000,))
+        self.assertEqual(len(records), 2)
+        for record in records:
+            self.assertEqual(record['failed'], 0)
+        self.assertEqual(bench_memory.over_budget(records), [])
+
+    def test_budget_catches_whole_images(self):
+        # a probe buffering the largest image whole must not fit the budget
+        self.assertLess(bench_memory.DEFAULT_BUDGET, max(bench_memory.DEFAULT_IMAGE_SIZES))
+
+    def test_over_budget(self):
+        records = [{'engine': 'async', 'batch': 1, 'peak_per_probe': 2048}]
+        self.assertEqual(bench_memory.over_budget(records, budget=1024), records)
+        self.assertEqual(bench_memory.over_budget(records, budget=4096), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import io
+import os
+import asyncio
+import tarfile
+import zipfile
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import imgspy_archive
+from imgspy_testing import make_png, make_jpeg
+from imgspy_asyncio import Imgspy, STATUS_NOT_FOUND, STATUS_INVALID_INPUT, STATUS_UNSUPPORTED
+
+MEMBERS = {
+    'images/a.png': make_png(64, 48, 512 * 1024),
+    'images/b.jpg': make_jpeg(30, 20, 512 * 1024),
+    'notes.txt': b'not an image' * 100,
+}
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def make_zip(self, compression):
+        path = os.path.join(self.directory, 'set.zip')
+        with zipfile.ZipFile(path, 'w', compression) as archive:
+            archive.writestr('images/', b'')
+            for name, data in MEMBERS.items():
+                archive.writestr(name, data)
+        return path
+
+    def make_tar(self, mode='w'):
+        path = os.path.join(self.directory, 'set.tar')
+        with tarfile.open(path, mode) as archive:
+            for name, data in MEMBERS.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        return path
+
+    def scan(self, path):
+        async def main():
+            return [item async for item in Imgspy.scan_archive(path)]
+        return asyncio.run(main())
+
+    def assert_scanned(self, results):
+        self.assertEqual([name for name, _ in results], list(MEMBERS))
+        self.assertEqual(results[0][1], {'type': 'png', 'width': 64, 'height': 48, 'status': 'ok'})
+        self.assertEqual(results[1][1], {'type': 'jpg', 'width': 30, 'height': 20, 'status': 'ok'})
+        self.assertEqual(results[2][1]['status'], STATUS_UNSUPPORTED)
+
+    def test_scan_zip(self):
+        for compression in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            with self.subTest(compression=compression):
+                self.assert_scanned(self.scan(self.make_zip(compression)))
+
+    def test_scan_tar(self):
+        for mode in ('w', 'w:gz'):
+            with self.subTest(mode=mode):
+                self.assert_scanned(self.scan(self.make_tar(mode)))
+
+    def test_reads_fraction(self):
+        for path in (self.make_zip(zipfile.ZIP_STORED), self.make_tar()):
+            archive = imgspy_archive.Archive(path)
+            try:
+                for _, stream in archive.members():
+                    stream.read(64 * 1024)
+                    stream.close()
+                self.assertLess(archive.bytes_read, os.path.getsize(path) // 4)
+            finally:
+                archive.close()
+
+    def test_archive_uri(self):
+        path = self.make_zip(zipfile.ZIP_DEFLATED)
+        results = asyncio.run(Imgspy.info(f'archive://{path}!images/b.jpg', f'archive://{path}!missing.png',
+                                          f'archive://{path}.nope!a.png', f'archive://{__file__}!a.png'))
+        self.assertEqual(results[0], {'type': 'jpg', 'width': 30, 'height': 20, 'status': 'ok'})
+        self.assertEqual([r['status'] for r in results[1:]],
+                         [STATUS_NOT_FOUND, STATUS_NOT_FOUND, STATUS_INVALID_INPUT])
+
+    def test_archive_opened_once_per_batch(self):
+        path = os.path.join(self.directory, 'many.tar')
+        with tarfile.open(path, 'w') as archive:
+            for i in range(200):
+                data = make_png(i + 1, 1, 4096)
+                info = tarfile.TarInfo(f'{i}.png')
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        opened = []
+
+        class CountedArchive(imgspy_archive.Archive):
+            def __init__(self, path):
+                super().__init__(path)
+                opened.append(self)
+
+        with patch.object(imgspy_archive, 'Archive', CountedArchive):
+            results = asyncio.run(Imgspy.info(*(f'archive://{path}!{i}.png' for i in range(200))))
+        self.assertEqual([r['width'] for r in results], list(range(1, 201)))
+        self.assertEqual(len(opened), 1)
+        self.assertTrue(opened[0].file.closed)
+        # the headers are read once, not once per member
+        self.assertLess(opened[0].bytes_read, 2 * os.path.getsize(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,83 @@
+import io
 import unittest
 import asyncio
-from imgspy_asyncio import OpenStream, Imgspy
+import struct
+import threading
+import tempfile
+import os
+import json
+import mmap
+import gzip
+import zlib
+import time
+import importlib.util
+import concurrent.futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import imgspy_asyncio
+from imgspy_asyncio import OpenStream, Imgspy, Runner, ByteBudget, HttpClient, STATUS_TOO_LARGE, STATUS_TIMEOUT, \
+    RetryPolicy, CircuitBreaker, NegativeCache, ErrorLog, STATUS_CIRCUIT_OPEN, STATUS_HTTP_ERROR, \
+    STATUS_NOT_FOUND, STATUS_UNSUPPORTED, STATUS_CORRUPT, STATUS_INVALID_INPUT
 from unittest.mock import patch, MagicMock
+from imgspy_testing import PNG_DATA, make_jpeg, data_uri, isolate_backends
+
+
+class LocalServer:
+    """
+    In-process HTTP server serving ``routes``: path -> (status, headers, body).
+    A list of responses, or of ``delays``, is served in turn, repeating the last.
+    """
+
+    def __init__(self, routes, ranges=True, delays=None):
+        self.routes = routes
+        self.delays = delays or {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.requests.append((self.path, dict(self.headers), self.client_address))
+                time.sleep(server.next(server.delays, self.path, 0))
+                status, headers, body = server.next(server.routes, self.path, (404, {}, b'not found'))
+                byte_range = self.headers.get('Range')
+                if ranges and status == 200 and byte_range and byte_range.startswith('bytes='):
+                    first, _, last = byte_range[6:].partition('-')
+                    last = min(int(last or len(body) - 1), len(body) - 1)
+                    headers = dict(headers, **{'Content-Range': f'bytes {first}-{last}/{len(body)}'})
+                    status, body = 206, body[int(first):last + 1]
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+            def handle_one_request(self):
+                try:
+                    super().handle_one_request()
+                except ConnectionError:
+                    pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+
+    def next(self, table, path, default):
+        value = table.get(path, default)
+        if isinstance(value, list):
+            return value.pop(0) if len(value) > 1 else value[0]
+        return value
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
 
 
 class TestOpenStream(unittest.TestCase):
@@ -24,6 +100,797 @@ class TestOpenStream(unittest.TestCase):
         self.assertTrue(isinstance(stream.read(), bytes))
 
 
+    def test_file_stream_bounded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'big.png')
+            with open(path, 'wb') as f:
+                f.write(PNG_DATA + b'\x00' * 4096)
+            opener = OpenStream(path, ByteBudget(), max_bytes=64)
+            stream = asyncio.run(opener._get_stream())
+            self.assertEqual(len(stream.read()), 64)
+            self.assertTrue(stream.truncated)
+            opener.release()
+
+    def test_file_stream_reserves_bytes_read(self):
+        from imgspy_asyncio import LOCAL_INITIAL_READ
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for index in range(64):
+                paths.append(os.path.join(directory, f'{index}.png'))
+                with open(paths[-1], 'wb') as f:
+                    f.write(PNG_DATA + b'\x00' * 131072)
+            budget = ByteBudget(64 * LOCAL_INITIAL_READ)
+            openers = [OpenStream(path, budget) for path in paths]
+
+            async def run():
+                return await asyncio.wait_for(asyncio.gather(*(o._get_stream() for o in openers)), 5)
+            streams = asyncio.run(run())
+            self.assertTrue(all(stream is not None for stream in streams))
+            self.assertEqual(budget.in_use, 0)
+            self.assertTrue(all(stream.read(26) == PNG_DATA[:26] for stream in streams))
+            self.assertEqual(budget.in_use, 64 * LOCAL_INITIAL_READ)
+            for opener in openers:
+                opener.release()
+            self.assertEqual(budget.in_use, 0)
+
+    def test_local_reads_wait_for_budget(self):
+        with tempfile.TemporaryDirectory() as directory:
+            inputs = []
+            for index in range(8):
+                inputs.append(os.path.join(directory, f'{index}.jpg'))
+                with open(inputs[-1], 'wb') as f:
+                    f.write(make_jpeg(index + 1, 2, 20032))
+                inputs.append(data_uri(make_jpeg(index + 1, 3, 20032)))
+            budget = ByteBudget(32768)
+
+            async def run():
+                from imgspy_asyncio import Probe
+                return await asyncio.gather(*(Probe(budget).get_info(input) for input in inputs))
+            results = asyncio.run(run())
+        self.assertEqual([(r['status'], r['width']) for r in results],
+                         [('ok', index // 2 + 1) for index in range(16)])
+        self.assertEqual(budget.in_use, 0)
+
+    def test_http_stream_ignoring_range(self):
+        body = PNG_DATA + b'\x00' * 100000
+        with LocalServer({'/big.png': (200, {'Content-Type': 'image/png'}, body)}, ranges=False) as server:
+            stream = asyncio.run(OpenStream(server.url + '/big.png', max_bytes=1024)._get_stream())
+            self.assertEqual(stream.raw.getbuffer().nbytes, 1024)
+            self.assertTrue(stream.truncated)
+            self.assertEqual(server.requests[0][1]['Range'], 'bytes=0-1023')
+
+
+class TestByteBudget(unittest.TestCase):
+
+    def test_waits_when_exhausted(self):
+        async def run():
+            budget = ByteBudget(100)
+            first = await budget.reserve(80)
+            waiter = asyncio.ensure_future(budget.reserve(50))
+            await asyncio.sleep(0)
+            self.assertFalse(waiter.done())
+            budget.release(first)
+            self.assertEqual(await waiter, 50)
+            self.assertEqual(budget.in_use, 50)
+            budget.release(50)
+            self.assertEqual(await budget.reserve(1000), 100)
+        asyncio.run(run())
+
+    def test_too_large(self):
+        small, large = make_jpeg(3, 2), make_jpeg(3, 2, 60032)
+        results = asyncio.run(Imgspy.info(data_uri(small), data_uri(large), max_bytes=4096))
+        self.assertEqual(results[0], {'type': 'jpg', 'width': 3, 'height': 2, 'status': 'ok'})
+        self.assertEqual(results[1]['status'], STATUS_TOO_LARGE)
+
+    def test_budget_released(self):
+        from imgspy_asyncio import byte_budget
+        in_use = byte_budget.in_use
+        asyncio.run(Imgspy.info(data_uri(PNG_DATA), data_uri(make_jpeg(3, 2))))
+        self.assertEqual(byte_budget.in_use, in_use)
+
+
+class TestTimeouts(unittest.TestCase):
+
+    def test_read_timeout(self):
+        routes = {'/slow.png': (200, {}, PNG_DATA)}
+        with LocalServer(routes, delays={'/slow.png': 1}) as server:
+            results = asyncio.run(Imgspy.info(server.url + '/slow.png', read_timeout=0.2))
+        self.assertEqual(results[0]['status'], STATUS_TIMEOUT)
+
+    def test_deadline_returns_partial_results(self):
+        routes = {'/slow.png': (200, {}, PNG_DATA)}
+        with LocalServer(routes, delays={'/slow.png': 2}) as server:
+            start = time.perf_counter()
+            results = asyncio.run(Imgspy.info(server.url + '/slow.png', data_uri(PNG_DATA), deadline=0.3))
+            elapsed = time.perf_counter() - start
+        self.assertLess(elapsed, 1.5)
+        self.assertEqual(results[0]['status'], STATUS_TIMEOUT)
+        self.assertEqual(results[1], {'type': 'png', 'width': 2, 'height': 1, 'status': 'ok'})
+
+
+class TestRetries(unittest.TestCase):
+
+    def test_retry_on_server_error(self):
+        from imgspy_asyncio import probe_stats
+        routes = {'/flaky.png': [(503, {}, b''), (429, {'Retry-After': '0'}, b''), (200, {}, PNG_DATA)]}
+        retries = probe_stats['retries']
+        with LocalServer(routes) as server:
+            results = asyncio.run(Imgspy.info(server.url + '/flaky.png', retry=RetryPolicy(backoff=0.01)))
+        self.assertEqual(results[0], {'type': 'png', 'width': 2, 'height': 1, 'status': 'ok', 'strategy': 'whole'})
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(probe_stats['retries'] - retries, 2)
+
+    def test_long_retry_after_not_retried(self):
+        routes = {'/busy.png': [(429, {'Retry-After': '3600'}, b''), (200, {}, PNG_DATA)]}
+        with LocalServer(routes) as server:
+            results = asyncio.run(Imgspy.info(server.url + '/busy.png'))
+        self.assertEqual(results[0], {'status': STATUS_HTTP_ERROR, 'error': 'HTTP 429'})
+        self.assertEqual(len(server.requests), 1)
+
+    def test_hedged_request_wins(self):
+        from imgspy_asyncio import probe_stats
+        hedges, wins = probe_stats['hedges'], probe_stats['hedge_wins']
+        routes = {'/slow.png': (200, {}, PNG_DATA)}
+        with LocalServer(routes, delays={'/slow.png': [1.5, 0]}) as server:
+            start = time.perf_counter()
+            results = asyncio.run(Imgspy.info(server.url + '/slow.png', retry=RetryPolicy(hedge_delay=0.1)))
+            elapsed = time.perf_counter() - start
+        self.assertEqual(results[0], {'type': 'png', 'width': 2, 'height': 1, 'status': 'ok', 'strategy': 'whole'})
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(probe_stats['hedges'] - hedges, 1)
+        self.assertEqual(probe_stats['hedge_wins'] - wins, 1)
+
+
+class TestHostScheduling(unittest.TestCase):
+
+    def test_hosts_drained_over_warm_connections(self):
+        servers = [LocalServer({f'/{i}.png': (200, {}, PNG_DATA) for i in range(10)}) for _ in range(3)]
+        for server in servers:
+            server.__enter__()
+            self.addCleanup(server.__exit__)
+        urls = [server.url + f'/{i}.png' for i in range(10) for server in servers]
+        client = HttpClient(connections=2, connections_per_host=1, warm_connections=1)
+
+        async def main():
+            try:
+                return await Imgspy.info(*urls, client=client)
+            finally:
+                await client.close()
+        results = asyncio.run(main())
+        self.assertTrue(all(r['status'] == 'ok' for r in results))
+        for server in servers:
+            self.assertEqual(len(server.requests), 10)
+            self.assertEqual(len({address for _, _, address in server.requests}), 1)
+
+    def test_session_of_other_loop_closed(self):
+        client = HttpClient()
+        with LocalServer({'/a.png': (200, {}, PNG_DATA)}) as server:
+            first = asyncio.run(client.session())
+            connector = first.connector
+            second = asyncio.run(client.session())
+            self.assertTrue(first.closed)
+            self.assertTrue(connector.closed)
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, daemon=True)
+            thread.start()
+            third = asyncio.run_coroutine_threadsafe(client.session(), loop).result()
+            asyncio.run_coroutine_threadsafe(Imgspy.info(server.url + '/a.png', client=client), loop).result()
+            asyncio.run(client.close())
+            for _ in range(100):
+                if third.closed:
+                    break
+                time.sleep(0.01)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        self.assertTrue(second.closed)
+        self.assertTrue(third.closed)
+
+    def test_resolver_shares_lookups(self):
+        resolver = imgspy_asyncio.CachingResolver()
+
+        async def main():
+            try:
+                return await asyncio.gather(*(resolver.resolve('localhost', 80) for _ in range(5)))
+            finally:
+                await resolver.close()
+        answers = asyncio.run(main())
+        self.assertEqual(resolver.lookups, 1)
+        self.assertTrue(all(answer == answers[0] for answer in answers))
+
+
+class TestReadStrategy(unittest.TestCase):
+
+    def test_strategies(self):
+        big = PNG_DATA + b'\x00' * (2 * 1024 * 1024)
+        routes = {
+            '/small.png': (200, {'Content-Type': 'image/png'}, PNG_DATA),
+            '/big.png': (200, {'Content-Type': 'image/png'}, big),
+            '/error.png': (200, {'Content-Type': 'text/html; charset=utf-8'}, b'<html>' * 100000),
+        }
+        with LocalServer(routes) as server:
+            results = asyncio.run(Imgspy.info(*(server.url + path for path in routes)))
+        with LocalServer({'/big.png': (200, {}, big)}, ranges=False) as server:
+            results += asyncio.run(Imgspy.info(server.url + '/big.png'))
+        self.assertEqual([r.get('strategy') for r in results], ['whole', 'ranged', 'rejected', 'streamed'])
+        self.assertEqual([r['status'] for r in results], ['ok', 'ok', STATUS_UNSUPPORTED, 'ok'])
+        self.assertEqual(results[2]['error'], 'Content-Type text/html')
+
+    def test_local_inputs_have_no_strategy(self):
+        result, = asyncio.run(Imgspy.info(data_uri(PNG_DATA)))
+        self.assertNotIn('strategy', result)
+
+
+class TestReadSizes(unittest.TestCase):
+
+    def test_learned_size(self):
+        stats = imgspy_asyncio.ReadSizeStats(initial=1000, ceiling=20000, min_samples=3)
+        url = 'http://a.example/x.JPG'
+        self.assertEqual(stats.size(url), 1000)
+        for needed in [100] * 18 + [5000, 50000]:
+            stats.record(f'http://a.example/{needed}.jpg', needed)
+        self.assertEqual(stats.size(url), 8192)
+        self.assertEqual(stats.size(url, max_bytes=6000), 6000)
+        self.assertEqual(stats.size('http://a.example/x.png'), 1000)
+        stats.record(url, 10 ** 6)
+        stats.record(url, 10 ** 6)
+        self.assertEqual(stats.size(url), 20000)
+
+    def test_least_recent_evicted(self):
+        stats = imgspy_asyncio.ReadSizeStats(initial=1000, min_samples=1, keys=2)
+        for host in ('a', 'b'):
+            stats.record(f'http://{host}.example/x.jpg', 100)
+        stats.size('http://a.example/y.jpg')
+        stats.record('http://c.example/x.jpg', 100)
+        self.assertEqual([stats.size(f'http://{host}.example/x.jpg') for host in 'abc'], [4096, 1000, 4096])
+
+    def test_first_read_adapts(self):
+        from imgspy_asyncio import probe_stats
+        routes = {f'/{i}.jpg': (200, {}, make_jpeg(30, 20, 60032)) for i in range(8)}
+        stats = imgspy_asyncio.ReadSizeStats(initial=4096, min_samples=3)
+        refetches = probe_stats['refetches']
+        with patch.object(imgspy_asyncio, 'read_sizes', stats), LocalServer(routes) as server:
+            for path in routes:
+                result, = asyncio.run(Imgspy.info(server.url + path))
+                self.assertEqual((result['width'], result['height']), (30, 20))
+        ranges = [headers['Range'] for _, headers, _ in server.requests]
+        self.assertEqual(ranges[:6], ['bytes=0-4095', 'bytes=0-1048575'] * 3)
+        self.assertEqual(ranges[6:], ['bytes=0-61439'] * 5)
+        self.assertEqual(probe_stats['refetches'] - refetches, 3)
+
+    def test_extended_fields_not_learned(self):
+        routes = {f'/{i}.gif': (200, {}, gif(5, 4, 3)) for i in range(4)}
+        stats = imgspy_asyncio.ReadSizeStats(initial=65536, min_samples=3)
+        with patch.object(imgspy_asyncio, 'read_sizes', stats), LocalServer(routes) as server:
+            urls = [server.url + path for path in routes]
+            for url in urls:
+                result, = asyncio.run(Imgspy.info(url, fields='+frames'))
+                self.assertEqual(result['frames'], 3)
+            # frame walks leave the learned size alone
+            self.assertEqual(stats.size(urls[0]), 65536)
+            for url in urls:
+                asyncio.run(Imgspy.info(url))
+            self.assertEqual(stats.size(urls[0]), imgspy_asyncio.READ_SIZE_STEP)
+
+
+def png_chunk(kind, data):
+    return struct.pack('>L', len(data)) + kind + data + struct.pack('>L', zlib.crc32(kind + data))
+
+
+def apng(width, height, frames):
+    ihdr = png_chunk(b'IHDR', struct.pack('>LLBBBBB', width, height, 16, 2, 0, 0, 0))
+    actl = png_chunk(b'acTL', struct.pack('>LL', frames, 0))
+    return b'\x89PNG\r\n\x1a\n' + ihdr + png_chunk(b'tEXt', b'x' * 100) + actl + png_chunk(b'IDAT', b'\x00' * 5000)
+
+
+def gif(width, height, frames):
+    header = b'GIF89a' + struct.pack('<HHBBB', width, height, 0x82, 0, 0) + b'\x00' * 24
+    frame = b'\x21\xf9\x04\x00\x00\x00\x00\x00' + b'\x2c' + struct.pack('<HHHHB', 0, 0, width, height, 0) \
+        + b'\x02' + (b'\xff' + b'\x00' * 255) * 20 + b'\x00'
+    return header + frame * frames + b'\x3b'
+
+
+def exif_jpeg(width, height, orientation):
+    ifd = struct.pack('>H', 2) + struct.pack('>HHIHH', 0x10f, 2, 4, 0, 0) \
+        + struct.pack('>HHIHH', 0x112, 3, 1, orientation, 0) + b'\x00' * 4
+    exif = b'Exif\x00\x00MM\x00\x2a' + struct.pack('>I', 8) + ifd
+    app1 = b'\xff\xe1' + struct.pack('>H', len(exif) + 2) + exif
+    return b'\xff\xd8' + app1 + make_jpeg(width, height)[2:]
+
+
+def tiff(width, height, orientation):
+    entries = [(0x100, 4, 1, width), (0x101, 3, 1, height), (0x102, 3, 3, 8 + 2 + 12 * 5 + 4),
+               (0x112, 3, 1, orientation), (0x115, 3, 1, 3)]
+    ifd = struct.pack('<H', len(entries)) + b''.join(
+        struct.pack('<HHII', *entry) if kind == 4 or count > 2 else struct.pack('<HHIHH', *entry, 0)
+        for entry in entries for kind, count in [entry[1:3]]) + b'\x00' * 4
+    return b'II\x2a\x00' + struct.pack('<I', 8) + ifd + struct.pack('<HHH', 8, 8, 8)
+
+
+def ico(sizes):
+    entries = b''.join(struct.pack('<BBBBHHII', w % 256, h % 256, 0, 0, 1, 32, 0, 0) for w, h in sizes)
+    return b'\x00\x00\x01\x00' + struct.pack('<H', len(sizes)) + entries
+
+
+def webp_animation(width, height, frames):
+    vp8x = b'VP8X' + struct.pack('<I', 10) + bytes([0x12, 0, 0, 0]) \
+        + (width - 1).to_bytes(3, 'little') + (height - 1).to_bytes(3, 'little')
+    body = b'WEBP' + vp8x + b'ANIM' + struct.pack('<I', 6) + b'\x00' * 6 \
+        + (b'ANMF' + struct.pack('<I', 101) + b'\x00' * 102) * frames
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+class TestFields(unittest.TestCase):
+
+    def info(self, *inputs, **options):
+        return asyncio.run(Imgspy.info(*inputs, **options))
+
+    def test_default_fields(self):
+        results = self.info(apng(3, 2, 4), gif(5, 4, 3), exif_jpeg(30, 20, 6), tiff(7, 6, 8), ico([(16, 16)]))
+        self.assertEqual([sorted(result) for result in results], [['height', 'status', 'type', 'width']] * 5)
+        self.assertEqual([(r['type'], r['width'], r['height']) for r in results],
+                         [('png', 3, 2), ('gif', 5, 4), ('jpg', 30, 20), ('tiff', 6, 7), ('ico', 16, 16)])
+
+    def test_extended_fields(self):
+        results = self.info(apng(3, 2, 4), PNG_DATA, gif(5, 4, 3), exif_jpeg(30, 20, 6), tiff(7, 6, 8),
+                            ico([(16, 16), (256, 256)]), webp_animation(9, 8, 3),
+                            fields='+orientation,+frames,+bit_depth,+images')
+        expected = [
+            {'type': 'png', 'width': 3, 'height': 2, 'bit_depth': 48, 'frames': 4},
+            {'type': 'png', 'width': 2, 'height': 1, 'bit_depth': 32, 'frames': 1},
+            {'type': 'gif', 'width': 5, 'height': 4, 'bit_depth': 3, 'frames': 3},
+            {'type': 'jpg', 'width': 30, 'height': 20, 'bit_depth': 24, 'frames': 1, 'orientation': 6},
+            {'type': 'tiff', 'width': 6, 'height': 7, 'bit_depth': 24, 'orientation': 8},
+            {'type': 'ico', 'width': 16, 'height': 16, 'bit_depth': 32, 'frames': 2,
+             'images': [{'width': 16, 'height': 16, 'bit_depth': 32}, {'width': 256, 'height': 256, 'bit_depth': 32}]},
+            {'type': 'webp', 'width': 9, 'height': 8, 'bit_depth': 32, 'frames': 3},
+        ]
+        self.assertEqual(results, [dict(result, status='ok') for result in expected])
+
+    def test_projection(self):
+        result, = self.info(exif_jpeg(30, 20, 6), fields={'width', 'orientation'})
+        self.assertEqual(result, {'width': 30, 'orientation': 6, 'status': 'ok'})
+        with self.assertRaises(ValueError):
+            self.info(PNG_DATA, fields={'+colour'})
+
+    def test_rotated_tiff_matches_sync_engine(self):
+        # the sync module at the root of the repository, loaded without adding it to sys.path
+        path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'imgspy.py')
+        spec = importlib.util.spec_from_file_location('imgspy_sync', path)
+        imgspy = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(imgspy)
+        for orientation in range(1, 9):
+            data = tiff(7, 6, orientation)
+            result, = self.info(data, fields='+orientation')
+            self.assertEqual(dict(result, status=None), dict(imgspy.info(io.BytesIO(data)), status=None))
+            size = (6, 7) if orientation >= 5 else (7, 6)
+            self.assertEqual((result['width'], result['height']), size)
+
+    def test_early_stop(self):
+        async def consumed(data, fields):
+            probe = imgspy_asyncio.Probe(fields=fields)
+            result = await probe.get_info(data)
+            return result, probe.stream.consumed
+        data = gif(5, 4, 50)
+        (result, minimal), (_, counted) = [asyncio.run(consumed(data, fields)) for fields in (None, '+frames')]
+        self.assertEqual(result, {'type': 'gif', 'width': 5, 'height': 4, 'status': 'ok'})
+        self.assertLessEqual(minimal, 26)
+        self.assertEqual(counted, len(data))
+        # frames beyond the byte cap are left out rather than failing the probe
+        result, = self.info(data, fields='+frames', max_bytes=4096)
+        self.assertEqual(result, {'type': 'gif', 'width': 5, 'height': 4, 'status': 'ok'})
+
+
+def box(kind, payload, full=None):
+    if full is not None:
+        payload = struct.pack('>I', full) + payload
+    return struct.pack('>I', 8 + len(payload)) + kind + payload
+
+
+def heif(brands, width, height, rotation=None, tile=(512, 512), mdat=100000):
+    properties = [box(b'ispe', struct.pack('>II', *tile), 0), box(b'ispe', struct.pack('>II', width, height), 0),
+                  box(b'pixi', bytes([3, 10, 10, 10]), 0)]
+    primary = [2, 3]
+    if rotation is not None:
+        properties.append(box(b'irot', bytes([rotation])))
+        primary.append(4)
+    ipma = struct.pack('>I', 2) + struct.pack('>HB', 2, 1) + bytes([0x81]) \
+        + struct.pack('>HB', 1, len(primary)) + bytes(0x80 | index for index in primary)
+    meta = box(b'meta', box(b'hdlr', b'\x00' * 4 + b'pict' + b'\x00' * 13, 0) + box(b'pitm', struct.pack('>H', 1), 0)
+               + box(b'iinf', b'\x00' * 200, 0) + box(b'iprp', box(b'ipco', b''.join(properties))
+                                                     + box(b'ipma', ipma, 0)), 0)
+    ftyp = box(b'ftyp', brands[0] + b'\x00' * 4 + b''.join(brands))
+    return ftyp + meta + box(b'mdat', b'\x00' * mdat)
+
+
+class TestHeif(unittest.TestCase):
+
+    def test_primary_item(self):
+        results = asyncio.run(Imgspy.info(
+            heif([b'avif', b'mif1', b'miaf'], 1024, 768, rotation=1), heif([b'heic', b'mif1'], 4032, 3024),
+            heif([b'mif1', b'heic'], 640, 480, rotation=3), heif([b'isom', b'mp41'], 640, 480),
+            fields='+orientation,+bit_depth'))
+        self.assertEqual(results, [
+            {'type': 'avif', 'width': 1024, 'height': 768, 'orientation': 8, 'bit_depth': 30, 'status': 'ok'},
+            {'type': 'heic', 'width': 4032, 'height': 3024, 'orientation': 1, 'bit_depth': 30, 'status': 'ok'},
+            {'type': 'heic', 'width': 640, 'height': 480, 'orientation': 6, 'bit_depth': 30, 'status': 'ok'},
+            {'status': STATUS_UNSUPPORTED, 'error': None},
+        ])
+
+    def test_bounded_read(self):
+        async def main():
+            probe = imgspy_asyncio.Probe()
+            result = await probe.get_info(heif([b'avif'], 64, 48))
+            return result, probe.stream.consumed
+        result, consumed = asyncio.run(main())
+        self.assertEqual(result, {'type': 'avif', 'width': 64, 'height': 48, 'status': 'ok'})
+        self.assertLess(consumed, 1024)
+
+    def test_truncated(self):
+        result, = asyncio.run(Imgspy.info(heif([b'avif'], 64, 48)[:100]))
+        self.assertEqual(result['status'], STATUS_CORRUPT)
+
+
+class TestSvg(unittest.TestCase):
+
+    def info(self, *inputs, **options):
+        return [(r.get('type'), r.get('width'), r.get('height'), r['status'])
+                for r in asyncio.run(Imgspy.info(*inputs, **options))]
+
+    def test_dimensions(self):
+        prolog = '\ufeff<?xml version="1.0"?>\n<!-- <svg width="1" height="1"> -->\n' \
+                 '<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN" [ <!ENTITY a "b"> ]>\n'
+        documents = [
+            '<svg xmlns="http://www.w3.org/2000/svg" width="64" height="48"/>',
+            prolog + '<svg\n  width="2in" height=\'72pt\' viewBox="0 0 10 10">',
+            '<svg:svg xmlns:svg="http://www.w3.org/2000/svg" viewBox="0,0,300.5,150">',
+            '<svg width="100%" height="50%" viewBox="0 0 40 30">',
+            '<svg width="120" viewBox="0 0 40 30">',
+            '<svg data-x="a>b" height="10mm">',
+        ]
+        self.assertEqual(self.info(*(d.encode() for d in documents)), [
+            ('svg', 64, 48, 'ok'), ('svg', 192, 96, 'ok'), ('svg', 300, 150, 'ok'),
+            ('svg', 40, 30, 'ok'), ('svg', 120, 90, 'ok'), ('svg', None, 38, 'ok'),
+        ])
+
+    def test_encodings(self):
+        document = '<?xml version="1.0"?><svg width="5" height="6">'
+        self.assertEqual(self.info(document.encode('utf-16'), gzip.compress(document.encode())),
+                         [('svg', 5, 6, 'ok')] * 2)
+
+    def test_not_svg(self):
+        self.assertEqual(self.info(b'<!DOCTYPE html><html><body><svg width="1" height="1">',
+                                   b'  <?xml version="1.0"?><feed/>', gzip.compress(b'\x00' * 1000)),
+                         [(None, None, None, STATUS_UNSUPPORTED)] * 3)
+
+    def test_bounded_scan(self):
+        async def consumed(data):
+            probe = imgspy_asyncio.Probe()
+            result = await probe.get_info(data)
+            return result, probe.stream.consumed
+        path = '<path d="' + 'M0 0L1 1' * 500000 + '"/>'
+        for document in (f'<svg width="7" height="8">{path}</svg>'.encode(),
+                         gzip.compress(f'<svg width="7" height="8">{path}</svg>'.encode())):
+            result, read = asyncio.run(consumed(document))
+            self.assertEqual((result['width'], result['height']), (7, 8))
+            self.assertLessEqual(read, 2 * imgspy_asyncio.SVG_READ_SIZE)
+        result, = asyncio.run(Imgspy.info(('<!--' + ' ' * 100000 + '--><svg width="1" height="1">').encode()))
+        self.assertEqual(result['status'], STATUS_TOO_LARGE)
+
+
+def jfif_jpeg(width, height):
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+    dqt = (b'\xff\xdb' + struct.pack('>H', 67) + b'\x00' * 65) * 2
+    return b'\xff\xd8' + app0 + dqt + make_jpeg(width, height)[20:] + b'\x00' * 100000
+
+
+SVG_ICON = b'<?xml version="1.0" encoding="UTF-8"?>\n<!-- icon -->\n' \
+    b'<svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24">' \
+    b'<path d="' + b'M0 0h24v24H0z' * 10000 + b'"/></svg>'
+
+# typical images of each format the budgets in read_budgets.json hold for
+READ_BUDGET_SAMPLES = {
+    'png': [PNG_DATA, apng(3, 2, 4)],
+    'gif': [gif(5, 4, 50)],
+    'jpeg': [jfif_jpeg(30, 20), exif_jpeg(30, 20, 6), make_jpeg(30, 20, 1932)],
+    'ico': [ico([(16, 16), (32, 32), (48, 48)])],
+    'bmp': [b'BM' + struct.pack('<IHHI', 1054, 0, 0, 54)
+            + struct.pack('<IiiHHIIiiII', 40, 30, 20, 1, 24, 0, 0, 0, 0, 0, 0) + b'\x00' * 1000],
+    'tiff': [tiff(7, 6, 8) + b'\x00' * 10000],
+    'webp': [b'RIFF' + struct.pack('<I', 10012) + b'WEBPVP8 ' + struct.pack('<I', 10000)
+             + b'\x00\x00\x00\x9d\x01\x2a' + struct.pack('<HH', 30, 20) + b'\x00' * 9994],
+    'psd': [b'8BPS\x00\x01' + b'\x00' * 6 + struct.pack('>HLLHH', 3, 20, 30, 8, 3) + b'\x00' * 10000],
+    'heif': [heif([b'avif', b'mif1'], 1024, 768, rotation=1), heif([b'heic', b'mif1'], 4032, 3024)],
+    'svg': [SVG_ICON, gzip.compress(SVG_ICON)],
+}
+
+
+class TestReadBudgets(unittest.TestCase):
+
+    def setUp(self):
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'read_budgets.json')) as f:
+            self.budgets = json.load(f)
+
+    def test_samples_cover_budgets(self):
+        self.assertEqual(sorted(READ_BUDGET_SAMPLES), sorted(self.budgets))
+
+    def test_within_budget(self):
+        audit = imgspy_asyncio.ReadAudit()
+        with patch.object(imgspy_asyncio, 'read_audit', audit):
+            for samples in READ_BUDGET_SAMPLES.values():
+                results = asyncio.run(Imgspy.info(*samples))
+                self.assertTrue(all(result['status'] == 'ok' for result in results), results)
+        summary = audit.summary()
+        for parser, budget in self.budgets.items():
+            with self.subTest(parser=parser):
+                self.assertEqual(summary[parser]['probes'], len(READ_BUDGET_SAMPLES[parser]))
+                self.assertLessEqual(summary[parser]['max_bytes'], budget['bytes'])
+                self.assertLessEqual(summary[parser]['max_reads'], budget['reads'])
+
+    def test_counts(self):
+        probe = imgspy_asyncio.Probe(fields='+frames')
+        asyncio.run(probe.get_info(gif(5, 4, 50)))
+        self.assertEqual(probe.parser, 'gif')
+        self.assertEqual(probe.stream.consumed, len(gif(5, 4, 50)))
+        self.assertGreater(probe.stream.reads, 50)
+
+
+class TestFailingOrigins(unittest.TestCase):
+
+    def test_circuit_breaker_trips(self):
+        breaker = CircuitBreaker(threshold=2, cool_down=60)
+        breaker.record_failure('dead.example')
+        self.assertTrue(breaker.allow('dead.example'))
+        breaker.record_failure('dead.example')
+        self.assertFalse(breaker.allow('dead.example'))
+        self.assertTrue(breaker.allow('alive.example'))
+        breaker.record_success('dead.example')
+        self.assertTrue(breaker.allow('dead.example'))
+
+    def test_open_circuit_fast_fails(self):
+        with LocalServer({'/down.png': (500, {}, b'')}) as server:
+            with patch('imgspy_asyncio.circuit_breaker', CircuitBreaker(threshold=1)):
+                results = asyncio.run(Imgspy.info(server.url + '/down.png', retry=RetryPolicy(retries=0)))
+                self.assertEqual(results[0]['status'], STATUS_HTTP_ERROR)
+                results = asyncio.run(Imgspy.info(server.url + '/other.png'))
+        self.assertEqual(results[0]['status'], STATUS_CIRCUIT_OPEN)
+        self.assertEqual(len(server.requests), 1)
+
+    def test_negative_cache(self):
+        routes = {'/missing.png': (404, {}, b''), '/page.html': (200, {}, b'<html></html>')}
+        with LocalServer(routes) as server:
+            with patch('imgspy_asyncio.negative_cache', NegativeCache(ttl=60)):
+                urls = [server.url + '/missing.png', server.url + '/page.html']
+                expected = [{'status': STATUS_NOT_FOUND, 'error': 'HTTP 404'},
+                            {'status': STATUS_UNSUPPORTED, 'error': None, 'strategy': 'whole'}]
+                self.assertEqual(asyncio.run(Imgspy.info(*urls)), expected)
+                self.assertEqual(asyncio.run(Imgspy.info(*urls)), expected)
+        self.assertEqual(len(server.requests), 2)
+
+    def test_negative_cache_expires(self):
+        cache = NegativeCache(ttl=0)
+        cache.add('http://example.com/a.png', {'status': STATUS_NOT_FOUND, 'error': 'HTTP 404'})
+        self.assertNotIn('http://example.com/a.png', cache)
+
+
+class TestErrorsAsValues(unittest.TestCase):
+
+    def test_statuses(self):
+        truncated_png = data_uri(PNG_DATA[:20])
+        results = asyncio.run(Imgspy.info(data_uri(PNG_DATA), data_uri(b'plain text, no image'),
+                                          'not-a-path-or-url', truncated_png))
+        self.assertEqual([r['status'] for r in results],
+                         ['ok', STATUS_UNSUPPORTED, STATUS_INVALID_INPUT, STATUS_CORRUPT])
+
+    def test_summary(self):
+        with LocalServer({'/missing.png': (404, {}, b'')}) as server:
+            inputs = [data_uri(PNG_DATA), server.url + '/missing.png', 'not-a-path-or-url']
+            results, summary = asyncio.run(Imgspy.info(*inputs, summary=True))
+        self.assertEqual(len(results), 3)
+        self.assertEqual(summary['total'], 3)
+        self.assertEqual(summary['failed'], 2)
+        self.assertEqual(summary['by_status'], {'ok': 1, STATUS_NOT_FOUND: 1, STATUS_INVALID_INPUT: 1})
+        self.assertEqual(summary['by_host'], {server.url[7:]: {STATUS_NOT_FOUND: 1},
+                                              'file': {STATUS_INVALID_INPUT: 1}})
+
+    def test_error_log_rate_limited(self):
+        logger = MagicMock()
+        error_log = ErrorLog(limit=2, interval=60, logger=logger)
+        for i in range(5):
+            error_log.log(f'input{i}', {'status': STATUS_CORRUPT, 'error': None})
+        self.assertEqual(logger.error.call_count, 2)
+
+
+class TestBufferInputs(unittest.TestCase):
+
+    def test_buffer_types(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(PNG_DATA)
+            f.flush()
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            with patch('os.path.isfile', side_effect=AssertionError('stat call')):
+                results = asyncio.run(Imgspy.info(PNG_DATA, bytearray(PNG_DATA),
+                                                  memoryview(PNG_DATA), mapped))
+            # the probe let go of its view, so the mapping can be closed
+            mapped.close()
+        for result in results:
+            self.assertEqual(result, {'type': 'png', 'width': 2, 'height': 1, 'status': 'ok'})
+
+    def test_buffer_bounded(self):
+        results = asyncio.run(Imgspy.info(make_jpeg(3, 4, 60032), b'plain text, no image',
+                                          max_bytes=1024))
+        self.assertEqual([r['status'] for r in results], [STATUS_TOO_LARGE, STATUS_UNSUPPORTED])
+
+    def test_buffer_not_copied(self):
+        buffer = bytearray(make_jpeg(640, 480, 60032))
+        stream = imgspy_asyncio.BufferStream(buffer)
+        self.assertEqual(stream.read(2), b'\xff\xd8')
+        buffer[:2] = b'\x00\x00'
+        stream.position = 0
+        self.assertEqual(stream.read(2), b'\x00\x00')
+        stream.release()
+
+
+class TestAsyncInputs(unittest.TestCase):
+
+    class AsyncReader:
+        def __init__(self, data, delay=0):
+            self.stream, self.delay, self.reads = io.BytesIO(data), delay, []
+
+        async def read(self, size=-1):
+            await asyncio.sleep(self.delay)
+            self.reads.append(size)
+            return self.stream.read(size)
+
+    class SlowReader(io.RawIOBase):
+        def __init__(self, data):
+            self.stream = io.BytesIO(data)
+
+        def read(self, size=-1):
+            time.sleep(0.05)
+            return self.stream.read(size)
+
+    def test_async_reader(self):
+        reader = self.AsyncReader(PNG_DATA + b'\x00' * 100000)
+        result, = asyncio.run(Imgspy.info(reader))
+        self.assertEqual(result['status'], 'ok')
+        self.assertEqual(sum(reader.reads), 26)
+
+    def test_stream_reader_short_reads(self):
+        aiohttp = imgspy_asyncio._import_aiohttp()
+
+        async def probe(data):
+            reader = aiohttp.StreamReader(MagicMock(_reading_paused=False), 2 ** 16, loop=asyncio.get_running_loop())
+
+            async def feed():
+                for i in range(0, len(data), 10):
+                    reader.feed_data(data[i:i + 10])
+                    await asyncio.sleep(0)
+                reader.feed_eof()
+            feeding = asyncio.ensure_future(feed())
+            result, = await Imgspy.info(reader)
+            await feeding
+            return result
+        for data, size in ((PNG_DATA, (2, 1)), (make_jpeg(30, 20, 332), (30, 20))):
+            result = asyncio.run(probe(data))
+            self.assertEqual((result['status'], result['width'], result['height']), ('ok',) + size)
+
+    def test_async_iterator(self):
+        async def chunks():
+            data = make_jpeg(30, 20, 332)
+            for i in range(0, len(data), 7):
+                yield data[i:i + 7]
+        result, = asyncio.run(Imgspy.info(chunks()))
+        self.assertEqual((result['width'], result['height']), (30, 20))
+
+    def test_aiofiles_handle(self):
+        imgspy_asyncio._import_aiofiles()
+        with tempfile.NamedTemporaryFile(suffix='.png') as f:
+            f.write(PNG_DATA)
+            f.flush()
+
+            async def main():
+                async with imgspy_asyncio.aiofiles.open(f.name, 'rb') as handle:
+                    return await Imgspy.info(handle)
+            result, = asyncio.run(main())
+        self.assertEqual(result['status'], 'ok')
+
+    def test_blocking_stream_offloaded(self):
+        async def main():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+            task = asyncio.ensure_future(ticker())
+            result = await Imgspy.info(self.SlowReader(make_jpeg(3, 4)))
+            task.cancel()
+            return result, ticks
+        (result,), ticks = asyncio.run(main())
+        self.assertEqual(result['status'], 'ok')
+        self.assertGreater(ticks, 3)
+
+    def test_stalled_reader_cancelled(self):
+        start = time.monotonic()
+        result, = asyncio.run(Imgspy.info(self.AsyncReader(PNG_DATA, delay=30), deadline=0.2))
+        self.assertEqual(result['status'], STATUS_TIMEOUT)
+        self.assertLess(time.monotonic() - start, 5)
+
+
+class TestBackends(unittest.TestCase):
+
+    class MemoryBackend(imgspy_asyncio.Backend):
+        def __init__(self, objects, failures=0):
+            self.objects, self.failures, self.calls = objects, failures, []
+
+        async def read_range(self, uri, start, length):
+            self.calls.append((uri, start, length))
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionResetError()
+            if uri not in self.objects:
+                raise FileNotFoundError(uri)
+            data = self.objects[uri]
+            return data[start:start + length], len(data)
+
+    def setUp(self):
+        isolate_backends(self)
+
+    def test_custom_scheme(self):
+        backend = self.MemoryBackend({'mem://bucket/a.png': PNG_DATA}, failures=1)
+        imgspy_asyncio.register_backend('MEM', backend)
+        retry = RetryPolicy(retries=1, backoff=0)
+        results, summary = asyncio.run(Imgspy.info('mem://bucket/a.png', 'mem://bucket/missing.png',
+                                                   retry=retry, max_bytes=1024, summary=True))
+        self.assertEqual(results[0], {'type': 'png', 'width': 2, 'height': 1, 'status': 'ok'})
+        self.assertEqual(results[1]['status'], STATUS_NOT_FOUND)
+        self.assertEqual(summary['by_host'], {'bucket': {STATUS_NOT_FOUND: 1}})
+        self.assertEqual(backend.calls[0], ('mem://bucket/a.png', 0, 1024))
+        self.assertIn('mem://bucket/missing.png', imgspy_asyncio.negative_cache)
+
+    def test_file_uri(self):
+        with tempfile.NamedTemporaryFile(suffix=' a.png') as f:
+            f.write(PNG_DATA)
+            f.flush()
+            results = asyncio.run(Imgspy.info('file://' + f.name.replace(' ', '%20'), 'file:///no/such.png'))
+        self.assertEqual([r['status'] for r in results], ['ok', STATUS_NOT_FOUND])
+
+    def test_uris_skip_stat(self):
+        with patch('os.path.isfile', side_effect=AssertionError('stat call')):
+            results = asyncio.run(Imgspy.info(data_uri(PNG_DATA), 'unknown://x'))
+        self.assertEqual([r['status'] for r in results], ['ok', STATUS_INVALID_INPUT])
+
+
+class TestRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.runner = Runner()
+        self.addCleanup(self.runner.close)
+
+    def test_info_many(self):
+        with LocalServer({'/a.png': (200, {}, PNG_DATA)}) as server:
+            inputs = [server.url + '/a.png', data_uri(PNG_DATA)]
+            first = self.runner.info_many(inputs)
+            second = self.runner.info_many(inputs)
+        self.assertEqual(first, second)
+        self.assertEqual([r['status'] for r in first], ['ok', 'ok'])
+        # both calls fetched over the same kept-alive connection
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(server.requests[0][2], server.requests[1][2])
+
+    def test_submit(self):
+        future = self.runner.submit(data_uri(PNG_DATA))
+        self.assertIsInstance(future, concurrent.futures.Future)
+        self.assertEqual(future.result(), {'type': 'png', 'width': 2, 'height': 1, 'status': 'ok'})
+
+    def test_module_api(self):
+        results = imgspy_asyncio.info_many([data_uri(PNG_DATA)])
+        self.assertEqual(results[0]['status'], 'ok')
+        self.assertEqual(imgspy_asyncio.submit(data_uri(PNG_DATA)).result(), results[0])
+
 
 class TestImgspy(unittest.TestCase):
 
@@ -0,0 +1,71 @@
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import imgspy_batch
+from imgspy_testing import make_png, data_uri
+from imgspy_asyncio import Imgspy
+
+
+class TestBatchRunner(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.manifest = os.path.join(directory.name, 'manifest.txt')
+        self.output = os.path.join(directory.name, 'results.jsonl')
+        with open(self.manifest, 'w') as f:
+            for i in range(1, 96):
+                f.write(data_uri(make_png(i, 1, 64)) + '\n')
+                if i % 10 == 0:
+                    f.write('\n')
+
+    def read_output(self):
+        with open(self.output) as f:
+            return [json.loads(line) for line in f]
+
+    def assert_complete(self, results):
+        self.assertEqual([r['width'] for r in results], list(range(1, 96)))
+        self.assertTrue(all(r['status'] == 'ok' for r in results))
+        self.assertEqual(len({r['line'] for r in results}), 95)
+
+    def test_run(self):
+        runner = imgspy_batch.BatchRunner(self.manifest, self.output, chunk_size=10)
+        self.assertEqual(asyncio.run(runner.run()), {'resumed_from': 0, 'probed': 95})
+        self.assert_complete(self.read_output())
+        self.assertEqual(asyncio.run(runner.run()), {'resumed_from': 104, 'probed': 0})
+
+    def test_resume_after_crash(self):
+        info, calls = Imgspy.info, []
+
+        async def crashing_info(*inputs, **options):
+            calls.append(len(inputs))
+            if len(calls) == 5:
+                raise MemoryError()
+            return await info(*inputs, **options)
+
+        runner = imgspy_batch.BatchRunner(self.manifest, self.output, chunk_size=10, checkpoint_interval=0)
+        with patch.object(imgspy_batch.Imgspy, 'info', crashing_info):
+            with self.assertRaises(MemoryError):
+                asyncio.run(runner.run())
+        # a result written after the last checkpoint, before the crash
+        with open(self.output, 'a') as f:
+            f.write('{"line": 999, "status": "ok", "wid')
+        stats = asyncio.run(runner.run())
+        self.assertGreater(stats['resumed_from'], 0)
+        self.assertLess(stats['probed'], 95)
+        self.assert_complete(self.read_output())
+
+    def test_other_manifest(self):
+        runner = imgspy_batch.BatchRunner(self.manifest, self.output, chunk_size=10)
+        asyncio.run(runner.run())
+        other = imgspy_batch.BatchRunner(self.manifest + '.other', self.output)
+        with self.assertRaises(ValueError):
+            asyncio.run(other.run())
+
+
+if __name__ == "__main__":
+    unittest.main()
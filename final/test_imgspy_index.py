@@ -0,0 +1,83 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import imgspy_index
+from imgspy_asyncio import STATUS_NOT_FOUND, failure
+
+
+def make_results(count):
+    for i in range(count):
+        if i % 7 == 0:
+            yield f'https://example.com/missing/{i}.png', failure(STATUS_NOT_FOUND, '404')
+        else:
+            yield f'https://example.com/{i}.{("png", "jpg")[i % 2]}', \
+                {'type': ('png', 'jpg')[i % 2], 'width': i, 'height': i * 2, 'status': 'ok'}
+
+
+class TestIndex(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = os.path.join(self.directory, 'results.idx')
+
+    def assert_lookups(self, count):
+        with imgspy_index.Index(self.path) as index:
+            self.assertEqual(len(index), count)
+            for key, result in make_results(count):
+                self.assertEqual(index[key], {k: v for k, v in result.items() if k != 'error'})
+            self.assertIsNone(index.get('https://example.com/other.png'))
+            self.assertNotIn('', index)
+            self.assertEqual(sorted(key for key, _ in index.items()), sorted(key for key, _ in make_results(count)))
+
+    def test_lookup(self):
+        # several sorted runs merged
+        self.assertEqual(imgspy_index.write_index(self.path, make_results(5000), run_size=1000), 5000)
+        self.assert_lookups(5000)
+
+    def test_hash_collisions(self):
+        with patch.object(imgspy_index, 'key_hash', lambda key: b'\x00' * 8):
+            imgspy_index.write_index(self.path, make_results(50))
+            self.assert_lookups(50)
+
+    def test_empty(self):
+        imgspy_index.write_index(self.path, [])
+        self.assert_lookups(0)
+
+    def test_sizes(self):
+        results = {
+            # a BMP stored top-down
+            'top-down.bmp': {'type': 'bmp', 'width': 40, 'height': -30, 'status': 'ok'},
+            'scalable.svg': {'type': 'svg', 'width': None, 'height': None, 'status': 'ok'},
+            'empty.gif': {'type': 'gif', 'width': 0, 'height': 0, 'status': 'ok'},
+        }
+        imgspy_index.write_index(self.path, results.items())
+        with imgspy_index.Index(self.path) as index:
+            self.assertEqual(dict(index.items()), results)
+        with self.assertRaises(ValueError):
+            imgspy_index.write_index(self.path, [('huge.png', {'type': 'png', 'width': 2 ** 31, 'height': 1})])
+
+    def test_not_an_index(self):
+        for data in (b'', b'{"input": "a.png"}\n'):
+            with open(self.path, 'wb') as f:
+                f.write(data)
+            with self.assertRaises(ValueError):
+                imgspy_index.Index(self.path)
+
+    def test_export(self):
+        results = os.path.join(self.directory, 'results.jsonl')
+        with open(results, 'w') as f:
+            for line, (key, result) in enumerate(make_results(100)):
+                f.write(json.dumps(dict(result, line=line, input=key)) + '\n')
+        self.assertEqual(imgspy_index.main(['export', results, self.path]), 0)
+        self.assertEqual(imgspy_index.main(['get', self.path, 'https://example.com/5.jpg']), 0)
+        self.assertEqual(imgspy_index.main(['get', self.path, 'https://example.com/none.jpg']), 1)
+        self.assert_lookups(100)
+
+
+if __name__ == "__main__":
+    unittest.main()
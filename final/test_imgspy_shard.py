@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import asyncio
+import tempfile
+import unittest
+import threading
+import subprocess
+
+import imgspy_shard
+from imgspy_testing import make_png, data_uri
+
+INPUTS = 230
+
+
+class TestShardQueue(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.manifest = os.path.join(self.directory, 'manifest.txt')
+        self.results = os.path.join(self.directory, 'results')
+        os.mkdir(self.results)
+        with open(self.manifest, 'w') as f:
+            for i in range(1, INPUTS + 1):
+                f.write(data_uri(make_png(i, 1, 64)) + '\n')
+        self.path = os.path.join(self.directory, 'queue.db')
+        self.queue = imgspy_shard.ShardQueue(self.path)
+        self.addCleanup(self.queue.close)
+
+    def assert_merged(self):
+        output = os.path.join(self.directory, 'results.jsonl')
+        imgspy_shard.merge(self.queue, self.results, output)
+        with open(output) as f:
+            results = [json.loads(line) for line in f]
+        self.assertEqual([r['width'] for r in results], list(range(1, INPUTS + 1)))
+        self.assertEqual([r['line'] for r in results], list(range(INPUTS)))
+
+    def test_split(self):
+        self.assertEqual(self.queue.split(self.manifest, 100), 3)
+        self.assertEqual(self.queue.progress(), {'pending': 3, 'leased': 0, 'done': 0})
+        with self.assertRaises(ValueError):
+            self.queue.split(self.manifest, 100)
+
+    def test_lease_expiry(self):
+        self.queue.split(self.manifest, 100)
+        self.queue.lease = 0.0
+        first = self.queue.claim('a')
+        self.queue.lease = 60.0
+        second = self.queue.claim('b')
+        self.assertEqual(first['id'], second['id'])
+        self.assertEqual(second['attempts'], 1)
+        self.assertFalse(self.queue.heartbeat(first['id'], 'a'))
+        self.assertFalse(self.queue.complete(first['id'], 'a'))
+        self.assertTrue(self.queue.heartbeat(second['id'], 'b'))
+        self.assertNotEqual(self.queue.claim('a')['id'], second['id'])
+
+    def test_worker(self):
+        self.queue.split(self.manifest, 50)
+        # a shard abandoned by a worker that died holding its lease
+        self.queue.lease = 0.0
+        self.queue.claim('dead')
+        self.queue.lease = 60.0
+        worker = imgspy_shard.Worker(self.queue, self.results, 'live', chunk_size=20)
+        stats = asyncio.run(worker.run())
+        self.assertEqual(stats, {'shards': 5, 'lost': 0, 'probed': INPUTS})
+        self.assertEqual(sorted(os.listdir(self.results)), [f'shard-{i:06d}.jsonl' for i in range(1, 6)])
+        self.assert_merged()
+
+    def test_worker_waits_for_running_lease(self):
+        self.queue.split(self.manifest, 50)
+        self.queue.lease = 0.5
+        # a worker that died holding a lease that has yet to expire
+        self.queue.claim('dead')
+        worker = imgspy_shard.Worker(self.queue, self.results, 'live', chunk_size=20)
+        start = time.time()
+        stats = asyncio.run(worker.run())
+        self.assertGreaterEqual(time.time() - start, 0.5)
+        self.assertEqual(stats, {'shards': 5, 'lost': 0, 'probed': INPUTS})
+        self.assertIsNone(self.queue.next_expiry())
+        self.assert_merged()
+
+    def test_queue_locked_without_stalling_loop(self):
+        self.queue.split(self.manifest, 50)
+        # another node holding the database lock for a while
+        blocker = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.addCleanup(blocker.close)
+        blocker.execute('BEGIN IMMEDIATE')
+        ticks_at_unlock = []
+
+        async def main():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            def unlock():
+                ticks_at_unlock.append(ticks)
+                blocker.execute('COMMIT')
+            task = asyncio.ensure_future(ticker())
+            threading.Timer(0.3, unlock).start()
+            try:
+                return await imgspy_shard.Worker(self.queue, self.results, 'live', chunk_size=20).run()
+            finally:
+                task.cancel()
+        self.assertEqual(asyncio.run(main()), {'shards': 5, 'lost': 0, 'probed': INPUTS})
+        self.assertGreater(ticks_at_unlock[0], 5)
+        self.assert_merged()
+
+    def test_merge_unfinished(self):
+        self.queue.split(self.manifest, 100)
+        with self.assertRaises(ValueError):
+            imgspy_shard.merge(self.queue, self.results, os.path.join(self.directory, 'results.jsonl'))
+
+    def test_worker_processes(self):
+        self.queue.split(self.manifest, 10)
+        command = [sys.executable, imgspy_shard.__file__, 'work', self.path, self.results, '--chunk-size', '5']
+        workers = [subprocess.Popen(command + ['--name', f'node{i}'], stdout=subprocess.DEVNULL)
+                   for i in range(3)]
+        self.assertEqual([worker.wait(timeout=60) for worker in workers], [0, 0, 0])
+        self.assertEqual(self.queue.progress(), {'pending': 0, 'leased': 0, 'done': 23})
+        self.assert_merged()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import asyncio
+import tempfile
+import unittest
+
+import imgspy_watch
+from imgspy_testing import make_png, make_jpeg
+from imgspy_asyncio import Imgspy, STATUS_CORRUPT
+
+
+class TestWatch(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        with open(os.path.join(self.directory, 'existing.png'), 'wb') as f:
+            f.write(make_png(1, 1, 64))
+
+    def collect(self, count, write, **options):
+        async def main():
+            results = []
+            watch = Imgspy.watch(self.directory, **options)
+            collecting = asyncio.ensure_future(self.__collect(watch, results, count))
+            await asyncio.sleep(0.05)
+            await write()
+            try:
+                await asyncio.wait_for(collecting, 10)
+                # nothing further arrives
+                await asyncio.wait_for(self.__collect(watch, results, 1), 0.5)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                await watch.aclose()
+            return results
+        return asyncio.run(main())
+
+    @staticmethod
+    async def __collect(watch, results, count):
+        for _ in range(count):
+            results.append(await watch.__anext__())
+
+    async def write_files(self):
+        path = os.path.join(self.directory, 'a.png')
+        with open(path, 'wb') as f:
+            f.write(make_png(64, 48, 4096)[:20])
+            f.flush()
+            await asyncio.sleep(0.1)
+            f.write(make_png(64, 48, 4096)[20:])
+        # rapid rewrites are probed once
+        for width in (10, 20, 30):
+            with open(os.path.join(self.directory, 'b.jpg'), 'wb') as f:
+                f.write(make_jpeg(width, 20, 2048))
+        with open(os.path.join(self.directory, 'upload.tmp'), 'wb') as f:
+            f.write(make_png(5, 5, 64))
+        os.rename(os.path.join(self.directory, 'upload.tmp'), os.path.join(self.directory, 'c.png'))
+        # not an image, so not reported
+        with open(os.path.join(self.directory, 'notes.txt'), 'wb') as f:
+            f.write(b'not an image')
+        with open(os.path.join(self.directory, 'd.png'), 'wb') as f:
+            f.write(make_png(8, 8, 64)[:12])
+        os.mkdir(os.path.join(self.directory, 'subdirectory'))
+
+    def assert_results(self, results):
+        names = [os.path.basename(path) for path, _ in results]
+        self.assertEqual(len(names), len(set(names)))
+        results = dict(zip(names, (result for _, result in results)))
+        self.assertEqual(sorted(results), ['a.png', 'b.jpg', 'c.png', 'd.png'])
+        self.assertEqual(results['a.png'], {'type': 'png', 'width': 64, 'height': 48, 'status': 'ok'})
+        self.assertEqual(results['b.jpg'], {'type': 'jpg', 'width': 30, 'height': 20, 'status': 'ok'})
+        self.assertEqual(results['c.png']['width'], 5)
+        self.assertEqual(results['d.png']['status'], STATUS_CORRUPT)
+
+    @unittest.skipUnless(os.path.exists('/proc/sys/fs/inotify'), 'inotify is not available')
+    def test_inotify(self):
+        self.assert_results(self.collect(4, self.write_files, debounce=0.2))
+
+    def test_poll(self):
+        self.assert_results(self.collect(4, self.write_files, poll=True, poll_interval=0.3))
+
+    def test_not_a_directory(self):
+        async def main():
+            async for _ in Imgspy.watch(os.path.join(self.directory, 'existing.png'), poll=True):
+                pass
+        with self.assertRaises(NotADirectoryError):
+            asyncio.run(main())
+
+    def test_watcher_choice(self):
+        async def main():
+            watcher = imgspy_watch.open_watcher(self.directory)
+            watcher.close()
+            return watcher
+        expected = imgspy_watch.InotifyWatcher if os.path.exists('/proc/sys/fs/inotify') \
+            else imgspy_watch.PollWatcher
+        self.assertIsInstance(asyncio.run(main()), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -30,6 +30,8 @@ import os
 import sys
 import base64
 import struct
+import itertools
+import threading
 import contextlib
 
 
@@ -38,10 +40,37 @@ __version__ = '0.2.2'
 
 PY2 = sys.version_info[0] == 2
 
-if PY2:
-    from urllib import urlopen
-else:
-    from urllib.request import urlopen
+# info_many defaults; the per-host limit and timeouts match imgspy_asyncio
+DEFAULT_WORKERS = 16
+DEFAULT_CONNECTIONS_PER_HOST = 8
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 10.0
+DEFAULT_RANGE_BYTES = 64 * 1024
+MAX_REDIRECTS = 5
+
+# info_many result statuses, the same as imgspy_asyncio's
+STATUS_OK = 'ok'
+STATUS_INVALID_INPUT = 'invalid_input'
+STATUS_NOT_FOUND = 'not_found'
+STATUS_HTTP_ERROR = 'http_error'
+STATUS_CONNECTION_ERROR = 'connection_error'
+STATUS_TIMEOUT = 'timeout'
+STATUS_READ_ERROR = 'read_error'
+STATUS_UNSUPPORTED = 'unsupported'
+STATUS_ERROR = 'error'
+
+
+def failure(status, error=None):
+    return {'status': status, 'error': error}
+
+
+def urlopen(url):
+    # urllib pulls in http.client and ssl, so only import it for URLs
+    if PY2:
+        from urllib import urlopen
+    else:
+        from urllib.request import urlopen
+    return urlopen(url)
 
 
 @contextlib.contextmanager
@@ -60,11 +89,182 @@ def openstream(input):
             yield io.BytesIO(base64.b64decode(parts[1][7:]))
 
 
+def _payload_start(uri):
+    comma = uri.find(',')
+    header = uri[:comma]
+    return comma + 1 if comma > 0 and header.count(';') == 1 and header.endswith(';base64') else 0
+
+
 def info(input):
     with openstream(input) as stream:
         return probe(stream)
 
 
+def info_many(inputs, workers=DEFAULT_WORKERS, pool=None, range_bytes=DEFAULT_RANGE_BYTES):
+    """Probe many inputs on a thread pool, yielding ``(input, result)`` as each
+    one completes. URLs are fetched with ranged requests over pooled keep-alive
+    connections. Like the async engine's, every result has a ``status``, and
+    failed ones an ``error`` detail instead of the image metadata. Inputs are
+    consumed lazily, so ``inputs`` may be a generator.
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+    own_pool = pool is None
+    pool = pool or ConnectionPool()
+    inputs = iter(inputs)
+    pending = {}
+    executor = ThreadPoolExecutor(workers)
+    try:
+        for input in itertools.islice(inputs, workers * 2):
+            pending[executor.submit(_info_pooled, input, pool, range_bytes)] = input
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                input = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = failure(STATUS_ERROR, type(e).__name__)
+                for next_input in itertools.islice(inputs, 1):
+                    pending[executor.submit(_info_pooled, next_input, pool, range_bytes)] = next_input
+                yield input, result
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown()
+        if own_pool:
+            pool.close()
+
+
+def _info_pooled(input, pool, range_bytes):
+    if hasattr(input, 'read') or not input.startswith('http'):
+        if not hasattr(input, 'read') and not (_payload_start(input) if input.startswith('data:')
+                                               else os.path.isfile(input)):
+            return failure(STATUS_INVALID_INPUT)
+        try:
+            return _result(info(input))
+        except (IOError, OSError) as e:
+            return failure(STATUS_READ_ERROR, type(e).__name__)
+    if PY2:
+        import httplib as http_client
+    else:
+        import http.client as http_client
+    import socket
+    url = input
+    try:
+        for _ in range(MAX_REDIRECTS + 1):
+            with pool.request(url, {'Range': 'bytes=0-%d' % (range_bytes - 1)}) as response:
+                if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                    url = _urljoin(url, response.getheader('Location'))
+                    continue
+                if response.status in (404, 410):
+                    return failure(STATUS_NOT_FOUND, 'HTTP %d' % response.status)
+                if response.status not in (200, 206):
+                    return failure(STATUS_HTTP_ERROR, 'HTTP %d' % response.status)
+                return _result(probe(response))
+        return failure(STATUS_HTTP_ERROR, 'too many redirects')
+    except socket.timeout:
+        return failure(STATUS_TIMEOUT)
+    except http_client.HTTPException as e:
+        return failure(STATUS_HTTP_ERROR, type(e).__name__)
+    except (IOError, OSError) as e:
+        return failure(STATUS_CONNECTION_ERROR, type(e).__name__)
+
+
+def _result(result):
+    if result is None:
+        return failure(STATUS_UNSUPPORTED)
+    result['status'] = STATUS_OK
+    return result
+
+
+def _urljoin(base, url):
+    if PY2:
+        from urlparse import urljoin
+    else:
+        from urllib.parse import urljoin
+    return urljoin(base, url)
+
+
+class ConnectionPool(object):
+    """Keep-alive HTTP(S) connections shared by info_many's threads, at most
+    ``connections_per_host`` per host. A response is drained and its connection
+    kept only when it is small (a honoured Range); otherwise it is closed.
+    """
+
+    def __init__(self, connections_per_host=DEFAULT_CONNECTIONS_PER_HOST,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 drain_bytes=DEFAULT_RANGE_BYTES):
+        self.connections_per_host = connections_per_host
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.drain_bytes = drain_bytes
+        self._idle = {}
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def request(self, url, headers=None):
+        if PY2:
+            import httplib as http_client
+            from urlparse import urlsplit
+        else:
+            import http.client as http_client
+            from urllib.parse import urlsplit
+
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        with self._lock:
+            slot = self._slots.setdefault(key, threading.BoundedSemaphore(self.connections_per_host))
+        slot.acquire()
+        conn = None
+        try:
+            while True:
+                with self._lock:
+                    idle = self._idle.get(key)
+                    conn = idle.pop() if idle else None
+                reused = conn is not None
+                if not reused:
+                    cls = http_client.HTTPSConnection if parts.scheme == 'https' else http_client.HTTPConnection
+                    conn = cls(parts.netloc, timeout=self.connect_timeout)
+                    conn.connect()
+                    conn.sock.settimeout(self.read_timeout)
+                try:
+                    conn.request('GET', path, headers=headers or {})
+                    response = conn.getresponse()
+                    break
+                except (http_client.HTTPException, IOError, OSError):
+                    # a kept-alive connection the server has since closed
+                    conn.close()
+                    conn = None
+                    if not reused:
+                        raise
+            yield response
+            if self._drain(response):
+                with self._lock:
+                    self._idle.setdefault(key, []).append(conn)
+                conn = None
+        finally:
+            if conn is not None:
+                conn.close()
+            slot.release()
+
+    def _drain(self, response):
+        length = response.getheader('Content-Length')
+        if response.will_close or length is None or not length.isdigit() or int(length) > self.drain_bytes:
+            return False
+        response.read()
+        return True
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
 def probe(stream):
     w, h = None, None
     chunk = stream.read(26)
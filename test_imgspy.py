@@ -1,14 +1,60 @@
 import os
 import re
 import glob
+import base64
+import socket
 import textwrap
+import threading
+import contextlib
 import urllib.request
+import http.server
 
 import imgspy
 
 
 BASEDIR = os.path.dirname(os.path.abspath(__file__))
 FORMAT = r'sample(?P<width>\d+)x(?P<height>\d+)(?P<comment>[^.]*).(?P<format>\w+)'
+PNG_DATA = bytes.fromhex(
+    '89504e470d0a1a0a0000000d494844520000000200000001080600000'
+    '0f4227f8a0000000f49444154789c63f8cfc0f01f0003000986018085fb23a70000000049454e44ae426082')
+
+
+@contextlib.contextmanager
+def local_server(routes):
+    """Serve ``routes`` ({path: (status, headers, body)}) over keep-alive HTTP/1.1
+    with Range support, recording the client address of every request."""
+    seen = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            seen.append((self.path, self.client_address))
+            status, headers, body = routes.get(self.path, (404, {}, b''))
+            match = re.match(r'bytes=(\d+)-(\d+)', self.headers.get('Range', ''))
+            if status == 200 and match:
+                status, body = 206, body[int(match.group(1)):int(match.group(2)) + 1]
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.seen = seen
+    server.url = 'http://127.0.0.1:%d' % server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
 
 
 def test_samples():
@@ -41,3 +87,43 @@ def test_url():
         domain + '/500x500.jpg': {'type': 'jpg', 'width': 500, 'height': 500},}
     for url, expected in urls.items():
         assert imgspy.info(urllib.request.urlopen(url)) == expected
+
+
+def test_info_many():
+    routes = {
+        '/%d.png' % i: (200, {}, PNG_DATA + b'\x00' * 200000) for i in range(20)}
+    routes['/moved'] = (302, {'Location': '/0.png'}, b'')
+    with local_server(routes) as server:
+        inputs = [server.url + path for path in routes] + [server.url + '/missing.png']
+        inputs.append('data:image/png;base64,' + base64.b64encode(PNG_DATA).decode())
+        inputs.append('path/to/missing.png')
+        results = dict(imgspy.info_many(iter(inputs), workers=4))
+
+    assert sorted(results) == sorted(inputs)
+    for path in routes:
+        assert results[server.url + path] == {'type': 'png', 'width': 2, 'height': 1, 'status': 'ok'}
+    assert results[server.url + '/missing.png'] == {'status': 'not_found', 'error': 'HTTP 404'}
+    assert results[inputs[-2]] == {'type': 'png', 'width': 2, 'height': 1, 'status': 'ok'}
+    assert results['path/to/missing.png'] == {'status': 'invalid_input', 'error': None}
+    # ranged responses are drained, so four workers reuse at most four connections
+    assert len(set(address for _, address in server.seen)) <= 4
+
+
+def test_connection_pool_per_host_limit():
+    pool = imgspy.ConnectionPool(connections_per_host=2)
+    routes = {'/a.png': (200, {}, PNG_DATA)}
+    with local_server(routes) as server:
+        inputs = [server.url + '/a.png'] * 30
+        results = list(imgspy.info_many(inputs, workers=8, pool=pool))
+        pool.close()
+
+    assert all(result['status'] == 'ok' for _, result in results)
+    assert len(set(address for _, address in server.seen)) <= 2
+
+
+def test_info_many_connection_error():
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    url = 'http://127.0.0.1:%d/a.png' % listener.getsockname()[1]
+    listener.close()
+    assert list(imgspy.info_many([url])) == [(url, {'status': 'connection_error', 'error': 'ConnectionRefusedError'})]